@@ -0,0 +1,188 @@
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+# FAISS is optional; the NumPy flat index is always available
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+# -----------------------------------
+# Backend Selection
+# -----------------------------------
+
+# Corpora below this size are searched exactly with NumPy
+FLAT_MAX_SIZE = int(os.getenv("VECTOR_INDEX_FLAT_MAX", "10000"))
+
+# Above this size HNSW memory grows too large; use IVF instead
+HNSW_MAX_SIZE = int(os.getenv("VECTOR_INDEX_HNSW_MAX", "1000000"))
+
+DEFAULT_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "auto")
+
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 8
+
+
+def choose_backend(corpus_size: int) -> str:
+    if corpus_size <= FLAT_MAX_SIZE or not FAISS_AVAILABLE:
+        return "flat"
+    if corpus_size <= HNSW_MAX_SIZE:
+        return "hnsw"
+    return "ivf"
+
+
+# -----------------------------------
+# Exact NumPy Index
+# -----------------------------------
+
+class FlatIndex:
+    """
+    Exact inner-product search over normalized embeddings.
+    Uses argpartition so top-k costs O(n) instead of a full sort.
+    """
+
+    backend = "flat"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (scores, ids), each shaped (num_queries, k), best first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        similarities = queries @ self.embeddings.T
+
+        n = similarities.shape[1]
+        k = min(k, n)
+
+        if k < n:
+            ids = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            ids = np.broadcast_to(np.arange(n), similarities.shape).copy()
+
+        scores = np.take_along_axis(similarities, ids, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+
+        return (
+            np.take_along_axis(scores, order, axis=1),
+            np.take_along_axis(ids, order, axis=1)
+        )
+
+    def save(self, path: str):
+        np.save(f"{path}.npy", self.embeddings)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "FlatIndex":
+        return cls(np.load(f"{path}.npy", mmap_mode="r" if mmap else None))
+
+
+# -----------------------------------
+# FAISS Indexes
+# -----------------------------------
+
+class FaissIndex:
+    """
+    Approximate inner-product search backed by FAISS (HNSW or IVF).
+    """
+
+    def __init__(self, index, backend: str):
+        self.index = index
+        self.backend = backend
+        self._configure()
+
+    def _configure(self):
+        if self.backend == "hnsw":
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        elif self.backend == "ivf":
+            self.index.nprobe = IVF_NPROBE
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, backend: str) -> "FaissIndex":
+        if not FAISS_AVAILABLE:
+            raise RuntimeError("faiss-cpu is not installed")
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n, dim = embeddings.shape
+
+        if backend == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        elif backend == "ivf":
+            nlist = max(1, int(np.sqrt(n)))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+        else:
+            raise ValueError(f"Unknown FAISS backend '{backend}'")
+
+        index.add(embeddings)
+        return cls(index, backend)
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        scores, ids = self.index.search(queries, min(k, len(self)))
+        # FAISS pads with id -1 when fewer than k neighbours are found
+        return scores, ids
+
+    def save(self, path: str):
+        faiss.write_index(self.index, f"{path}.faiss")
+
+    @classmethod
+    def load(cls, path: str, backend: str) -> "FaissIndex":
+        if not FAISS_AVAILABLE:
+            raise RuntimeError("faiss-cpu is not installed")
+        return cls(faiss.read_index(f"{path}.faiss"), backend)
+
+
+# -----------------------------------
+# Factory & Persistence
+# -----------------------------------
+
+def build_index(embeddings: np.ndarray, backend: Optional[str] = None):
+    """
+    Builds a search index, choosing the backend by corpus size when
+    `backend` is "auto".
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "auto":
+        backend = choose_backend(len(embeddings))
+
+    if backend == "flat":
+        return FlatIndex(embeddings)
+
+    return FaissIndex.build(embeddings, backend)
+
+
+def save_index(index, path: str):
+    """
+    Writes the index data plus a small `<path>.meta.json` header.
+    """
+    index.save(path)
+    with open(f"{path}.meta.json", "w", encoding="utf-8") as f:
+        json.dump({"backend": index.backend, "size": len(index)}, f)
+
+
+def load_index(path: str, mmap: bool = False):
+    """
+    Loads an index written by `save_index`.
+    `mmap` opens flat indexes read-only without copying them into memory.
+    """
+    with open(f"{path}.meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta["backend"] == "flat":
+        return FlatIndex.load(path, mmap=mmap)
+
+    return FaissIndex.load(path, meta["backend"])
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import ann_index
+from ann_index import FAISS_AVAILABLE, FaissIndex, FlatIndex, build_index, load_index, save_index
+
+
+def normalized(n, dim=16, seed=3):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def clustered(n, dim=16, clusters=20, seed=5):
+    # Embeddings of real text cluster by topic, which IVF relies on
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.2 * rng.standard_normal((n, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(embeddings, queries, k):
+    similarities = queries @ embeddings.T
+    ids = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(similarities, ids, axis=1), ids
+
+
+class TestFlatIndex(unittest.TestCase):
+    def test_top_k_matches_argsort(self):
+        embeddings, queries = normalized(500), normalized(20, seed=4)
+        expected_scores, expected_ids = exact_top_k(embeddings, queries, 10)
+
+        scores, ids = FlatIndex(embeddings).search(queries, 10)
+
+        self.assertEqual(ids.shape, (20, 10))
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    def test_k_larger_than_corpus(self):
+        embeddings = normalized(3)
+        scores, ids = FlatIndex(embeddings).search(embeddings[0], 10)
+
+        self.assertEqual(ids.shape, (1, 3))
+        self.assertEqual(ids[0, 0], 0)
+        self.assertTrue(np.all(np.diff(scores[0]) <= 0))
+
+
+class TestBuildAndPersist(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "index")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_auto_uses_flat_for_small_corpora(self):
+        index = build_index(normalized(ann_index.FLAT_MAX_SIZE // 100), "auto")
+        self.assertEqual(index.backend, "flat")
+        self.assertEqual(ann_index.choose_backend(ann_index.FLAT_MAX_SIZE), "flat")
+
+    def test_flat_save_load_round_trip(self):
+        embeddings, queries = normalized(200), normalized(5, seed=4)
+        index = build_index(embeddings, "flat")
+        save_index(index, self.path)
+
+        for mmap in (False, True):
+            loaded = load_index(self.path, mmap=mmap)
+            self.assertEqual((loaded.backend, len(loaded)), ("flat", 200))
+            # A memory-mapped index is a read-only view of the file, not a copy
+            self.assertEqual(isinstance(loaded.embeddings.base, np.memmap), mmap)
+            np.testing.assert_array_equal(loaded.search(queries, 5)[1], index.search(queries, 5)[1])
+
+    @unittest.skipIf(FAISS_AVAILABLE, "faiss-cpu is installed")
+    def test_faiss_backends_need_faiss(self):
+        with self.assertRaises(RuntimeError):
+            build_index(normalized(10), "hnsw")
+
+    @unittest.skipUnless(FAISS_AVAILABLE, "faiss-cpu is not installed")
+    def test_faiss_recall_and_round_trip(self):
+        vectors = clustered(2020)
+        embeddings, queries = vectors[:2000], vectors[2000:]
+        _, expected_ids = exact_top_k(embeddings, queries, 10)
+
+        for backend in ("hnsw", "ivf"):
+            index = build_index(embeddings, backend)
+            self.assertIsInstance(index, FaissIndex)
+            _, ids = index.search(queries, 10)
+
+            recall = np.mean([
+                len(set(found) & set(expected)) / 10
+                for found, expected in zip(ids, expected_ids)
+            ])
+            self.assertGreaterEqual(recall, 0.7, backend)
+
+            save_index(index, self.path)
+            loaded = load_index(self.path)
+            self.assertEqual((loaded.backend, len(loaded)), (backend, 2000))
+            np.testing.assert_array_equal(loaded.search(queries, 10)[1], ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,202 +1,461 @@
-from fastapi import FastAPI, HTTPException
-from models import (
-    DecisionRequest,
-    DecisionResponse,
-    RuleResult,
-    ConfidenceVector
-)
-from rules_loader import load_rules
-from rule_engine import evaluate_rule
-from scoring import (
-    calculate_eligibility_score,
-    determine_deterministic_label,
-    calculate_confidence_vector,
-    apply_governance_layer
-)
-from explanations import generate_explanation
-from vector_store import vector_store
-
-import logging
-import hashlib
-import json
-from datetime import datetime
-from pathlib import Path
-
-# -------------------------------------
-# Logging Configuration
-# -------------------------------------
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = FastAPI(title="Explainable Decision Intelligence System")
-
-# -------------------------------------
-# Audit Logging Setup
-# -------------------------------------
-
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
-
-def log_decision(request_dict: dict, response_dict: dict):
-    checksum = hashlib.sha256(
-        json.dumps(request_dict, sort_keys=True).encode()
-    ).hexdigest()
-
-    entry = {
-        "timestamp": datetime.utcnow().isoformat(),
-        "input_checksum": checksum,
-        "decision_label": response_dict["decision_label"],
-        "eligibility_score": response_dict["eligibility_score"],
-        "confidence_score": response_dict["confidence_score"],
-        "confidence_vector": response_dict.get("confidence_vector"),
-        "passed_rule_ids": [r["id"] for r in response_dict["passed_rules"]],
-        "failed_rule_ids": [r["id"] for r in response_dict["failed_rules"]],
-    }
-
-    with open(LOG_DIR / "decision_logs.json", "a") as f:
-        f.write(json.dumps(entry) + "\n")
-
-# -------------------------------------
-# Health Endpoint
-# -------------------------------------
-
-@app.get("/health")
-def health_check():
-    return {"status": "ok"}
-
-# -------------------------------------
-# Get Rules Endpoint
-# -------------------------------------
-
-@app.get("/rules/{ruleset_id}")
-def get_rules(ruleset_id: str):
-    try:
-        return load_rules(ruleset_id)
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Ruleset '{ruleset_id}' not found"
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        )
-
-# -------------------------------------
-# Evaluate Endpoint
-# -------------------------------------
-
-@app.post("/evaluate", response_model=DecisionResponse)
-def evaluate(request: DecisionRequest):
-    try:
-        # 1️⃣ Load Rules
-        rules = load_rules(request.ruleset_id)
-
-        # 2️⃣ Initialize Vector Store
-        vector_store.init_index(rules)
-
-        # 3️⃣ Deterministic Rule Evaluation
-        results: list[RuleResult] = []
-
-        for rule in rules:
-            result = evaluate_rule(rule, request.user_input)
-            results.append(result)
-
-        passed_rules = [r for r in results if r.passed]
-        failed_rules = [r for r in results if not r.passed]
-
-        # 4️⃣ Eligibility Score
-        eligibility_score = calculate_eligibility_score(passed_rules)
-
-        # 5️⃣ Deterministic Label
-        deterministic_label = determine_deterministic_label(
-            passed_rules,
-            failed_rules,
-            eligibility_score
-        )
-
-        # 6️⃣ CRAG Retrieval
-        if failed_rules:
-            query = " ".join([r.name for r in failed_rules])
-        else:
-            query = "General eligibility criteria"
-
-        relevant_clauses, similarity_score = vector_store.search(
-            query,
-            k=3
-        )
-
-        # 7️⃣ Data Completeness (coverage proxy)
-        evaluated_count = len(results)
-        total_rules = len(rules)
-        data_completeness = evaluated_count / max(total_rules, 1)
-
-        # 8️⃣ Confidence Vector
-        confidence_vector_dict = calculate_confidence_vector(
-            passed_rules,
-            failed_rules,
-            total_rules,
-            similarity_score,
-            data_completeness
-        )
-
-        # Convert to Pydantic model
-        confidence_vector = ConfidenceVector(**confidence_vector_dict)
-
-        # 9️⃣ Governance Layer
-        final_label = apply_governance_layer(
-            deterministic_label,
-            confidence_vector_dict
-        )
-
-        # 🔟 Confidence Score (UI compatibility)
-        confidence_score = confidence_vector.rule_confidence
-
-        # 1️⃣1️⃣ Explanation
-        explanation_text = generate_explanation(
-            final_label,
-            passed_rules,
-            failed_rules,
-            eligibility_score,
-            confidence_score,
-            relevant_clauses,
-            confidence_vector_dict
-        )
-
-        response_obj = DecisionResponse(
-            decision_label=final_label,
-            eligibility_score=eligibility_score,
-            confidence_score=confidence_score,
-            confidence_vector=confidence_vector,
-            passed_rules=passed_rules,
-            failed_rules=failed_rules,
-            explanation_text=explanation_text
-        )
-
-        # 1️⃣2️⃣ Audit Logging
-        log_decision(request.dict(), response_obj.dict())
-
-        return response_obj
-
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Ruleset '{request.ruleset_id}' not found"
-        )
-
-    except Exception as e:
-        logger.error(f"Error processing evaluation: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        )
-
-# -------------------------------------
-# Local Run
-# -------------------------------------
-
-if __name__ == "__main__":
-    import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from models import (
+    DecisionRequest,
+    DecisionResponse,
+    MinimalDecisionResponse,
+    StandardDecisionResponse,
+    BatchDecisionRequest,
+    IncrementalDecisionRequest,
+    IncrementalDecisionResponse,
+    CounterfactualRequest,
+    CounterfactualResponse
+)
+from rules_loader import load_rules, ruleset_registry
+from counterfactual import (
+    COUNTERFACTUAL_RESULTS_LIMIT,
+    COUNTERFACTUAL_TIME_BUDGET_LIMIT_MS,
+    COUNTERFACTUAL_TIME_BUDGET_MS,
+    counterfactuals_for
+)
+from pipeline import (
+    evaluate_decision_async,
+    evaluate_batch,
+    iter_evaluate_batch,
+    reevaluate_decision,
+    explain_decision,
+    init_evaluation_worker,
+    RESPONSE_MODES
+)
+from explanations import EXPLANATION_FORMATS
+from audit_logger import audit_logger
+from decision_cache import decision_cache
+from decision_store import StaleDecision, decision_store
+from vector_store import vector_store
+from micro_batcher import retrieval_batcher
+from worker_pool import EvaluationPool, PoolSaturated
+import metrics
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Union
+
+# -------------------------------------
+# Logging Configuration
+# -------------------------------------
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# CPU-bound evaluation runs here, off the event loop
+evaluation_pool = EvaluationPool(initializer=init_evaluation_worker)
+
+# Queue depths, read at scrape time
+metrics.registry.gauge(
+    "evaluation_pool_pending",
+    "Evaluations queued or running in the worker pool.",
+    function=lambda: evaluation_pool.pending
+)
+metrics.registry.gauge(
+    "audit_queue_depth",
+    "Audit entries waiting for the writer thread.",
+    function=audit_logger.queue_depth
+)
+metrics.registry.gauge(
+    "retrieval_queue_depth",
+    "Retrieval queries waiting to be batched.",
+    function=retrieval_batcher.queue_depth
+)
+metrics.registry.gauge(
+    "stored_decisions",
+    "Decisions held for incremental re-evaluation and /explain.",
+    function=lambda: decision_store.stats()["size"]
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model in the background so /health answers at once
+    # (worker processes load their own copy instead)
+    if evaluation_pool.kind == "thread":
+        vector_store.start_loading()
+    # Pick up ruleset edits in the background, without restarts
+    ruleset_registry.start_watching()
+    yield
+    ruleset_registry.stop_watching()
+    evaluation_pool.shutdown()
+    vector_store.save_query_cache()
+    # Drain buffered audit entries before the worker exits
+    audit_logger.close()
+
+
+app = FastAPI(title="Explainable Decision Intelligence System", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """
+    Records request latency per route and, with SERVER_TIMING=1,
+    reports the pipeline stage durations in a Server-Timing header.
+    """
+    durations = metrics.start_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+
+    if metrics.SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing_header(durations, elapsed)
+    return response
+
+
+BATCH_STREAM_CHUNK_SIZE = 500
+
+ResponseMode = Literal[RESPONSE_MODES]
+ExplanationFormat = Literal[EXPLANATION_FORMATS]
+ModeResponse = Union[DecisionResponse, StandardDecisionResponse, MinimalDecisionResponse]
+
+# -------------------------------------
+# Health Endpoint
+# -------------------------------------
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok"}
+
+# -------------------------------------
+# Readiness Endpoint
+# -------------------------------------
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Ready once retrieval is warm, or permanently disabled/failed
+    (decisions then go through the governance Review path).
+    With a process pool each worker warms its own model.
+    """
+    if evaluation_pool.kind == "process":
+        return {"status": "ready", "retrieval": "per_worker"}
+
+    state = vector_store.model_state
+    body = {"status": "ready", "retrieval": state}
+
+    if vector_store.warming_up:
+        body["status"] = "loading"
+        return JSONResponse(status_code=503, content=body)
+
+    return body
+
+# -------------------------------------
+# Decision Cache Stats Endpoint
+# -------------------------------------
+
+@app.get("/cache/stats")
+def cache_stats():
+    query_cache = vector_store.query_cache
+    return {
+        "decisions": decision_cache.stats(),
+        "stored_decisions": decision_store.stats(),
+        "query_embeddings": query_cache.stats() if query_cache else None,
+        "retrieval_batches": retrieval_batcher.stats()
+    }
+
+# -------------------------------------
+# Metrics Endpoint
+# -------------------------------------
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Stage latencies, counters and queue depths in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+# -------------------------------------
+# Ruleset Versions Endpoint
+# -------------------------------------
+
+@app.get("/rules/versions")
+def ruleset_versions():
+    return ruleset_registry.versions()
+
+# -------------------------------------
+# Get Rules Endpoint
+# -------------------------------------
+
+@app.get("/rules/{ruleset_id}")
+def get_rules(ruleset_id: str):
+    try:
+        return load_rules(ruleset_id)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ruleset '{ruleset_id}' not found"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+def encoded_response(body: bytes) -> Response:
+    """
+    Serves an already-encoded decision body. Returning a `Response`
+    skips FastAPI's `response_model` validation and re-encoding; the
+    response models still document the endpoints.
+    """
+    return Response(content=body, media_type="application/json")
+
+# -------------------------------------
+# Evaluate Endpoint
+# -------------------------------------
+
+@app.post("/evaluate", response_model=ModeResponse)
+async def evaluate(
+    request: DecisionRequest,
+    detail: Literal["full", "summary"] = "full",
+    mode: ResponseMode = "full",
+    exact: bool = False
+):
+    """
+    With `detail=summary` evaluation stops once the label is decided
+    (e.g. at a failed mandatory rule); only the rules that ran are
+    listed and scored, and a one-line explanation is produced. The
+    deterministic label matches `detail=full`, but scores, retrieval
+    and governance may not; `exact=true` checks the remaining rules
+    without reasons so they match too.
+    `mode=minimal` returns the label and scores, `mode=standard` adds
+    the confidence vector and rule ids; neither renders reasons or
+    explanation text (fetch them from /explain/{decision_id}).
+    """
+    try:
+        response = await evaluate_decision_async(request, evaluation_pool, detail, mode, exact)
+        return encoded_response(response.to_json(mode))
+
+    except PoolSaturated as e:
+        logger.warning(f"Rejecting evaluation: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Evaluation capacity exhausted, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Evaluation exceeded {evaluation_pool.timeout}s"
+        )
+
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ruleset '{request.ruleset_id}' not found"
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing evaluation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+# -------------------------------------
+# Incremental Evaluate Endpoint
+# -------------------------------------
+
+@app.post("/evaluate/incremental", response_model=IncrementalDecisionResponse)
+def evaluate_incremental(request: IncrementalDecisionRequest):
+    """
+    Re-evaluates an earlier decision with some inputs changed, running
+    only the rules that read them. Returns the new decision and the
+    rules that flipped.
+    """
+    try:
+        return reevaluate_decision(request.decision_id, request.changes)
+
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Decision '{request.decision_id}' not found or expired"
+        )
+
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing incremental evaluation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+# -------------------------------------
+# Explain Endpoint
+# -------------------------------------
+
+@app.get("/explain/{decision_id}", response_model=DecisionResponse)
+def explain(decision_id: str, format: ExplanationFormat = "markdown"):
+    """
+    Full response, with reasons and explanation, for a stored decision.
+    `format=json` returns the explanation as `explanation_fragments`,
+    one per section and rule, instead of `explanation_text`.
+    """
+    try:
+        return encoded_response(explain_decision(decision_id, format).to_json("full"))
+
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Decision '{decision_id}' not found or expired"
+        )
+
+    except StaleDecision:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ruleset has changed since decision '{decision_id}'"
+        )
+
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+
+    except Exception as e:
+        logger.error(f"Error rendering explanation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+# -------------------------------------
+# Counterfactual Endpoint
+# -------------------------------------
+
+@app.post("/counterfactual", response_model=CounterfactualResponse)
+async def counterfactual(request: CounterfactualRequest):
+    """
+    Smallest input changes that would make the applicant Eligible.
+    The client's result count and time budget are capped server-side.
+    """
+    time_budget_ms = request.time_budget_ms
+    if time_budget_ms is None:
+        time_budget_ms = COUNTERFACTUAL_TIME_BUDGET_MS
+
+    try:
+        return await evaluation_pool.run(
+            counterfactuals_for,
+            request.ruleset_id,
+            request.user_input,
+            min(request.max_results, COUNTERFACTUAL_RESULTS_LIMIT),
+            min(time_budget_ms, COUNTERFACTUAL_TIME_BUDGET_LIMIT_MS)
+        )
+
+    except PoolSaturated as e:
+        logger.warning(f"Rejecting counterfactual search: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Evaluation capacity exhausted, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Counterfactual search exceeded {evaluation_pool.timeout}s"
+        )
+
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ruleset '{request.ruleset_id}' not found"
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing counterfactual search: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+# -------------------------------------
+# Batch Evaluate Endpoint
+# -------------------------------------
+
+@app.post("/evaluate/batch", response_model=List[ModeResponse])
+def evaluate_batch_endpoint(
+    request: BatchDecisionRequest,
+    stream: bool = False,
+    detail: Literal["full", "summary"] = "full",
+    mode: ResponseMode = "full",
+    exact: bool = False
+):
+    """
+    Evaluates many applicants against one ruleset.
+    With `stream=true` results are returned as NDJSON, one decision per line.
+    `detail`, `mode` and `exact` work as for /evaluate. Batch decisions are not
+    stored, so they cannot be explained later.
+    """
+    try:
+        if not stream:
+            return encoded_response(b"[" + b",".join(
+                response.to_json(mode)
+                for response in evaluate_batch(
+                    request.ruleset_id,
+                    request.user_inputs,
+                    detail,
+                    mode,
+                    exact
+                )
+            ) + b"]")
+
+        responses = iter_evaluate_batch(
+            request.ruleset_id,
+            request.user_inputs,
+            chunk_size=BATCH_STREAM_CHUNK_SIZE,
+            detail=detail,
+            mode=mode,
+            exact=exact
+        )
+
+        return StreamingResponse(
+            (response.to_json(mode) + b"\n" for response in responses),
+            media_type="application/x-ndjson"
+        )
+
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Ruleset '{request.ruleset_id}' not found"
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing batch evaluation: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+# -------------------------------------
+# Local Run
+# -------------------------------------
+
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8001)
\ No newline at end of file
@@ -0,0 +1,636 @@
+import asyncio
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from fastapi.testclient import TestClient
+
+import api
+import metrics
+import rules_loader
+import pipeline
+from audit_logger import AuditLogger
+from decision_cache import DecisionCache
+from decision_store import DecisionStore
+from worker_pool import EvaluationPool
+from api import app
+
+SAMPLE_RULES = [
+    {
+        "id": "R1",
+        "name": "Income Limit",
+        "condition_expression": "income <= 800000",
+        "variables_required": ["income"],
+        "outcome_effect": {"eligible": True, "score_delta": 40},
+        "priority": "high",
+        "mandatory": True,
+        "document_reference": {"doc_id": "scholarship_policy", "page": 2, "section": "3.1"},
+        "human_description": "Annual family income must not exceed 8 lakh."
+    },
+    {
+        "id": "R2",
+        "name": "Domicile",
+        "condition_expression": "state == 'Delhi'",
+        "variables_required": ["state"],
+        "outcome_effect": {"eligible": True, "score_delta": 40},
+        "priority": "high",
+        "mandatory": False,
+        "document_reference": {"doc_id": "scholarship_policy", "page": 2, "section": "3.2"},
+        "human_description": "Applicant must be a resident of Delhi."
+    },
+    {
+        "id": "R3",
+        "name": "Age Limit",
+        "condition_expression": "age >= 17 and age <= 25",
+        "variables_required": ["age"],
+        "outcome_effect": {"eligible": True, "score_delta": 20},
+        "priority": "medium",
+        "mandatory": False,
+        "document_reference": {"doc_id": "scholarship_policy", "page": 3, "section": "3.4"},
+        "human_description": "Applicant age must be between 17 and 25."
+    }
+]
+
+
+class APITestCase(unittest.TestCase):
+    """
+    Runs the API against a temporary rules and logs directory.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rules_dir = os.path.join(self.tmp_dir, "rules")
+        os.makedirs(rules_dir)
+        with open(os.path.join(rules_dir, "test_rules.json"), "w") as f:
+            json.dump(SAMPLE_RULES, f)
+
+        self._old_rules_dir = rules_loader.RULES_DIR
+        self._old_audit_logger = pipeline.audit_logger
+        self._old_decision_cache = pipeline.decision_cache
+        self._old_decision_store = pipeline.decision_store
+        rules_loader.RULES_DIR = rules_dir
+        pipeline.audit_logger = AuditLogger(self.tmp_dir)
+        pipeline.decision_cache = DecisionCache()
+        pipeline.decision_store = DecisionStore()
+        rules_loader.ruleset_registry.clear()
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        rules_loader.RULES_DIR = self._old_rules_dir
+        pipeline.audit_logger.close()
+        pipeline.audit_logger = self._old_audit_logger
+        pipeline.decision_cache = self._old_decision_cache
+        pipeline.decision_store = self._old_decision_store
+        rules_loader.ruleset_registry.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_rules(self, rules):
+        path = os.path.join(rules_loader.RULES_DIR, "test_rules.json")
+        with open(path, "w") as f:
+            json.dump(rules, f)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read_audit_log(self):
+        return list(pipeline.audit_logger.range())
+
+
+class TestEvaluate(APITestCase):
+    def test_evaluate(self):
+        response = self.client.post("/evaluate", json={
+            "ruleset_id": "test_rules",
+            "user_input": {"income": 500000, "state": "Delhi", "age": 19}
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["eligibility_score"], 100)
+        self.assertEqual(len(body["passed_rules"]), 3)
+        self.assertEqual(len(self.read_audit_log()), 1)
+
+    def test_unknown_ruleset(self):
+        response = self.client.post("/evaluate", json={
+            "ruleset_id": "missing",
+            "user_input": {}
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class TestDecisionCache(APITestCase):
+    payload = {
+        "ruleset_id": "test_rules",
+        "user_input": {"income": 500000, "state": "Delhi", "age": 19}
+    }
+
+    def test_repeat_request_is_cached_and_audited(self):
+        first = self.client.post("/evaluate", json=self.payload).json()
+        second = self.client.post("/evaluate", json=self.payload).json()
+        self.assertEqual(first, second)
+
+        entries = self.read_audit_log()
+        self.assertEqual([e["cache_hit"] for e in entries], [False, True])
+        self.assertEqual(entries[0]["input_checksum"], entries[1]["input_checksum"])
+        self.assertEqual(pipeline.decision_cache.stats()["hits"], 1)
+
+    def test_ruleset_change_invalidates(self):
+        self.client.post("/evaluate", json=self.payload)
+
+        changed = [dict(rule) for rule in SAMPLE_RULES]
+        changed[2] = dict(changed[2], condition_expression="age >= 21")
+        self.write_rules(changed)
+
+        body = self.client.post("/evaluate", json=self.payload).json()
+        self.assertEqual(body["eligibility_score"], 80)
+        self.assertEqual([e["cache_hit"] for e in self.read_audit_log()], [False, False])
+
+
+class TestRulesetReload(APITestCase):
+    payload = TestDecisionCache.payload
+
+    def test_reports_version_and_rejects_invalid_update(self):
+        body = self.client.post("/evaluate", json=self.payload).json()
+        version = body["ruleset_version"]
+        self.assertEqual(self.client.get("/rules/versions").json(), {"test_rules": version})
+
+        path = os.path.join(rules_loader.RULES_DIR, "test_rules.json")
+        with open(path, "w") as f:
+            f.write("[{not json")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+
+        body = self.client.post("/evaluate", json=self.payload).json()
+        self.assertEqual(body["ruleset_version"], version)
+        self.assertEqual(self.read_audit_log()[-1]["ruleset_version"], version)
+
+    def test_rejected_file_is_parsed_once(self):
+        registry = rules_loader.RulesetRegistry()
+        first = registry.get("test_rules")
+
+        path = os.path.join(rules_loader.RULES_DIR, "test_rules.json")
+        with open(path, "w") as f:
+            f.write("[{not json")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+
+        parse = rules_loader.parse_ruleset
+        calls = []
+
+        def counting_parse(ruleset_id):
+            calls.append(ruleset_id)
+            return parse(ruleset_id)
+
+        rules_loader.parse_ruleset = counting_parse
+        try:
+            for _ in range(3):
+                self.assertIs(registry.get("test_rules"), first)
+                registry.poll()
+            self.assertEqual(len(calls), 1)
+
+            self.write_rules(SAMPLE_RULES[:1])
+            self.assertEqual(len(registry.get("test_rules").rules), 1)
+            self.assertEqual(len(calls), 2)
+        finally:
+            rules_loader.parse_ruleset = parse
+
+    def test_ruleset_loads_off_the_event_loop(self):
+        parse = rules_loader.parse_ruleset
+        threads = []
+
+        def recording_parse(ruleset_id):
+            threads.append(threading.get_ident())
+            return parse(ruleset_id)
+
+        rules_loader.parse_ruleset = recording_parse
+        try:
+            asyncio.run(pipeline.evaluate_decision_async(
+                pipeline.DecisionRequest(**self.payload),
+                api.evaluation_pool
+            ))
+        finally:
+            rules_loader.parse_ruleset = parse
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    def test_watcher_swaps_new_version(self):
+        registry = rules_loader.RulesetRegistry(watch_interval=0.01)
+        first = registry.get("test_rules")
+
+        registry.start_watching()
+        try:
+            self.write_rules(SAMPLE_RULES[:1])
+            for _ in range(200):
+                if registry.get("test_rules") is not first:
+                    break
+                time.sleep(0.01)
+        finally:
+            registry.stop_watching()
+
+        self.assertEqual(len(registry.get("test_rules").rules), 1)
+
+
+class TestEvaluateBatch(APITestCase):
+    user_inputs = [
+        {"income": 500000, "state": "Delhi", "age": 19},
+        {"income": 900000, "state": "Delhi", "age": 19},
+        {"income": 500000, "state": "UP", "age": 30},
+    ]
+
+    def test_batch_matches_single(self):
+        response = self.client.post("/evaluate/batch", json={
+            "ruleset_id": "test_rules",
+            "user_inputs": self.user_inputs
+        })
+        self.assertEqual(response.status_code, 200)
+        batch = response.json()
+        self.assertEqual(len(batch), 3)
+
+        for user_input, item in zip(self.user_inputs, batch):
+            single = self.client.post("/evaluate", json={
+                "ruleset_id": "test_rules",
+                "user_input": user_input
+            }).json()
+            # Only single decisions get an id for incremental re-evaluation
+            self.assertIsNone(item.pop("decision_id"))
+            self.assertIsNotNone(single.pop("decision_id"))
+            self.assertEqual(item, single)
+
+        checksums = [entry["input_checksum"] for entry in self.read_audit_log()]
+        self.assertEqual(checksums[:3], checksums[3:])
+
+    def test_batch_stream(self):
+        response = self.client.post(
+            "/evaluate/batch?stream=true",
+            json={"ruleset_id": "test_rules", "user_inputs": self.user_inputs}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(
+            [line["eligibility_score"] for line in lines],
+            [100, 60, 40]
+        )
+
+    def test_batch_unknown_ruleset(self):
+        response = self.client.post(
+            "/evaluate/batch?stream=true",
+            json={"ruleset_id": "missing", "user_inputs": self.user_inputs}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class TestSummaryDetail(APITestCase):
+    def evaluate(self, user_input, detail, exact=False):
+        query = f"detail={detail}&exact=true" if exact else f"detail={detail}"
+        return self.client.post(f"/evaluate?{query}", json={
+            "ruleset_id": "test_rules",
+            "user_input": user_input
+        }).json()
+
+    def test_mandatory_failure_short_circuits(self):
+        body = self.evaluate({"income": 900000, "state": "Delhi", "age": 19}, "summary")
+        self.assertEqual(body["rules_skipped"], 2)
+        self.assertEqual([r["id"] for r in body["failed_rules"]], ["R1"])
+        self.assertEqual(body["passed_rules"], [])
+        self.assertIsNone(body["decision_id"])
+        self.assertNotIn("\n", body["explanation_text"])
+
+    def test_decided_score_short_circuits(self):
+        user_input = {"income": 500000, "state": "Delhi", "age": 19}
+        summary = self.evaluate(user_input, "summary")
+        full = self.evaluate(user_input, "full")
+
+        # R1 + R2 reach 80; R3 can only add, so the label is settled
+        self.assertEqual(summary["rules_skipped"], 1)
+        self.assertEqual([r["id"] for r in summary["passed_rules"]], ["R1", "R2"])
+        self.assertEqual(summary["eligibility_score"], 80)
+        self.assertEqual(full["rules_skipped"], 0)
+        self.assertEqual(full["eligibility_score"], 100)
+        self.assertEqual([e["cache_hit"] for e in self.read_audit_log()], [False, False])
+
+    def test_decided_rules_are_not_evaluated(self):
+        ruleset = pipeline.load_ruleset("test_rules")
+        evaluate = pipeline.evaluate_compiled_rule
+        evaluated = []
+
+        def counting_evaluate(compiled, user_input, explain=True):
+            evaluated.append(compiled.rule.id)
+            return evaluate(compiled, user_input, explain)
+
+        pipeline.evaluate_compiled_rule = counting_evaluate
+        try:
+            passed, failed, skipped, _ = pipeline.evaluate_rules_short_circuit(
+                ruleset, {"income": 900000, "state": "Delhi", "age": 19}
+            )
+        finally:
+            pipeline.evaluate_compiled_rule = evaluate
+
+        self.assertEqual(evaluated, ["R1"])
+        self.assertEqual((len(passed), len(failed), skipped), (0, 1, 2))
+
+    def test_exact_summary_matches_full(self):
+        inputs = TestEvaluateBatch.user_inputs + [
+            {"income": 500000, "state": "UP", "age": 19},
+            {"income": 900000, "state": "UP", "age": 40},
+            {"state": "Delhi"},
+        ]
+        ruleset = pipeline.load_ruleset("test_rules")
+
+        for user_input in inputs:
+            summary = self.evaluate(user_input, "summary", exact=True)
+            full = self.evaluate(user_input, "full")
+            self.assertEqual(summary["rules_skipped"], 0)
+            for key in ("decision_label", "eligibility_score", "confidence_score", "confidence_vector"):
+                self.assertEqual(summary[key], full[key], (user_input, key))
+
+            # Retrieval (and so governance) sees the same failures, in ruleset order
+            _, failed, _, _ = pipeline.evaluate_rules_short_circuit(ruleset, user_input, exact=True)
+            _, full_failed = pipeline.evaluate_rules(ruleset.compiled, user_input)
+            self.assertEqual(pipeline.retrieval_query(failed), pipeline.retrieval_query(full_failed))
+
+    def test_undecided_runs_every_rule(self):
+        body = self.evaluate({"income": 500000, "state": "UP", "age": 19}, "summary")
+        self.assertEqual(body["rules_skipped"], 0)
+        self.assertEqual(body["eligibility_score"], 60)
+
+    def test_batch_summary(self):
+        response = self.client.post("/evaluate/batch?detail=summary", json={
+            "ruleset_id": "test_rules",
+            "user_inputs": TestEvaluateBatch.user_inputs
+        })
+        self.assertEqual(
+            [item["rules_skipped"] for item in response.json()],
+            [1, 2, 0]
+        )
+
+    def test_invalid_detail(self):
+        response = self.client.post("/evaluate?detail=verbose", json=TestDecisionCache.payload)
+        self.assertEqual(response.status_code, 422)
+
+
+class TestResponseModes(APITestCase):
+    payload = {
+        "ruleset_id": "test_rules",
+        "user_input": {"income": 900000, "state": "Delhi", "age": 19}
+    }
+
+    def evaluate(self, mode):
+        return self.client.post(f"/evaluate?mode={mode}", json=self.payload).json()
+
+    def test_minimal_and_standard_fields(self):
+        minimal = self.evaluate("minimal")
+        self.assertEqual(set(minimal), {
+            "decision_label", "eligibility_score", "confidence_score",
+            "ruleset_version", "decision_id", "rules_skipped"
+        })
+
+        standard = self.evaluate("standard")
+        self.assertEqual(standard["failed_rule_ids"], ["R1"])
+        self.assertEqual(standard["passed_rule_ids"], ["R2", "R3"])
+        self.assertNotIn("explanation_text", standard)
+
+        # Minimal and standard share one cached decision without reasons
+        self.assertEqual([e["cache_hit"] for e in self.read_audit_log()], [False, True])
+        self.assertEqual(self.read_audit_log()[0]["failed_rule_ids"], ["R1"])
+
+    def test_encoded_body_matches_response_model(self):
+        for mode in ("minimal", "standard", "full"):
+            response = self.client.post(f"/evaluate?mode={mode}", json=self.payload)
+            self.assertEqual(response.headers["content-type"], "application/json")
+
+            decision = asyncio.run(pipeline.evaluate_decision_async(
+                pipeline.DecisionRequest(**self.payload),
+                api.evaluation_pool,
+                mode=mode
+            ))
+            self.assertIs(decision.to_json(mode), decision.to_json(mode))
+            self.assertEqual(
+                response.json(),
+                json.loads(decision.to_response(mode).json())
+            )
+
+    def test_explain_renders_deferred_reasons(self):
+        minimal = self.evaluate("minimal")
+        full = self.evaluate("full")
+
+        response = self.client.get(f"/explain/{minimal['decision_id']}")
+        self.assertEqual(response.status_code, 200)
+        explained = response.json()
+
+        self.assertEqual(explained["decision_id"], minimal["decision_id"])
+        for key in ("passed_rules", "failed_rules", "explanation_text", "decision_label"):
+            self.assertEqual(explained[key], full[key])
+        self.assertEqual(explained["failed_rules"][0]["suggestion"], "Decrease income by 100000.00")
+
+    def test_explain_formats(self):
+        decision_id = self.evaluate("minimal")["decision_id"]
+
+        text = self.client.get(f"/explain/{decision_id}?format=text").json()
+        self.assertTrue(text["explanation_text"].startswith("Final Decision: "))
+        self.assertNotIn("**", text["explanation_text"])
+
+        fragments = self.client.get(f"/explain/{decision_id}?format=json").json()["explanation_fragments"]
+        failed = [f for f in fragments if f["section"] == "failed_rule"]
+        self.assertEqual([f["rule_id"] for f in failed], ["R1"])
+        self.assertIn("Suggestion: Decrease income by 100000.00", failed[0]["text"])
+        self.assertEqual(
+            [f["rule_id"] for f in fragments if f["section"] == "passed_rule"],
+            ["R2", "R3"]
+        )
+
+        response = self.client.get(f"/explain/{decision_id}?format=html")
+        self.assertEqual(response.status_code, 422)
+        response = self.client.post("/evaluate?mode=compact", json=self.payload)
+        self.assertEqual(response.status_code, 422)
+
+    def test_incremental_after_minimal(self):
+        minimal = self.evaluate("minimal")
+        body = self.client.post("/evaluate/incremental", json={
+            "decision_id": minimal["decision_id"],
+            "changes": {"age": 30}
+        }).json()
+        self.assertTrue(all(r["reason"] for r in body["decision"]["passed_rules"]))
+        self.assertTrue(body["decision"]["explanation_text"])
+
+    def test_explain_unknown_or_stale(self):
+        self.assertEqual(self.client.get("/explain/missing").status_code, 404)
+
+        minimal = self.evaluate("minimal")
+        self.write_rules(SAMPLE_RULES[:2])
+        response = self.client.get(f"/explain/{minimal['decision_id']}")
+        self.assertEqual(response.status_code, 409)
+
+    def test_batch_minimal(self):
+        response = self.client.post("/evaluate/batch?mode=minimal", json={
+            "ruleset_id": "test_rules",
+            "user_inputs": TestEvaluateBatch.user_inputs
+        })
+        body = response.json()
+        self.assertEqual([item["eligibility_score"] for item in body], [100, 60, 40])
+        self.assertTrue(all("passed_rules" not in item for item in body))
+
+
+class TestIncrementalEvaluate(APITestCase):
+    payload = TestDecisionCache.payload
+
+    def reevaluate(self, decision_id, changes):
+        return self.client.post("/evaluate/incremental", json={
+            "decision_id": decision_id,
+            "changes": changes
+        })
+
+    def test_only_affected_rules_rerun(self):
+        first = self.client.post("/evaluate", json=self.payload).json()
+
+        response = self.reevaluate(first["decision_id"], {"age": 30})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+
+        self.assertEqual(body["changed_variables"], ["age"])
+        self.assertEqual(body["reevaluated_rule_ids"], ["R3"])
+        self.assertEqual(body["flipped_rules"], [
+            {"id": "R3", "name": "Age Limit", "previously_passed": True, "passed": False}
+        ])
+        self.assertEqual(body["decision"]["eligibility_score"], 80)
+        self.assertNotEqual(body["decision"]["decision_id"], first["decision_id"])
+
+        # Same outcome as a full evaluation of the merged input
+        full = self.client.post("/evaluate", json={
+            "ruleset_id": "test_rules",
+            "user_input": dict(self.payload["user_input"], age=30)
+        }).json()
+        for key in ("eligibility_score", "passed_rules", "failed_rules", "confidence_vector"):
+            self.assertEqual(body["decision"][key], full[key])
+
+        self.assertEqual(len(self.read_audit_log()), 3)
+
+    def test_chained_and_unchanged_values(self):
+        first = self.client.post("/evaluate", json=self.payload).json()
+        second = self.reevaluate(first["decision_id"], {"income": 900000}).json()
+        third = self.reevaluate(second["decision"]["decision_id"], {"income": 900000}).json()
+
+        self.assertEqual([r["id"] for r in second["decision"]["failed_rules"]], ["R1"])
+        self.assertEqual(third["changed_variables"], [])
+        self.assertEqual(third["reevaluated_rule_ids"], [])
+        self.assertEqual(third["decision"]["eligibility_score"], 60)
+
+    def test_ruleset_change_reruns_everything(self):
+        first = self.client.post("/evaluate", json=self.payload).json()
+        self.write_rules(SAMPLE_RULES[:2])
+
+        body = self.reevaluate(first["decision_id"], {"age": 30}).json()
+        self.assertEqual(body["reevaluated_rule_ids"], ["R1", "R2"])
+        self.assertEqual(body["decision"]["eligibility_score"], 80)
+
+    def test_unknown_decision(self):
+        self.assertEqual(self.reevaluate("missing", {"age": 30}).status_code, 404)
+
+
+class TestCounterfactual(APITestCase):
+    def test_counterfactual(self):
+        response = self.client.post("/counterfactual", json={
+            "ruleset_id": "test_rules",
+            "user_input": {"income": 900000, "state": "Delhi", "age": 19}
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["deterministic_label"], "Not Eligible")
+        self.assertEqual(body["counterfactuals"][0]["changes"], [
+            {"variable": "income", "current": 900000, "proposed": 800000}
+        ])
+
+    def test_client_limits_are_capped(self):
+        limit = api.COUNTERFACTUAL_RESULTS_LIMIT
+        api.COUNTERFACTUAL_RESULTS_LIMIT = 0
+        try:
+            response = self.client.post("/counterfactual", json={
+                "ruleset_id": "test_rules",
+                "user_input": {"income": 900000, "state": "Delhi", "age": 19},
+                "max_results": 50,
+                "time_budget_ms": 1e9
+            })
+        finally:
+            api.COUNTERFACTUAL_RESULTS_LIMIT = limit
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["counterfactuals"], [])
+
+    def test_unknown_ruleset(self):
+        response = self.client.post("/counterfactual", json={
+            "ruleset_id": "missing",
+            "user_input": {}
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class TestMetrics(APITestCase):
+    payload = TestDecisionCache.payload
+
+    def test_counters_and_stage_histograms(self):
+        hits = metrics.CACHE_LOOKUPS.value(result="hit")
+        missing = metrics.RULE_ERRORS.value(kind="missing_input")
+        evals = metrics.STAGE_SECONDS.count(stage="eval")
+
+        self.client.post("/evaluate", json=self.payload)
+        self.client.post("/evaluate", json=self.payload)
+        self.client.post("/evaluate", json={"ruleset_id": "test_rules", "user_input": {"income": 1}})
+
+        self.assertEqual(metrics.CACHE_LOOKUPS.value(result="hit"), hits + 1)
+        self.assertEqual(metrics.RULE_ERRORS.value(kind="missing_input"), missing + 2)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="eval"), evals + 2)
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('decision_stage_seconds_bucket{stage="retrieve",le="+Inf"}', response.text)
+        self.assertIn('route="/evaluate",status="200"', response.text)
+        self.assertIn("evaluation_pool_pending ", response.text)
+
+    def test_server_timing_header(self):
+        old = metrics.SERVER_TIMING
+        metrics.SERVER_TIMING = True
+        try:
+            response = self.client.post("/evaluate", json=self.payload)
+        finally:
+            metrics.SERVER_TIMING = old
+
+        stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+        for stage in ("cache", "load", "eval", "retrieve", "score", "explain", "audit", "total"):
+            self.assertIn(stage, stages)
+        self.assertNotIn("server-timing", self.client.post("/evaluate", json=self.payload).headers)
+
+
+class TestBackpressure(APITestCase):
+    payload = TestDecisionCache.payload
+
+    def setUp(self):
+        super().setUp()
+        self._old_pool = api.evaluation_pool
+        self._old_compute = pipeline.compute_decision
+
+    def tearDown(self):
+        api.evaluation_pool.shutdown()
+        api.evaluation_pool = self._old_pool
+        pipeline.compute_decision = self._old_compute
+        super().tearDown()
+
+    def test_saturated_pool_rejects(self):
+        api.evaluation_pool = EvaluationPool(workers=1, max_pending=0)
+        response = self.client.post("/evaluate", json=self.payload)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "1")
+        self.assertEqual(self.read_audit_log(), [])
+
+    def test_slow_evaluation_times_out(self):
+        def slow_compute(*args):
+            time.sleep(0.5)
+            return self._old_compute(*args)
+
+        pipeline.compute_decision = slow_compute
+        api.evaluation_pool = EvaluationPool(workers=1, max_pending=4, timeout=0.05)
+
+        response = self.client.post("/evaluate", json=self.payload)
+        self.assertEqual(response.status_code, 504)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,778 @@
-import json
-import hashlib
-from datetime import datetime
-from pathlib import Path
-
-LOG_PATH = Path("logs")
-LOG_PATH.mkdir(exist_ok=True)
-
-def log_decision(request, response):
-    payload_str = json.dumps(request, sort_keys=True)
-    checksum = hashlib.sha256(payload_str.encode()).hexdigest()
-
-    log_entry = {
-        "timestamp": datetime.utcnow().isoformat(),
-        "input_checksum": checksum,
-        "decision_label": response["decision_label"],
-        "eligibility_score": response["eligibility_score"],
-        "confidence": response.get("confidence_vector", {}),
-        "passed_rules": [r["id"] for r in response["passed_rules"]],
-        "failed_rules": [r["id"] for r in response["failed_rules"]],
-    }
-
-    with open(LOG_PATH / "decision_logs.json", "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
\ No newline at end of file
+import asyncio
+import atexit
+import bisect
+import json
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Advisory locks let several processes append to one log and chain
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    FILE_LOCKS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+LOG_PATH = Path("logs")
+LOG_PREFIX = "decision_logs"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+LOCK_FILE = ".lock"
+
+GENESIS_HASH = "0" * 64
+
+# Enough of an index file's end to hold its last few records
+_INDEX_TAIL_BYTES = 4096
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# "always": fsync every group commit
+# "interval": fsync at most every AUDIT_FSYNC_INTERVAL seconds
+# "never": leave durability to the OS page cache
+FSYNC_POLICY = os.getenv("AUDIT_FSYNC", "interval")
+FSYNC_INTERVAL = float(os.getenv("AUDIT_FSYNC_INTERVAL", "1.0"))
+
+QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "512"))
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2"))
+
+MAX_FILE_BYTES = int(os.getenv("AUDIT_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+MAX_FILE_AGE = float(os.getenv("AUDIT_MAX_FILE_AGE", "0"))  # seconds, 0 = off
+
+# A batch that fails to write is kept and retried after this many
+# seconds; on shutdown it gets this many last attempts
+WRITE_RETRY_DELAY = float(os.getenv("AUDIT_WRITE_RETRY_DELAY", "0.5"))
+WRITE_RETRIES_ON_CLOSE = 3
+
+
+# -----------------------------------
+# Audit Entries
+# -----------------------------------
+
+def input_checksum(request: dict) -> str:
+    """
+    SHA-256 of the canonical (key-sorted) request JSON.
+    """
+    payload_str = json.dumps(request, sort_keys=True)
+    return hashlib.sha256(payload_str.encode()).hexdigest()
+
+
+def build_audit_entry(
+    request: dict,
+    response: dict,
+    checksum: Optional[str] = None,
+    cache_hit: bool = False
+) -> dict:
+    """
+    `response` is a full or standard-mode response dict; the standard
+    one already carries just the rule ids. Reasons are never recorded,
+    so the entry is the same whichever mode the client asked for.
+    """
+    if "passed_rule_ids" in response:
+        passed_ids = response["passed_rule_ids"]
+        failed_ids = response["failed_rule_ids"]
+    else:
+        passed_ids = [r["id"] for r in response["passed_rules"]]
+        failed_ids = [r["id"] for r in response["failed_rules"]]
+
+    return {
+        "input_checksum": checksum or input_checksum(request),
+        "decision_label": response["decision_label"],
+        "eligibility_score": response["eligibility_score"],
+        "confidence_score": response["confidence_score"],
+        "confidence_vector": response.get("confidence_vector"),
+        "passed_rule_ids": passed_ids,
+        "failed_rule_ids": failed_ids,
+        "ruleset_version": response.get("ruleset_version"),
+        "cache_hit": cache_hit,
+    }
+
+
+def canonical_json(body: dict) -> str:
+    """
+    Key-sorted, compact JSON that entry hashes are computed over.
+    Always stdlib json, so hashes don't depend on the installed
+    serialization backend.
+    """
+    return json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+
+def chain_hash(prev_hash: str, entry: dict) -> str:
+    """
+    Hash of an entry (without its own `entry_hash`) chained to the
+    previous entry's hash.
+    """
+    body = {k: v for k, v in entry.items() if k != "entry_hash"}
+    return hashlib.sha256((prev_hash + canonical_json(body)).encode()).hexdigest()
+
+
+# -----------------------------------
+# Segments & Sidecar Indexes
+# -----------------------------------
+
+def segment_path(log_dir: Path, seq: int) -> Path:
+    return log_dir / f"{LOG_PREFIX}.{seq:06d}{SEGMENT_SUFFIX}"
+
+
+def index_path(segment: Path) -> Path:
+    return segment.with_suffix(INDEX_SUFFIX)
+
+
+def list_segments(log_dir: Path) -> List[Tuple[int, Path]]:
+    segments = []
+    for path in log_dir.glob(f"{LOG_PREFIX}.*{SEGMENT_SUFFIX}"):
+        seq = path.name[len(LOG_PREFIX) + 1:-len(SEGMENT_SUFFIX)]
+        if seq.isdigit():
+            segments.append((int(seq), path))
+    return sorted(segments)
+
+
+def _index_record(entry: dict, offset: int, length: int) -> str:
+    return json.dumps({
+        "ts": entry["timestamp"],
+        "checksum": entry["input_checksum"],
+        "offset": offset,
+        "length": length
+    }) + "\n"
+
+
+class SegmentIndex:
+    """
+    In-memory view of one segment's sidecar index.
+    Timestamps are sorted, so time ranges are found by bisection.
+    """
+
+    def __init__(self, records: List[dict]):
+        self.timestamps = [r["ts"] for r in records]
+        self.locations = [(r["offset"], r["length"]) for r in records]
+        self.by_checksum: Dict[str, List[int]] = {}
+        for i, r in enumerate(records):
+            self.by_checksum.setdefault(r["checksum"], []).append(i)
+
+    @classmethod
+    def load(cls, path: Path) -> "SegmentIndex":
+        records = []
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        records.append(json.loads(line))
+        return cls(records)
+
+
+# -----------------------------------
+# Reader
+# -----------------------------------
+
+class AuditLogReader:
+    """
+    Query API over the segmented audit log.
+
+    Lookups go through the sidecar indexes and then seek straight to
+    the matching entries instead of scanning the log.
+    """
+
+    def __init__(self, log_dir: Path = LOG_PATH):
+        self.log_dir = Path(log_dir)
+        self._indexes: Dict[Path, Tuple[Tuple[float, int], SegmentIndex]] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, segment: Path) -> SegmentIndex:
+        idx_path = index_path(segment)
+        try:
+            stat = idx_path.stat()
+            version = (stat.st_mtime, stat.st_size)
+        except FileNotFoundError:
+            version = (0.0, 0)
+
+        with self._lock:
+            cached = self._indexes.get(segment)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        index = SegmentIndex.load(idx_path)
+        with self._lock:
+            self._indexes[segment] = (version, index)
+        return index
+
+    @staticmethod
+    def _read_at(f, location: Tuple[int, int]) -> dict:
+        offset, length = location
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+    def find_by_checksum(self, checksum: str) -> List[dict]:
+        """
+        All decisions logged for a given input checksum, oldest first.
+        """
+        matches = []
+        for _, segment in list_segments(self.log_dir):
+            index = self._index(segment)
+            positions = index.by_checksum.get(checksum)
+            if not positions:
+                continue
+            with open(segment, "rb") as f:
+                for i in positions:
+                    matches.append(self._read_at(f, index.locations[i]))
+        return matches
+
+    def range(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> Iterator[dict]:
+        """
+        Entries with `start <= timestamp < end` (ISO-8601 strings or
+        datetimes). Open bounds are allowed.
+        """
+        if isinstance(start, datetime):
+            start = start.isoformat()
+        if isinstance(end, datetime):
+            end = end.isoformat()
+
+        for _, segment in list_segments(self.log_dir):
+            index = self._index(segment)
+            if not index.timestamps:
+                continue
+            if start is not None and index.timestamps[-1] < start:
+                continue
+            if end is not None and index.timestamps[0] >= end:
+                break
+
+            lo = 0 if start is None else bisect.bisect_left(index.timestamps, start)
+            hi = len(index.timestamps) if end is None else bisect.bisect_left(index.timestamps, end)
+            if lo >= hi:
+                continue
+
+            # Matching entries are contiguous: seek once, read sequentially
+            with open(segment, "rb") as f:
+                f.seek(index.locations[lo][0])
+                for _ in range(hi - lo):
+                    yield json.loads(f.readline())
+
+    def verify_chain(self) -> Tuple[bool, Optional[str]]:
+        """
+        Recomputes the hash chain across all segments.
+        Returns (ok, description of the first broken link).
+        """
+        prev_hash = GENESIS_HASH
+        for _, segment in list_segments(self.log_dir):
+            with open(segment, "rb") as f:
+                for line_no, line in enumerate(f, start=1):
+                    entry = json.loads(line)
+                    if (
+                        entry.get("prev_hash") != prev_hash
+                        or chain_hash(prev_hash, entry) != entry.get("entry_hash")
+                    ):
+                        return False, f"{segment.name} line {line_no}"
+                    prev_hash = entry["entry_hash"]
+        return True, None
+
+
+# -----------------------------------
+# Background Writer
+# -----------------------------------
+
+class AuditLogger:
+    """
+    Buffered, hash-chained audit log writer.
+
+    Request handlers only enqueue entries. A background thread drains
+    the bounded queue, chains and writes each batch with a single write
+    call (group commit), appends the matching sidecar index records,
+    fsyncs according to `fsync_policy` and starts a new segment by size
+    or age. When the queue is full, producers block rather than drop
+    entries.
+
+    Processes sharing a log directory take a file lock per batch and
+    pick up the chain tail (and any new segment) left by the others
+    before appending, so they extend one chain.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path = LOG_PATH,
+        fsync_policy: str = FSYNC_POLICY,
+        fsync_interval: float = FSYNC_INTERVAL,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        max_file_age: float = MAX_FILE_AGE
+    ):
+        if fsync_policy not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'")
+
+        self.log_dir = Path(log_dir)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_file_age = max_file_age
+
+        self.reader = AuditLogReader(self.log_dir)
+
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._seq = 0
+        self._end = 0
+        self._last_timestamp = ""
+        self._file = None
+        self._index_file = None
+        self._lock_file = None
+        self._file_opened_at = 0.0
+        self._last_fsync = 0.0
+        self._prev_hash: Optional[str] = None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # -----------------------------------
+    # Producer API
+    # -----------------------------------
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    # Otherwise producers would block on a queue nobody drains
+                    logger.error("Audit writer thread stopped, restarting it")
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="audit-writer",
+                    daemon=True
+                )
+                self._thread.start()
+
+    @staticmethod
+    def _stamp(entry: dict) -> dict:
+        return {"timestamp": datetime.utcnow().isoformat(), **entry}
+
+    def log(self, entry: dict):
+        """
+        Enqueues an entry, blocking while the queue is full. No lock is
+        held while waiting. The timestamp is assigned here; the writer
+        moves it forward past any later-stamped entry already written,
+        so the log (and its index) stays ordered by time.
+        """
+        self._ensure_started()
+        self._queue.put(self._stamp(entry))
+
+    def try_log(self, entry: dict) -> bool:
+        """
+        Like `log`, but returns False instead of blocking on a full queue.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(self._stamp(entry))
+        except queue.Full:
+            return False
+        return True
+
+    async def alog_decision(
+        self,
+        request: dict,
+        response: dict,
+        checksum: Optional[str] = None,
+        cache_hit: bool = False
+    ):
+        """
+        Event-loop friendly `log_decision`: enqueues without blocking, and
+        only waits for queue space on a worker thread.
+        """
+        entry = build_audit_entry(request, response, checksum, cache_hit)
+        if not self.try_log(entry):
+            await asyncio.to_thread(self.log, entry)
+
+    def log_decision(
+        self,
+        request: dict,
+        response: dict,
+        checksum: Optional[str] = None,
+        cache_hit: bool = False
+    ):
+        self.log(build_audit_entry(request, response, checksum, cache_hit))
+
+    def log_decisions(self, pairs: List[Tuple[dict, dict]]):
+        for request, response in pairs:
+            self.log(build_audit_entry(request, response))
+
+    def flush(self):
+        """
+        Blocks until every entry enqueued so far is written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Flushes pending entries and stops the writer thread.
+        Logging again afterwards starts a new writer.
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    # -----------------------------------
+    # Query API
+    # -----------------------------------
+
+    def find_by_checksum(self, checksum: str) -> List[dict]:
+        self.flush()
+        return self.reader.find_by_checksum(checksum)
+
+    def range(self, start=None, end=None) -> Iterator[dict]:
+        self.flush()
+        return self.reader.range(start, end)
+
+    def verify_chain(self) -> Tuple[bool, Optional[str]]:
+        self.flush()
+        return self.reader.verify_chain()
+
+    # -----------------------------------
+    # Writer Thread
+    # -----------------------------------
+
+    @contextmanager
+    def _locked(self):
+        """
+        Exclusive lock on the log directory, held while a batch is
+        chained and written, so several processes (e.g. uvicorn
+        workers) can share one log and one hash chain.
+        """
+        if not FILE_LOCKS_AVAILABLE:
+            yield
+            return
+
+        if self._lock_file is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.log_dir / LOCK_FILE, "a")
+
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _recover_segment(self, segment: Path) -> Tuple[Optional[dict], int]:
+        """
+        Brings a segment's index in line with its log (after an unclean
+        shutdown or a failed write) and returns (last entry or None if
+        the segment is empty, end offset). Only the entries after the
+        last indexed one are read.
+        """
+        idx_path = index_path(segment)
+        last = None
+
+        with open(idx_path, "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - _INDEX_TAIL_BYTES, 0))
+            tail = f.read()
+            complete = tail[:tail.rfind(b"\n") + 1]
+            if len(complete) != len(tail):
+                # Torn index record
+                f.truncate(size - len(tail) + len(complete))
+            if complete:
+                last = json.loads(complete.splitlines()[-1])
+
+        offset = last["offset"] + last["length"] if last else 0
+        last_entry = None
+        records = []
+
+        with open(segment, "r+b") as f:
+            if last:
+                last_entry = self.reader._read_at(f, (last["offset"], last["length"]))
+
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write: drop the partial trailing entry
+                    f.truncate(offset)
+                    break
+                entry = json.loads(line)
+                records.append(_index_record(entry, offset, len(line)))
+                last_entry = entry
+                offset += len(line)
+
+        if records:
+            with open(idx_path, "a", encoding="utf-8") as f:
+                f.writelines(records)
+
+        return last_entry, offset
+
+    def _recover_chain(self):
+        """
+        Sets the chain tail from the current segment, or from earlier
+        ones if it has no entries yet.
+        """
+        last, self._end = self._recover_segment(segment_path(self.log_dir, self._seq))
+        for seq, segment in reversed(list_segments(self.log_dir)):
+            if last is not None:
+                break
+            if seq < self._seq:
+                last, _ = self._recover_segment(segment)
+
+        self._prev_hash = last["entry_hash"] if last else GENESIS_HASH
+        self._last_timestamp = last["timestamp"] if last else ""
+
+    def _open_segment(self):
+        segment = segment_path(self.log_dir, self._seq)
+        self._file = open(segment, "ab")
+        self._index_file = open(index_path(segment), "a", encoding="utf-8")
+        self._file_opened_at = time.time()
+
+    def _open(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        segments = list_segments(self.log_dir)
+        self._seq = segments[-1][0] if segments else 1
+        self._open_segment()
+        self._recover_chain()
+
+    def _catch_up(self):
+        """
+        Called under the directory lock: follows segments started and
+        entries appended by other processes since this one last wrote.
+        """
+        if self._file is None:
+            self._open()
+            return
+
+        rotated = False
+        while segment_path(self.log_dir, self._seq + 1).exists():
+            self._seq += 1
+            rotated = True
+
+        if rotated:
+            self._close_files()
+            self._open_segment()
+
+        if rotated or os.fstat(self._file.fileno()).st_size != self._end:
+            self._recover_chain()
+
+    def _close_files(self):
+        self._sync(force=True)
+        self._file.close()
+        self._index_file.close()
+        self._file = None
+        self._index_file = None
+
+    def _recover_after_error(self):
+        # The failed batch may have left a torn line or a lagging index
+        for f in (self._file, self._index_file):
+            try:
+                if f is not None:
+                    f.close()
+            except OSError:
+                pass
+        self._file = None
+        self._index_file = None
+
+        try:
+            with self._locked():
+                self._open()
+        except Exception:
+            logger.exception("Error recovering audit log")
+            self._file = None
+            self._index_file = None
+
+    def _rotate_if_needed(self):
+        size_exceeded = (
+            self.max_file_bytes > 0
+            and self._end >= self.max_file_bytes
+        )
+        age_exceeded = (
+            self.max_file_age > 0
+            and time.time() - self._file_opened_at >= self.max_file_age
+        )
+
+        if not (size_exceeded or age_exceeded):
+            return
+
+        self._close_files()
+        self._seq += 1
+        self._open_segment()
+        self._end = 0
+
+    def _sync(self, force: bool = False):
+        self._file.flush()
+        self._index_file.flush()
+
+        if self.fsync_policy == "never":
+            return
+
+        now = time.time()
+        if (
+            force
+            or self.fsync_policy == "always"
+            or now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            os.fsync(self._index_file.fileno())
+            self._last_fsync = now
+
+    def _unwritten(self, entries: List[dict]) -> List[dict]:
+        """
+        The entries of a retried batch that are not yet in the log: a
+        failed write may have landed some or all of them before failing.
+        """
+        for i in range(len(entries) - 1, -1, -1):
+            if entries[i].get("entry_hash") == self._prev_hash:
+                return entries[i + 1:]
+        return entries
+
+    def _write_batch(self, entries: List[dict]):
+        with self._locked():
+            self._catch_up()
+            entries = self._unwritten(entries)
+            if not entries:
+                return
+
+            prev_hash = self._prev_hash
+            last_timestamp = self._last_timestamp
+            offset = self._end
+            lines = []
+            records = []
+
+            for entry in entries:
+                # Entries stamped later may have been written first (by
+                # another process or thread); keep segments time-ordered
+                if entry["timestamp"] < last_timestamp:
+                    entry["timestamp"] = last_timestamp
+                last_timestamp = entry["timestamp"]
+
+                # Re-chained from scratch if an earlier attempt failed
+                entry.pop("entry_hash", None)
+                entry["prev_hash"] = prev_hash
+                canonical = canonical_json(entry)
+                prev_hash = hashlib.sha256((prev_hash + canonical).encode()).hexdigest()
+                entry["entry_hash"] = prev_hash
+
+                # The hashed body with its hash appended: one encode per entry
+                line = f'{canonical[:-1]},"entry_hash":"{prev_hash}"}}\n'.encode()
+                lines.append(line)
+                records.append(_index_record(entry, offset, len(line)))
+                offset += len(line)
+
+            # Log first, then index: recovery rebuilds a lagging index
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            self._prev_hash = prev_hash
+            self._last_timestamp = last_timestamp
+            self._end = offset
+
+            self._index_file.write("".join(records))
+            self._sync()
+            self._rotate_if_needed()
+
+    def _write_or_keep(self, entries: List[dict]) -> List[dict]:
+        """
+        Writes a batch; on failure recovers the log and returns the
+        entries still to be written.
+        """
+        try:
+            if entries:
+                self._write_batch(entries)
+            return []
+        except Exception:
+            logger.exception(f"Error writing {len(entries)} audit entries, will retry")
+            self._recover_after_error()
+            return entries
+
+    def _run(self):
+        stop = False
+        # Entries of a failed write, retried before anything newer;
+        # their queue items are only marked done once written
+        pending: List[dict] = []
+        taken = 0
+
+        while not stop:
+            try:
+                first = self._queue.get(
+                    timeout=WRITE_RETRY_DELAY if pending else self.flush_interval
+                )
+            except queue.Empty:
+                if pending:
+                    pending = self._write_or_keep(pending)
+                elif self._file is not None:
+                    # Idle: make sure interval fsync eventually happens
+                    try:
+                        self._sync()
+                    except Exception:
+                        logger.exception("Error syncing audit log")
+                        self._recover_after_error()
+                if not pending:
+                    for _ in range(taken):
+                        self._queue.task_done()
+                    taken = 0
+                continue
+
+            items = [first]
+            while len(pending) + len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            taken += len(items)
+
+            entries = [item for item in items if item is not None]
+            stop = len(entries) != len(items)
+
+            pending = self._write_or_keep(pending + entries)
+            if pending:
+                time.sleep(WRITE_RETRY_DELAY)
+            else:
+                for _ in range(taken):
+                    self._queue.task_done()
+                taken = 0
+
+        for _ in range(WRITE_RETRIES_ON_CLOSE):
+            if not pending:
+                break
+            time.sleep(WRITE_RETRY_DELAY)
+            pending = self._write_or_keep(pending)
+        if pending:
+            logger.error(f"Dropping {len(pending)} audit entries after repeated write errors")
+        for _ in range(taken):
+            self._queue.task_done()
+
+        try:
+            if self._file is not None:
+                self._close_files()
+        except Exception:
+            logger.exception("Error closing audit log")
+            self._file = None
+            self._index_file = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# Singleton instance
+audit_logger = AuditLogger()
+atexit.register(audit_logger.close)
+
+
+def log_decision(request, response, checksum=None, cache_hit=False):
+    audit_logger.log_decision(request, response, checksum, cache_hit)
+
+
+def log_decisions(pairs):
+    audit_logger.log_decisions(pairs)
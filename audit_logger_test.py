@@ -0,0 +1,241 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from audit_logger import AuditLogger, AuditLogReader, list_segments
+
+
+def make_response(label="Eligible"):
+    return {
+        "decision_label": label,
+        "eligibility_score": 80,
+        "confidence_score": 100,
+        "confidence_vector": None,
+        "passed_rules": [{"id": "R1"}],
+        "failed_rules": [{"id": "R2"}],
+    }
+
+
+class TestAuditLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read_entries(self):
+        return list(AuditLogReader(self.tmp_dir).range())
+
+    def test_close_flushes_concurrent_writers(self):
+        logger = AuditLogger(self.tmp_dir, queue_size=16, batch_size=8)
+
+        def worker(n):
+            for i in range(50):
+                logger.log_decision({"worker": n, "i": i}, make_response())
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.close()
+
+        entries = self.read_entries()
+        self.assertEqual(len(entries), 200)
+        self.assertEqual(len({e["input_checksum"] for e in entries}), 200)
+        self.assertEqual(entries[0]["passed_rule_ids"], ["R1"])
+
+    def test_rotates_by_size(self):
+        logger = AuditLogger(self.tmp_dir, max_file_bytes=1024, fsync_policy="always")
+        for i in range(30):
+            logger.log_decision({"i": i}, make_response())
+            logger.flush()
+        logger.close()
+
+        self.assertGreater(len(list_segments(self.tmp_dir)), 1)
+        self.assertEqual([e["input_checksum"] for e in self.read_entries()],
+                         [e["input_checksum"] for e in logger.range()])
+        self.assertEqual(len(self.read_entries()), 30)
+        self.assertEqual(logger.verify_chain(), (True, None))
+
+    def test_find_by_checksum_and_range(self):
+        logger = AuditLogger(self.tmp_dir, max_file_bytes=2048)
+        for i in range(40):
+            logger.log_decision({"i": i % 10}, make_response())
+        logger.flush()
+
+        checksum = logger.range().__next__()["input_checksum"]
+        matches = logger.find_by_checksum(checksum)
+        self.assertEqual(len(matches), 4)
+
+        timestamps = [e["timestamp"] for e in logger.range()]
+        self.assertEqual(timestamps, sorted(timestamps))
+        window = list(logger.range(timestamps[10], timestamps[20]))
+        self.assertEqual([e["timestamp"] for e in window], timestamps[10:20])
+        logger.close()
+
+    def test_detects_tampering(self):
+        logger = AuditLogger(self.tmp_dir)
+        for i in range(5):
+            logger.log_decision({"i": i}, make_response())
+        logger.close()
+
+        segment = list_segments(self.tmp_dir)[0][1]
+        content = segment.read_text().replace('"eligibility_score":80', '"eligibility_score":90', 1)
+        segment.write_text(content)
+
+        ok, broken = AuditLogReader(self.tmp_dir).verify_chain()
+        self.assertFalse(ok)
+        self.assertIn("line 1", broken)
+
+    def test_chain_continues_after_restart(self):
+        logger = AuditLogger(self.tmp_dir)
+        logger.log_decision({"i": 1}, make_response())
+        logger.close()
+
+        # Simulate a torn write and a lagging index from a crash
+        segment = list_segments(self.tmp_dir)[0][1]
+        with open(segment, "a") as f:
+            f.write('{"timestamp": "partial')
+
+        restarted = AuditLogger(self.tmp_dir)
+        restarted.log_decision({"i": 2}, make_response())
+        restarted.close()
+
+        self.assertEqual(len(self.read_entries()), 2)
+        self.assertEqual(restarted.verify_chain(), (True, None))
+
+    def test_try_log_does_not_wait_behind_blocked_producer(self):
+        logger = AuditLogger(self.tmp_dir, queue_size=1, batch_size=1)
+        release = threading.Event()
+        write_batch = logger._write_batch
+
+        def stalled_write(entries):
+            release.wait()
+            write_batch(entries)
+
+        logger._write_batch = stalled_write
+        logger.log_decision({"i": 0}, make_response())   # taken by the stalled writer
+        logger.log_decision({"i": 1}, make_response())   # fills the queue
+        blocked = threading.Thread(target=logger.log_decision, args=({"i": 2}, make_response()))
+        blocked.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        self.assertFalse(logger.try_log({"input_checksum": "x"}))
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        release.set()
+        blocked.join()
+        logger.close()
+        self.assertEqual(len(self.read_entries()), 3)
+
+    def test_writer_survives_idle_sync_error(self):
+        logger = AuditLogger(self.tmp_dir, flush_interval=0.01)
+        logger.log_decision({"i": 1}, make_response())
+        logger.flush()
+
+        sync = logger._sync
+        failed = threading.Event()
+
+        def failing_sync(force=False):
+            if not failed.is_set():
+                failed.set()
+                raise OSError("fsync failed")
+            sync(force)
+
+        logger._sync = failing_sync
+        self.assertTrue(failed.wait(1))
+        time.sleep(0.05)
+        self.assertTrue(logger._thread.is_alive())
+
+        logger.log_decision({"i": 2}, make_response())
+        logger.close()
+        self.assertEqual(len(self.read_entries()), 2)
+        self.assertEqual(logger.verify_chain(), (True, None))
+
+    def test_dead_writer_is_restarted(self):
+        logger = AuditLogger(self.tmp_dir, queue_size=2)
+        logger._thread = threading.Thread(target=lambda: None)
+        logger._thread.start()
+        logger._thread.join()
+
+        for i in range(5):
+            logger.log_decision({"i": i}, make_response())
+        logger.close()
+        self.assertEqual(len(self.read_entries()), 5)
+
+    def test_loggers_sharing_a_directory_extend_one_chain(self):
+        # Stand-ins for uvicorn workers, each with its own writer
+        first = AuditLogger(self.tmp_dir, max_file_bytes=2048)
+        second = AuditLogger(self.tmp_dir, max_file_bytes=2048)
+        for i in range(30):
+            logger = first if i % 2 == 0 else second
+            logger.log_decision({"i": i}, make_response())
+            logger.flush()
+        first.close()
+        second.close()
+
+        self.assertGreater(len(list_segments(self.tmp_dir)), 1)
+        self.assertEqual(AuditLogReader(self.tmp_dir).verify_chain(), (True, None))
+        self.assertEqual(len(self.read_entries()), 30)
+        self.assertEqual(len(first.find_by_checksum(self.read_entries()[1]["input_checksum"])), 1)
+
+    def test_failed_write_is_recovered(self):
+        logger = AuditLogger(self.tmp_dir)
+        logger.log_decision({"i": 1}, make_response())
+        logger.flush()
+
+        # A write that lands half a line and then fails
+        real_file = logger._file
+
+        class FailingFile:
+            def write(self, data):
+                real_file.write(data[:len(data) // 2])
+                real_file.flush()
+                raise OSError("disk full")
+
+            def __getattr__(self, name):
+                return getattr(real_file, name)
+
+        logger._file = FailingFile()
+        logger.log_decision({"i": 2}, make_response())
+        logger.flush()
+
+        logger.log_decision({"i": 3}, make_response())
+        logger.close()
+
+        # The failed batch is retried, not dropped
+        self.assertEqual(len(self.read_entries()), 3)
+        self.assertEqual(logger.verify_chain(), (True, None))
+
+    def test_batch_written_before_an_error_is_not_repeated(self):
+        logger = AuditLogger(self.tmp_dir)
+        logger.log_decision({"i": 1}, make_response())
+        logger.flush()
+
+        # The log line lands, then the index write fails
+        real_index = logger._index_file
+
+        class FailingIndex:
+            def write(self, data):
+                raise OSError("disk full")
+
+            def __getattr__(self, name):
+                return getattr(real_index, name)
+
+        logger._index_file = FailingIndex()
+        logger.log_decision({"i": 2}, make_response())
+        logger.log_decision({"i": 3}, make_response())
+        logger.close()
+
+        self.assertEqual(len(self.read_entries()), 3)
+        self.assertEqual(logger.verify_chain(), (True, None))
+        self.assertEqual(len(logger.find_by_checksum(self.read_entries()[1]["input_checksum"])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,422 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from models import Rule
+from rules_loader import Ruleset
+from pipeline import build_response, evaluate_rules, retrieval_query
+from scoring import (
+    calculate_eligibility_score,
+    determine_deterministic_label,
+    calculate_confidence_vector,
+    apply_governance_layer
+)
+from vector_store import vector_store
+from audit_logger import AuditLogger
+
+DEFAULT_RULE_COUNTS = (10, 100, 1000)
+DEFAULT_APPLICANTS = 500
+DEFAULT_REQUESTS = 200
+LOAD_REPEATS = 3
+
+STATES = ("Delhi", "Haryana", "UP", "Punjab", "Bihar", "Kerala")
+CATEGORIES = ("General", "SC", "ST", "OBC", "EWS")
+STAGES = ("load", "compile", "eval", "score", "retrieve", "explain", "audit", "audit_flush")
+
+# -----------------------------------
+# Synthetic Rulesets
+# -----------------------------------
+
+# Condition shapes seen in real rulesets: (template, variables).
+# Templates are filled with rng-drawn thresholds.
+_CONDITIONS = (
+    ("income <= {income}", ["income"]),
+    ("{age_low} <= age <= {age_high}", ["age"]),
+    ("age >= {age_low} and age <= {age_high}", ["age"]),
+    ("state == '{state}'", ["state"]),
+    ("category in {categories}", ["category"]),
+    ("last_exam_percentage >= {percentage}", ["last_exam_percentage"]),
+    ("not has_other_major_scholarship", ["has_other_major_scholarship"]),
+    ("income <= {income} and state == '{state}'", ["income", "state"]),
+    (
+        "last_exam_percentage * 2 >= {double_percentage} or is_first_generation_learner == true",
+        ["last_exam_percentage", "is_first_generation_learner"]
+    ),
+    ("family_size > 0 and income / family_size <= {per_capita}", ["income", "family_size"]),
+)
+
+
+def generate_rules(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `count` rule definitions (Rule-shaped dicts) with realistic
+    conditions, priorities and score deltas. About one rule in twenty
+    is mandatory.
+    """
+    rng = random.Random(seed)
+    rules = []
+
+    for i in range(count):
+        template, variables = rng.choice(_CONDITIONS)
+        age_low = rng.randint(14, 21)
+        percentage = rng.randint(40, 90)
+        condition = template.format(
+            income=rng.randrange(200000, 1500000, 50000),
+            age_low=age_low,
+            age_high=age_low + rng.randint(4, 12),
+            state=rng.choice(STATES),
+            categories=tuple(rng.sample(CATEGORIES, rng.randint(1, 3))),
+            percentage=percentage,
+            double_percentage=percentage * 2,
+            per_capita=rng.randrange(50000, 400000, 10000)
+        )
+
+        rules.append({
+            "id": f"R{i + 1}",
+            "name": f"Criterion {i + 1}",
+            "condition_expression": condition,
+            "variables_required": variables,
+            "outcome_effect": {"eligible": True, "score_delta": rng.choice((5, 10, 10, 20, 40))},
+            "priority": rng.choice(("high", "medium", "medium", "low")),
+            "mandatory": rng.random() < 0.05,
+            "document_reference": {
+                "doc_id": "synthetic_policy",
+                "page": i // 20 + 1,
+                "section": f"{i // 20 + 1}.{i % 20 + 1}"
+            },
+            "human_description": f"Synthetic criterion: {condition}"
+        })
+
+    return rules
+
+
+def generate_applicants(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `count` applicants covering every input the generated rules read.
+    Roughly one applicant in twenty omits an input.
+    """
+    rng = random.Random(seed + 1)
+    applicants = []
+
+    for _ in range(count):
+        applicant = {
+            "income": rng.randrange(100000, 2000000, 1000),
+            "age": rng.randint(14, 35),
+            "state": rng.choice(STATES),
+            "category": rng.choice(CATEGORIES),
+            "last_exam_percentage": round(rng.uniform(30, 100), 1),
+            "has_other_major_scholarship": rng.random() < 0.2,
+            "is_first_generation_learner": rng.random() < 0.3,
+            "family_size": rng.randint(1, 8)
+        }
+        if rng.random() < 0.05:
+            del applicant[rng.choice(sorted(applicant))]
+        applicants.append(applicant)
+
+    return applicants
+
+# -----------------------------------
+# Measurement
+# -----------------------------------
+
+
+def summarize(samples_ms: List[float]) -> Optional[Dict[str, float]]:
+    """
+    count, mean and p50/p95/p99/max of a list of millisecond timings.
+    """
+    if not samples_ms:
+        return None
+
+    ordered = sorted(samples_ms)
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 4),
+        "p50_ms": round(percentile(0.50), 4),
+        "p95_ms": round(percentile(0.95), 4),
+        "p99_ms": round(percentile(0.99), 4),
+        "max_ms": round(ordered[-1], 4)
+    }
+
+
+def timed(samples: List[float], fn: Callable, *args, **kwargs) -> Any:
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.append((time.perf_counter() - started) * 1000.0)
+    return result
+
+
+def bench_stages(
+    rule_dicts: List[Dict[str, Any]],
+    applicants: List[Dict[str, Any]],
+    work_dir: str
+) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Times each pipeline stage in isolation, per applicant where the
+    stage runs per applicant. Retrieval is only timed when the
+    embedding model is loaded.
+    """
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    raw = json.dumps(rule_dicts).encode("utf-8")
+
+    # 1️⃣ Load (parse + validate) and compile (Ruleset build)
+    for _ in range(LOAD_REPEATS):
+        rules = timed(samples["load"], lambda: [Rule(**item) for item in json.loads(raw)])
+        ruleset = timed(samples["compile"], Ruleset, "bench", rules, "bench", (0, 0))
+
+    rule_index = vector_store.init_index(ruleset.rules, f"bench-{len(rules)}")
+    audit_logger = AuditLogger(os.path.join(work_dir, "audit"))
+
+    for user_input in applicants:
+        # 2️⃣ Rule evaluation
+        passed, failed = timed(samples["eval"], evaluate_rules, ruleset.compiled, user_input)
+
+        # 3️⃣ Retrieval
+        clauses, similarity = [], 0.0
+        if vector_store.ready:
+            clauses, similarity = timed(
+                samples["retrieve"],
+                lambda: vector_store.search(retrieval_query(failed), index=rule_index)
+            )
+
+        # 4️⃣ Scoring, confidence, governance
+        def score():
+            eligibility_score = calculate_eligibility_score(passed)
+            label = determine_deterministic_label(passed, failed, eligibility_score)
+            evaluated = len(passed) + len(failed)
+            vector = calculate_confidence_vector(
+                passed, failed, len(rules), similarity, evaluated / max(len(rules), 1)
+            )
+            return eligibility_score, apply_governance_layer(label, vector), vector
+
+        eligibility_score, label, vector = timed(samples["score"], score)
+
+        # 5️⃣ Explanation
+        timed(
+            samples["explain"],
+            ruleset.explanation.render,
+            "markdown",
+            label,
+            passed,
+            failed,
+            eligibility_score,
+            vector["rule_confidence"],
+            clauses,
+            vector
+        )
+
+        # 6️⃣ Audit enqueue (serialization included)
+        response = build_response(
+            passed, failed, len(rules), clauses, similarity, ruleset.version, explanation=None
+        )
+        request = {"ruleset_id": "bench", "user_input": user_input}
+        timed(samples["audit"], lambda: audit_logger.log_decision(request, response.to_dict("standard")))
+
+    timed(samples["audit_flush"], audit_logger.close)
+
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+def bench_throughput(
+    rule_dicts: List[Dict[str, Any]],
+    applicants: List[Dict[str, Any]],
+    requests: int,
+    work_dir: str
+) -> Dict[str, Any]:
+    """
+    End-to-end POST /evaluate through an in-process test client, with
+    rules and audit log in `work_dir`. Every request is a distinct
+    applicant, so the decision cache only hits if `requests` exceeds
+    the applicant count.
+    """
+    from fastapi.testclient import TestClient
+    import api
+    import pipeline
+    import rules_loader
+
+    # The test client logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    rules_dir = os.path.join(work_dir, "rules")
+    os.makedirs(rules_dir, exist_ok=True)
+    with open(os.path.join(rules_dir, "bench.json"), "w") as f:
+        json.dump(rule_dicts, f)
+
+    old_rules_dir = rules_loader.RULES_DIR
+    old_audit_logger = pipeline.audit_logger
+    rules_loader.RULES_DIR = rules_dir
+    pipeline.audit_logger = AuditLogger(os.path.join(work_dir, "api_audit"))
+    rules_loader.ruleset_registry.clear()
+
+    latencies: List[float] = []
+    errors = 0
+
+    try:
+        client = TestClient(api.app)
+        # Warm-up: load the ruleset and build its index
+        client.post("/evaluate", json={"ruleset_id": "bench", "user_input": applicants[0]})
+
+        started = time.perf_counter()
+        for i in range(requests):
+            user_input = applicants[(i + 1) % len(applicants)]
+            response = timed(
+                latencies,
+                client.post,
+                "/evaluate",
+                json={"ruleset_id": "bench", "user_input": user_input}
+            )
+            errors += response.status_code != 200
+        elapsed = time.perf_counter() - started
+
+        pipeline.audit_logger.close()
+    finally:
+        rules_loader.RULES_DIR = old_rules_dir
+        pipeline.audit_logger = old_audit_logger
+        rules_loader.ruleset_registry.clear()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else None,
+        "latency": summarize(latencies)
+    }
+
+# -----------------------------------
+# Suite
+# -----------------------------------
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    rule_counts=DEFAULT_RULE_COUNTS,
+    applicants: int = DEFAULT_APPLICANTS,
+    requests: int = DEFAULT_REQUESTS,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Runs the stage and throughput benchmarks for every ruleset size
+    and returns a JSON-serializable report.
+    """
+    people = generate_applicants(applicants, seed)
+    results = []
+
+    for count in rule_counts:
+        rule_dicts = generate_rules(count, seed)
+        work_dir = tempfile.mkdtemp(prefix="bench-")
+        try:
+            entry = {"rules": count, "stages": bench_stages(rule_dicts, people, work_dir)}
+            if requests > 0:
+                entry["throughput"] = bench_throughput(rule_dicts, people, requests, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        results.append(entry)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "retrieval": vector_store.model_state,
+            "seed": seed,
+            "applicants": applicants,
+            "requests": requests
+        },
+        "results": results
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    One line per ruleset size and stage: p50 in both reports and the
+    ratio current/baseline (> 1 is slower).
+    """
+    lines = []
+    previous = {entry["rules"]: entry for entry in baseline["results"]}
+
+    for entry in current["results"]:
+        before = previous.get(entry["rules"])
+        if before is None:
+            continue
+
+        pairs = [(stage, before["stages"].get(stage), stats) for stage, stats in entry["stages"].items()]
+        if "throughput" in entry and "throughput" in before:
+            pairs.append(("end_to_end", before["throughput"]["latency"], entry["throughput"]["latency"]))
+
+        for stage, old, new in pairs:
+            if not old or not new:
+                continue
+            ratio = new["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+            lines.append(
+                f"{entry['rules']:>6} rules  {stage:<12} "
+                f"{old['p50_ms']:>10.4f} -> {new['p50_ms']:>10.4f} ms  x{ratio:.2f}"
+            )
+
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the decision pipeline.")
+    parser.add_argument(
+        "--rules",
+        default=",".join(str(n) for n in DEFAULT_RULE_COUNTS),
+        help="comma-separated ruleset sizes"
+    )
+    parser.add_argument("--applicants", type=int, default=DEFAULT_APPLICANTS)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="0 skips /evaluate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--retrieval", action="store_true", help="wait for the embedding model")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    if args.retrieval:
+        vector_store.wait_until_ready()
+
+    report = run_benchmarks(
+        [int(n) for n in args.rules.split(",") if n.strip()],
+        args.applicants,
+        args.requests,
+        args.seed
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(baseline, report)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
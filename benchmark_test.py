@@ -0,0 +1,38 @@
+import unittest
+
+from benchmark import compare, generate_applicants, generate_rules, run_benchmarks
+from models import Rule
+from rule_engine import compile_ruleset
+
+
+class TestGenerators(unittest.TestCase):
+    def test_rules_compile_and_are_deterministic(self):
+        rules = [Rule(**item) for item in generate_rules(200, seed=3)]
+        self.assertEqual(generate_rules(200, seed=3), [r.dict() for r in rules])
+        self.assertTrue(all(c.error is None for c in compile_ruleset(rules)))
+        self.assertEqual(len({r.id for r in rules}), 200)
+
+    def test_applicants_cover_rule_inputs(self):
+        variables = {var for rule in generate_rules(200) for var in rule["variables_required"]}
+        applicants = generate_applicants(50)
+        self.assertTrue(variables <= set().union(*applicants))
+
+
+class TestRunBenchmarks(unittest.TestCase):
+    def test_report_shape_and_compare(self):
+        report = run_benchmarks(rule_counts=(5,), applicants=4, requests=3)
+
+        entry = report["results"][0]
+        self.assertEqual(entry["rules"], 5)
+        self.assertEqual(entry["stages"]["eval"]["count"], 4)
+        self.assertEqual(entry["stages"]["compile"]["count"], 3)
+        self.assertEqual(entry["throughput"]["errors"], 0)
+        self.assertEqual(entry["throughput"]["latency"]["count"], 3)
+
+        lines = compare(report, report)
+        self.assertTrue(any("end_to_end" in line for line in lines))
+        self.assertTrue(all(line.endswith("x1.00") for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,490 @@
+import ast
+import csv
+import operator
+from functools import reduce
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from models import DecisionLabel
+from rule_engine import CompiledRule, EVAL_GLOBALS
+from rules_loader import ruleset_registry
+from scoring import ELIGIBLE_THRESHOLD, REVIEW_THRESHOLD
+
+
+# -----------------------------------
+# Columnar Batches
+# -----------------------------------
+
+Columns = Dict[str, np.ndarray]
+
+
+def to_columns(table: Mapping[str, Sequence[Any]]) -> Columns:
+    """
+    Normalizes a column mapping (dict of lists/arrays, pandas DataFrame)
+    into a dict of equal-length NumPy arrays.
+    """
+    columns = {name: np.asarray(values) for name, values in table.items()}
+
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have mismatched lengths: {sorted(lengths)}")
+
+    return columns
+
+
+def _parse_csv_column(values: List[str]) -> np.ndarray:
+    lowered = {v.lower() for v in values}
+    if values and lowered <= {"true", "false"}:
+        return np.array([v.lower() == "true" for v in values])
+
+    for cast in (int, float):
+        try:
+            return np.array([cast(v) for v in values])
+        except ValueError:
+            continue
+
+    return np.array(values)
+
+
+def load_columns_csv(path: str) -> Columns:
+    """
+    Reads a CSV of applicants (one column per input variable) into
+    columns, inferring bool, int, float or string per column.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        raw: Dict[str, List[str]] = {name: [] for name in reader.fieldnames or []}
+        for row in reader:
+            for name in raw:
+                raw[name].append(row[name])
+
+    return {name: _parse_csv_column(values) for name, values in raw.items()}
+
+
+def _num_rows(columns: Columns) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+# -----------------------------------
+# AST -> Array Operations
+# -----------------------------------
+
+class UnsupportedExpression(Exception):
+    """
+    Raised when a rule expression has no vectorized translation.
+    Such rules fall back to row-wise evaluation.
+    """
+
+
+# A built expression takes the columns and a list that collects masks
+# of rows whose array result may differ from Python's (see `_arith`)
+ColumnFn = Callable[[Columns, List[Any]], Any]
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_DIVISION_OPS = (ast.Div, ast.FloorDiv, ast.Mod)
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+# Integer results at or beyond this magnitude may have wrapped around
+# int64 (the float64 estimate is only approximate near 2**63)
+_INT_LIMIT = 2.0 ** 62
+
+# Beyond this, int64 -> float64 rounds, while Python divides ints exactly
+_EXACT_FLOAT_INT = 2.0 ** 53
+
+_is_none = np.frompyfunc(lambda value: value is None, 1, 1)
+_py_truth = np.frompyfunc(bool, 1, 1)
+
+
+def _truth(values: Any) -> Any:
+    """
+    Element-wise Python truthiness.
+    """
+    if not isinstance(values, np.ndarray):
+        return bool(values)
+    if values.dtype.kind in "biuf":
+        return values.astype(bool)
+    return _py_truth(values).astype(bool)
+
+
+def _widen(values: Any) -> Any:
+    """
+    Gives arrays Python's arithmetic types: bools and narrow integers
+    become int64 (True + True is 2, not True), uint64 becomes Python ints.
+    """
+    if not isinstance(values, np.ndarray):
+        return values
+    if values.dtype.kind == "b" or (values.dtype.kind in "iu" and values.dtype.itemsize < 8):
+        return values.astype(np.int64)
+    if values.dtype.kind == "u":
+        return values.astype(object)
+    return values
+
+
+def _arith(op: ast.operator, left: Any, right: Any, unsafe: List[Any]) -> Any:
+    """
+    Array arithmetic with Python semantics where it matters. Rows that
+    would raise in Python (division by zero), whose int64 result may
+    have overflowed, or whose ints are too large to divide exactly as
+    floats are added to `unsafe` for row-wise re-evaluation.
+    """
+    bin_fn = _BIN_OPS[type(op)]
+    if not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray):
+        return bin_fn(left, right)
+
+    left, right = _widen(left), _widen(right)
+
+    if isinstance(op, _DIVISION_OPS):
+        unsafe.append(_truth(right == 0))
+    if isinstance(op, ast.Div):
+        for operand in (left, right):
+            if isinstance(operand, np.ndarray) and operand.dtype.kind == "i":
+                unsafe.append(np.abs(operand.astype(np.float64)) >= _EXACT_FLOAT_INT)
+
+    result = bin_fn(left, right)
+
+    if isinstance(result, np.ndarray) and result.dtype.kind == "i":
+        estimate = bin_fn(
+            np.asarray(left, dtype=np.float64),
+            np.asarray(right, dtype=np.float64)
+        )
+        unsafe.append(np.abs(estimate) >= _INT_LIMIT)
+
+    return result
+
+
+def _negate(values: Any, unsafe: List[Any]) -> Any:
+    values = _widen(values)
+    if isinstance(values, np.ndarray) and values.dtype.kind == "i":
+        unsafe.append(np.abs(values.astype(np.float64)) >= _INT_LIMIT)
+    return -values
+
+
+def _literal_values(node: ast.AST) -> list:
+    if not isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        raise UnsupportedExpression("membership test needs a literal collection")
+
+    values = []
+    for element in node.elts:
+        if isinstance(element, ast.Constant):
+            values.append(element.value)
+        elif isinstance(element, ast.Name) and element.id in EVAL_GLOBALS:
+            values.append(EVAL_GLOBALS[element.id])
+        else:
+            raise UnsupportedExpression("membership test needs literal values")
+    return values
+
+
+def _compare(op: ast.cmpop, comparator: ast.AST) -> Callable[[Any, Columns, List[Any]], Any]:
+    if isinstance(op, (ast.In, ast.NotIn)):
+        values = _literal_values(comparator)
+        negate = isinstance(op, ast.NotIn)
+
+        def membership(left, columns, unsafe):
+            mask = np.isin(left, values)
+            return ~mask if negate else mask
+
+        return membership
+
+    if isinstance(op, (ast.Is, ast.IsNot)):
+        if not (isinstance(comparator, ast.Constant) and comparator.value is None):
+            raise UnsupportedExpression("identity checks only support None")
+        negate = isinstance(op, ast.IsNot)
+
+        def identity(left, columns, unsafe):
+            if not isinstance(left, np.ndarray):
+                return (left is None) != negate
+            mask = _is_none(left).astype(bool)
+            return ~mask if negate else mask
+
+        return identity
+
+    compare_fn = _COMPARE_OPS[type(op)]
+    right = _build(comparator)
+    return lambda left, columns, unsafe: compare_fn(left, right(columns, unsafe))
+
+
+def _build(node: ast.AST) -> ColumnFn:
+    if isinstance(node, ast.Expression):
+        return _build(node.body)
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda columns, unsafe: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in EVAL_GLOBALS:
+            value = EVAL_GLOBALS[name]
+            return lambda columns, unsafe: value
+        return lambda columns, unsafe: columns[name]
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_build(value) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return lambda columns, unsafe: reduce(
+            combine, (_truth(part(columns, unsafe)) for part in parts)
+        )
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _build(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda columns, unsafe: np.logical_not(_truth(operand(columns, unsafe)))
+        if isinstance(node.op, ast.USub):
+            return lambda columns, unsafe: _negate(operand(columns, unsafe), unsafe)
+        return lambda columns, unsafe: _widen(operand(columns, unsafe))
+
+    if isinstance(node, ast.BinOp):
+        left, right = _build(node.left), _build(node.right)
+        op = node.op
+        return lambda columns, unsafe: _arith(
+            op, left(columns, unsafe), right(columns, unsafe), unsafe
+        )
+
+    if isinstance(node, ast.Compare):
+        left = _build(node.left)
+        # Chained comparisons (a < b < c) evaluate each neighbouring pair
+        steps = [
+            (_compare(op, comparator), _build_operand(op, comparator))
+            for op, comparator in zip(node.ops, node.comparators)
+        ]
+
+        def chained(columns, unsafe):
+            current = left(columns, unsafe)
+            result = None
+            for compare_fn, operand in steps:
+                part = _truth(compare_fn(current, columns, unsafe))
+                result = part if result is None else np.logical_and(result, part)
+                current = operand(columns, unsafe)
+            return result
+
+        return chained
+
+    raise UnsupportedExpression(f"unsupported node {type(node).__name__}")
+
+
+def _build_operand(op: ast.cmpop, comparator: ast.AST) -> ColumnFn:
+    # Literal collections are only valid as membership targets
+    if isinstance(op, (ast.In, ast.NotIn)):
+        return lambda columns, unsafe: None
+    return _build(comparator)
+
+
+# -----------------------------------
+# Vectorized Rules
+# -----------------------------------
+
+class VectorizedRule:
+    """
+    Array form of a compiled rule. Produces a pass/fail mask per row.
+    """
+
+    def __init__(self, compiled: CompiledRule):
+        self.compiled = compiled
+        self.fn = None
+
+        if compiled.code is not None:
+            try:
+                self.fn = _build(compiled.tree)
+            except UnsupportedExpression:
+                self.fn = None
+
+    def _row_wise(self, columns: Columns, rows: Sequence[int]) -> np.ndarray:
+        # Like the row engine, expose every input the expression reads,
+        # not only the declared ones
+        names = [name for name in self.compiled.variables if name in columns]
+        values = {name: columns[name][rows].tolist() for name in names}
+        mask = np.zeros(len(rows), dtype=bool)
+
+        for i in range(len(rows)):
+            row = {name: values[name][i] for name in names}
+            try:
+                mask[i] = bool(eval(self.compiled.code, EVAL_GLOBALS, row))
+            except Exception:
+                mask[i] = False
+
+        return mask
+
+    def evaluate(self, columns: Columns) -> np.ndarray:
+        n = _num_rows(columns)
+        rule = self.compiled.rule
+
+        # Missing inputs and rejected expressions fail every row
+        if self.compiled.code is None or any(
+            var not in columns for var in rule.variables_required
+        ):
+            return np.zeros(n, dtype=bool)
+
+        if self.fn is None:
+            return self._row_wise(columns, np.arange(n))
+
+        unsafe: List[Any] = []
+        try:
+            with np.errstate(all="ignore"):
+                mask = np.broadcast_to(_truth(self.fn(columns, unsafe)), (n,)).copy()
+        except Exception:
+            # e.g. comparing strings with numbers; mirror per-row errors
+            return self._row_wise(columns, np.arange(n))
+
+        # Rows with a zero divisor or a possible overflow take the row path
+        if unsafe:
+            flagged = reduce(np.logical_or, unsafe)
+            rows = np.flatnonzero(np.broadcast_to(flagged, (n,)))
+            if len(rows):
+                mask[rows] = self._row_wise(columns, rows)
+
+        return mask
+
+
+def vectorize_rules(compiled_rules: List[CompiledRule]) -> List[VectorizedRule]:
+    return [VectorizedRule(compiled) for compiled in compiled_rules]
+
+
+# Ruleset id -> (version, vectorized rules) of the last version used
+_vectorized_rules: Dict[str, Tuple[str, List[VectorizedRule]]] = {}
+
+
+def load_vectorized_rules(ruleset_id: str) -> List[VectorizedRule]:
+    """
+    Vectorized form of the current ruleset, translated once per version.
+    """
+    ruleset = ruleset_registry.get(ruleset_id)
+
+    cached = _vectorized_rules.get(ruleset_id)
+    if cached is not None and cached[0] == ruleset.version:
+        return cached[1]
+
+    rules = vectorize_rules(ruleset.compiled)
+    _vectorized_rules[ruleset_id] = (ruleset.version, rules)
+    return rules
+
+
+class BulkResult:
+    """
+    Pass/fail masks, scores and deterministic labels for a batch.
+    `pass_matrix[i, j]` is whether rule i passed for row j.
+    """
+
+    def __init__(self, rule_ids: List[str], pass_matrix: np.ndarray,
+                 eligibility_scores: np.ndarray, labels: np.ndarray):
+        self.rule_ids = rule_ids
+        self.pass_matrix = pass_matrix
+        self.eligibility_scores = eligibility_scores
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def failed_rule_ids(self, row: int) -> List[str]:
+        return [
+            rule_id for rule_id, passed
+            in zip(self.rule_ids, self.pass_matrix[:, row])
+            if not passed
+        ]
+
+
+# -----------------------------------
+# Vectorized Scoring
+# -----------------------------------
+
+def calculate_eligibility_scores(
+    pass_matrix: np.ndarray,
+    score_deltas: np.ndarray
+) -> np.ndarray:
+    """
+    Column-wise `scoring.calculate_eligibility_score`.
+    """
+    totals = score_deltas @ pass_matrix.astype(np.int64)
+    return np.clip(totals, 0, 100)
+
+
+def determine_deterministic_labels(
+    pass_matrix: np.ndarray,
+    mandatory: np.ndarray,
+    eligibility_scores: np.ndarray
+) -> np.ndarray:
+    """
+    Column-wise `scoring.determine_deterministic_label`.
+    """
+    mandatory_failed = (~pass_matrix[mandatory]).any(axis=0)
+
+    labels = np.full(
+        eligibility_scores.shape,
+        DecisionLabel.NOT_ELIGIBLE.value,
+        dtype=object
+    )
+    labels[eligibility_scores >= REVIEW_THRESHOLD] = DecisionLabel.REVIEW.value
+    labels[eligibility_scores >= ELIGIBLE_THRESHOLD] = DecisionLabel.ELIGIBLE.value
+    labels[mandatory_failed] = DecisionLabel.NOT_ELIGIBLE.value
+
+    return labels
+
+
+# -----------------------------------
+# Bulk Evaluation
+# -----------------------------------
+
+def evaluate_columns(
+    compiled_rules: List[CompiledRule],
+    table: Mapping[str, Sequence[Any]]
+) -> BulkResult:
+    """
+    Evaluates a whole ruleset over a columnar batch of applicants.
+    Produces deterministic labels only; retrieval-based governance
+    is not applied in bulk mode.
+    """
+    return evaluate_vectorized(vectorize_rules(compiled_rules), table)
+
+
+def evaluate_vectorized(
+    rules: List[VectorizedRule],
+    table: Mapping[str, Sequence[Any]]
+) -> BulkResult:
+    columns = to_columns(table)
+    n = _num_rows(columns)
+
+    pass_matrix = np.zeros((len(rules), n), dtype=bool)
+    for i, rule in enumerate(rules):
+        pass_matrix[i] = rule.evaluate(columns)
+
+    score_deltas = np.array(
+        [r.compiled.rule.outcome_effect.score_delta for r in rules],
+        dtype=np.int64
+    )
+    mandatory = np.array(
+        [r.compiled.rule.mandatory for r in rules],
+        dtype=bool
+    )
+
+    eligibility_scores = calculate_eligibility_scores(pass_matrix, score_deltas)
+    labels = determine_deterministic_labels(pass_matrix, mandatory, eligibility_scores)
+
+    return BulkResult(
+        [r.compiled.rule.id for r in rules],
+        pass_matrix,
+        eligibility_scores,
+        labels
+    )
+
+
+def evaluate_ruleset_columns(
+    ruleset_id: str,
+    table: Mapping[str, Sequence[Any]]
+) -> BulkResult:
+    return evaluate_vectorized(load_vectorized_rules(ruleset_id), table)
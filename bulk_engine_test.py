@@ -0,0 +1,154 @@
+import unittest
+import os
+import random
+import tempfile
+import numpy as np
+
+import bulk_engine
+from bulk_engine import evaluate_columns, load_columns_csv
+from pipeline import evaluate_rules
+from rule_engine import compile_ruleset
+from rule_engine_test import make_rule
+from rules_loader import Ruleset
+from scoring import calculate_eligibility_score, determine_deterministic_label
+
+
+RULES = [
+    make_rule("income <= 800000 and state == 'Delhi'", ["income", "state"], "R1", mandatory=True, score_delta=40),
+    make_rule("category in ('SC', 'ST', 'OBC')", ["category"], "R2", score_delta=20),
+    make_rule("17 <= age <= 25", ["age"], "R3", score_delta=20),
+    make_rule("not has_other_major_scholarship", ["has_other_major_scholarship"], "R4", score_delta=10),
+    make_rule("last_exam_percentage * 2 >= 120 or is_first_generation_learner == true",
+              ["last_exam_percentage", "is_first_generation_learner"], "R5", score_delta=10),
+    make_rule("state > 5", ["state"], "R6", score_delta=10),
+    make_rule("missing_field == 1", ["missing_field"], "R7", score_delta=10),
+]
+
+
+def random_applicants(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "income": rng.randint(100000, 1200000),
+            "state": rng.choice(["Delhi", "Haryana", "UP"]),
+            "category": rng.choice(["General", "SC", "ST", "OBC", "EWS"]),
+            "age": rng.randint(14, 30),
+            "has_other_major_scholarship": rng.random() < 0.2,
+            "last_exam_percentage": round(rng.uniform(30, 100), 1),
+            "is_first_generation_learner": rng.random() < 0.3,
+        }
+        for _ in range(n)
+    ]
+
+
+class TestBulkEngine(unittest.TestCase):
+    def test_matches_row_wise_engine(self):
+        compiled = compile_ruleset(RULES)
+        applicants = random_applicants(300)
+        columns = {name: [a[name] for a in applicants] for name in applicants[0]}
+
+        bulk = evaluate_columns(compiled, columns)
+
+        for row, applicant in enumerate(applicants):
+            passed, failed = evaluate_rules(compiled, applicant)
+            score = calculate_eligibility_score(passed)
+            label = determine_deterministic_label(passed, failed, score)
+
+            self.assertEqual(bulk.failed_rule_ids(row), [r.id for r in failed])
+            self.assertEqual(int(bulk.eligibility_scores[row]), score)
+            self.assertEqual(bulk.labels[row], label)
+
+    def assert_matches_row_engine(self, rules, columns):
+        compiled = compile_ruleset(rules)
+        bulk = evaluate_columns(compiled, columns)
+
+        for row in range(len(next(iter(columns.values())))):
+            applicant = {name: np.asarray(values)[row].item() for name, values in columns.items()}
+            _, failed = evaluate_rules(compiled, applicant)
+            self.assertEqual(bulk.failed_rule_ids(row), [r.id for r in failed], applicant)
+
+    def test_division_by_zero_matches_row_engine(self):
+        rules = [
+            make_rule("income / members > 100000", ["income", "members"], "D1"),
+            make_rule("income // members >= 1", ["income", "members"], "D2"),
+            make_rule("income % members == 0", ["income", "members"], "D3"),
+            make_rule("members == 0 or income / members > 100000", ["income", "members"], "D4"),
+            make_rule("ratio / 0.0 > 1", ["ratio"], "D5"),
+        ]
+        columns = {
+            "income": [500000, 300000, 0, 900000],
+            "members": [0, 3, 0, 2],
+            "ratio": [0.5, 1.5, 0.0, 2.0],
+        }
+        self.assert_matches_row_engine(rules, columns)
+
+    def test_bool_arithmetic_matches_row_engine(self):
+        rules = [
+            make_rule("first + second == 2", ["first", "second"], "B1"),
+            make_rule("first - second == -1", ["first", "second"], "B2"),
+            make_rule("-first == -1", ["first"], "B3"),
+            make_rule("first * 3 + second > 2", ["first", "second"], "B4"),
+            make_rule("+first + +second == 1", ["first", "second"], "B5"),
+        ]
+        columns = {
+            "first": [True, True, False, False],
+            "second": [True, False, True, False],
+        }
+        self.assert_matches_row_engine(rules, columns)
+
+    def test_integer_overflow_matches_row_engine(self):
+        rules = [
+            make_rule("income * 10000000000 > 0", ["income"], "O1"),
+            make_rule("income + income > income", ["income"], "O2"),
+            make_rule("-income < 0", ["income"], "O3"),
+            make_rule("count * count > 0", ["count"], "O4"),
+            make_rule("income / 3 > 3074457345618258602", ["income"], "O5"),
+        ]
+        columns = {
+            "income": np.array([10 ** 9, 2 ** 62 + 1, -(2 ** 63), 2 ** 63 - 1], dtype=np.int64),
+            "count": np.array([50000, 7, -50000, 0], dtype=np.int32),
+        }
+        self.assert_matches_row_engine(rules, columns)
+
+    def test_undeclared_variable_matches_row_engine(self):
+        rules = [
+            make_rule("income > 0 and bonus is 5", ["income"], "U1"),
+            make_rule("income + bonus > 8", ["income"], "U2"),
+            make_rule("income > 0 and missing == 1", ["income"], "U3"),
+        ]
+        self.assert_matches_row_engine(rules, {"income": [5, 1], "bonus": [5, 6]})
+
+    def test_vectorized_rules_cached_per_version(self):
+        ruleset = Ruleset("bulk", RULES, "v1", (0, 0))
+        registry = bulk_engine.ruleset_registry
+        original_get = registry.get
+        registry.get = lambda ruleset_id: ruleset
+        try:
+            first = bulk_engine.load_vectorized_rules("bulk")
+            self.assertIs(bulk_engine.load_vectorized_rules("bulk"), first)
+
+            ruleset = Ruleset("bulk", RULES[:1], "v2", (0, 1))
+            self.assertEqual(len(bulk_engine.load_vectorized_rules("bulk")), 1)
+        finally:
+            registry.get = original_get
+            bulk_engine._vectorized_rules.pop("bulk", None)
+
+    def test_csv_columns(self):
+        path = os.path.join(tempfile.mkdtemp(), "applicants.csv")
+        with open(path, "w") as f:
+            f.write("income,state,age,has_other_major_scholarship\n")
+            f.write("500000,Delhi,19,false\n")
+            f.write("900000,UP,30,true\n")
+
+        columns = load_columns_csv(path)
+        self.assertEqual(columns["income"].dtype.kind, "i")
+        self.assertEqual(columns["has_other_major_scholarship"].dtype, np.bool_)
+
+        bulk = evaluate_columns(compile_ruleset(RULES), columns)
+        self.assertEqual(bulk.pass_matrix[0].tolist(), [True, False])
+        self.assertEqual(bulk.pass_matrix[3].tolist(), [True, False])
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,396 @@
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import Counterfactual, CounterfactualResponse, InputChange
+from rule_engine import Atom, RuleOutcome, evaluate_compiled_rule
+from rules_loader import Ruleset, load_ruleset
+from scoring import (
+    ELIGIBLE_THRESHOLD,
+    calculate_eligibility_score,
+    determine_deterministic_label
+)
+
+COUNTERFACTUAL_TIME_BUDGET_MS = float(os.getenv("COUNTERFACTUAL_TIME_BUDGET_MS", "200"))
+COUNTERFACTUAL_MAX_RESULTS = 3
+# Server-side caps on what a client may ask for; the pool timeout
+# doesn't stop a running search, so an unbounded budget holds a worker
+COUNTERFACTUAL_TIME_BUDGET_LIMIT_MS = float(os.getenv("COUNTERFACTUAL_TIME_BUDGET_LIMIT_MS", "2000"))
+COUNTERFACTUAL_RESULTS_LIMIT = int(os.getenv("COUNTERFACTUAL_RESULTS_LIMIT", "20"))
+
+# Returned by Domain.nearest when no value can be proposed
+NO_VALUE = object()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _same(a: Any, b: Any) -> bool:
+    # Unlike ==, keeps True and 1 apart
+    return isinstance(a, bool) == isinstance(b, bool) and a == b
+
+
+def _member(value: Any, values) -> bool:
+    return any(_same(value, v) for v in values)
+
+
+# -----------------------------------
+# Variable Domains
+# -----------------------------------
+
+class Domain:
+    """
+    The values one input may take: an optional numeric interval, an
+    optional set of allowed values, and a set of excluded values.
+    Immutable; `apply` returns a narrowed copy.
+    """
+
+    __slots__ = ("low", "low_open", "high", "high_open", "allowed", "excluded")
+
+    def __init__(
+        self,
+        low=None,
+        low_open=False,
+        high=None,
+        high_open=False,
+        allowed: Optional[frozenset] = None,
+        excluded: frozenset = frozenset()
+    ):
+        self.low = low
+        self.low_open = low_open
+        self.high = high
+        self.high_open = high_open
+        self.allowed = allowed
+        self.excluded = excluded
+
+    def _copy(self, **changes) -> "Domain":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Domain(**fields)
+
+    def apply(self, op: str, value: Any) -> Optional["Domain"]:
+        """
+        Narrows the domain by `var <op> value`. None if the comparison
+        cannot be represented (e.g. `<` against a string).
+        """
+        if op in ("<", "<="):
+            if not _is_number(value):
+                return None
+            if self.high is None or value < self.high or (value == self.high and op == "<"):
+                return self._copy(high=value, high_open=op == "<")
+            return self
+
+        if op in (">", ">="):
+            if not _is_number(value):
+                return None
+            if self.low is None or value > self.low or (value == self.low and op == ">"):
+                return self._copy(low=value, low_open=op == ">")
+            return self
+
+        if op in ("==", "in"):
+            values = frozenset([value]) if op == "==" else value
+            if self.allowed is not None:
+                values = frozenset(v for v in values if _member(v, self.allowed))
+            return self._copy(allowed=values)
+
+        if op in ("!=", "not in"):
+            values = frozenset([value]) if op == "!=" else value
+            return self._copy(excluded=self.excluded | values)
+
+        return None
+
+    def contains(self, value: Any) -> bool:
+        if self.allowed is not None and not _member(value, self.allowed):
+            return False
+        if _member(value, self.excluded):
+            return False
+        if self.low is not None or self.high is not None:
+            if not _is_number(value):
+                return False
+            if self.low is not None and (value < self.low or (value == self.low and self.low_open)):
+                return False
+            if self.high is not None and (value > self.high or (value == self.high and self.high_open)):
+                return False
+        return True
+
+    def nearest(self, current: Any) -> Any:
+        """
+        The value closest to `current` inside the domain, or NO_VALUE.
+        """
+        if current is not None and self.contains(current):
+            return current
+
+        if self.allowed is not None:
+            candidates = [v for v in self.allowed if self.contains(v)]
+            if not candidates:
+                return NO_VALUE
+            if _is_number(current) and all(_is_number(v) for v in candidates):
+                return min(candidates, key=lambda v: abs(v - current))
+            return sorted(candidates, key=repr)[0]
+
+        if self.low is None and self.high is None:
+            # Only exclusions: step a number off them, but never invent
+            # a missing input or a new category
+            if not _is_number(current):
+                return NO_VALUE
+            for candidate in (current + 1, current - 1):
+                if self.contains(candidate):
+                    return candidate
+            return NO_VALUE
+
+        bounds = [b for b in (self.low, self.high) if b is not None]
+        integral = all(isinstance(b, int) for b in bounds) and not isinstance(current, float)
+        step = 1 if integral else 0.01
+
+        value = current if _is_number(current) else bounds[0]
+        if self.low is not None and (value < self.low or (value == self.low and self.low_open)):
+            value = self.low + step if self.low_open else self.low
+        if self.high is not None and (value > self.high or (value == self.high and self.high_open)):
+            value = self.high - step if self.high_open else self.high
+
+        for candidate in (value, value + step, value - step):
+            if self.contains(candidate):
+                return round(candidate, 2) if isinstance(candidate, float) else candidate
+        return NO_VALUE
+
+
+UNCONSTRAINED = Domain()
+
+
+def change_cost(current: Any, proposed: Any) -> float:
+    """
+    One per changed input, plus up to one more for the relative size
+    of a numeric change.
+    """
+    if current is not None and _same(current, proposed):
+        return 0.0
+    if current is None and proposed is None:
+        return 0.0
+    if _is_number(current) and _is_number(proposed):
+        return 1.0 + min(abs(proposed - current) / max(abs(current), 1.0), 1.0)
+    return 1.0
+
+
+# -----------------------------------
+# Search
+# -----------------------------------
+
+class _Search:
+    """
+    Branch and bound over the rules that must (mandatory) or may
+    (positive score) pass.
+
+    Each step commits one rule to one of its alternatives and narrows
+    the variable domains. The cost of a partial assignment only grows
+    as domains narrow, so branches that cannot beat the current results
+    are cut. Complete assignments are verified with the rule engine.
+    """
+
+    def __init__(
+        self,
+        ruleset: Ruleset,
+        user_input: Dict[str, Any],
+        max_results: int,
+        deadline: float
+    ):
+        self.ruleset = ruleset
+        self.user_input = user_input
+        self.max_results = max_results
+        self.deadline = deadline
+        self.timed_out = False
+        self.results: List[Tuple[float, Dict[str, Any], List[RuleOutcome]]] = []
+        self._seen = set()
+
+        mandatory = [c for c in ruleset.compiled if c.rule.mandatory]
+        optional = sorted(
+            (
+                c for c in ruleset.compiled
+                if not c.rule.mandatory and c.rule.outcome_effect.score_delta > 0
+            ),
+            key=lambda c: -c.rule.outcome_effect.score_delta
+        )
+        self.order = mandatory + optional
+        self.mandatory_count = len(mandatory)
+
+        # Best score still reachable from each position
+        self.reachable = [0] * (len(self.order) + 1)
+        for i in range(len(self.order) - 1, -1, -1):
+            self.reachable[i] = self.reachable[i + 1] + self.order[i].rule.outcome_effect.score_delta
+
+    def _worst_kept(self) -> float:
+        if len(self.results) < self.max_results:
+            return float("inf")
+        return self.results[-1][0]
+
+    def _constrain(self, compiled, alternative: List[Atom], domains, proposals, cost):
+        domains = dict(domains)
+        proposals = dict(proposals)
+
+        atoms_by_var: Dict[str, List[Atom]] = {}
+        for atom in alternative:
+            atoms_by_var.setdefault(atom[0], []).append(atom)
+        # Required inputs must be present even if unconstrained
+        for var in compiled.rule.variables_required:
+            atoms_by_var.setdefault(var, [])
+
+        for var, atoms in atoms_by_var.items():
+            domain = domains.get(var, UNCONSTRAINED)
+            for _, op, value in atoms:
+                domain = domain.apply(op, value)
+                if domain is None:
+                    return None
+
+            current = self.user_input.get(var)
+            proposed = domain.nearest(current)
+            if proposed is NO_VALUE:
+                return None
+
+            cost += change_cost(current, proposed) - change_cost(current, proposals.get(var, current))
+            domains[var] = domain
+            proposals[var] = proposed
+
+        return domains, proposals, cost
+
+    def _record(self, proposals: Dict[str, Any], cost: float):
+        changes = {
+            var: value for var, value in proposals.items()
+            if change_cost(self.user_input.get(var), value) > 0
+        }
+        key = tuple(sorted((var, repr(value)) for var, value in changes.items()))
+        if key in self._seen:
+            return
+        self._seen.add(key)
+
+        candidate = {**self.user_input, **changes}
+        results = [evaluate_compiled_rule(c, candidate) for c in self.ruleset.compiled]
+        passed = [r for r in results if r.passed]
+        failed = [r for r in results if not r.passed]
+        score = calculate_eligibility_score(passed)
+
+        # Rules outside the constraint form, or skipped optional rules
+        # that a change broke, are only caught here
+        if determine_deterministic_label(passed, failed, score) != "Eligible":
+            return
+
+        self.results.append((cost, changes, results))
+        self.results.sort(key=lambda item: item[0])
+        del self.results[self.max_results:]
+
+    def run(self, i: int = 0, domains=None, proposals=None, cost: float = 0.0, score: int = 0):
+        if time.perf_counter() > self.deadline:
+            self.timed_out = True
+            return
+
+        domains = domains or {}
+        proposals = proposals or {}
+
+        if cost >= self._worst_kept():
+            return
+
+        # Mandatory rules settled and enough score committed: further
+        # rules could only add constraints
+        if i >= self.mandatory_count and (score >= ELIGIBLE_THRESHOLD or i == len(self.order)):
+            if score >= ELIGIBLE_THRESHOLD:
+                self._record(proposals, cost)
+            return
+
+        if score + self.reachable[i] < ELIGIBLE_THRESHOLD:
+            return
+
+        compiled = self.order[i]
+        # Conditions outside the constraint form are left to verification
+        alternatives = compiled.constraints if compiled.constraints is not None else [[]]
+
+        branches = []
+        for alternative in alternatives:
+            narrowed = self._constrain(compiled, alternative, domains, proposals, cost)
+            if narrowed is not None:
+                branches.append(narrowed)
+
+        # Cheapest alternatives first, so good results prune early
+        for next_domains, next_proposals, next_cost in sorted(branches, key=lambda b: b[2]):
+            self.run(
+                i + 1,
+                next_domains,
+                next_proposals,
+                next_cost,
+                score + compiled.rule.outcome_effect.score_delta
+            )
+
+        if i >= self.mandatory_count:
+            self.run(i + 1, domains, proposals, cost, score)
+
+
+def find_counterfactuals(
+    ruleset: Ruleset,
+    user_input: Dict[str, Any],
+    max_results: int = COUNTERFACTUAL_MAX_RESULTS,
+    time_budget_ms: Optional[float] = None
+) -> CounterfactualResponse:
+    """
+    Smallest input changes that make the deterministic label Eligible,
+    cheapest first.
+
+    Works on the compiled rule constraints rather than re-evaluating
+    input grids: rule evaluation only runs to verify each candidate.
+    Stops at the time budget and reports whether the search finished.
+    """
+    started = time.perf_counter()
+    budget = COUNTERFACTUAL_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+
+    results = [evaluate_compiled_rule(c, user_input) for c in ruleset.compiled]
+    passed = [r for r in results if r.passed]
+    failed = [r for r in results if not r.passed]
+    label = determine_deterministic_label(passed, failed, calculate_eligibility_score(passed))
+
+    search = _Search(ruleset, user_input, max(max_results, 0), started + budget / 1000.0)
+    if label != "Eligible" and max_results > 0:
+        try:
+            search.run()
+        except RecursionError:
+            # One level per rule: very large rulesets return what was found
+            search.timed_out = True
+
+    failed_ids = {r.id for r in failed}
+    counterfactuals = [
+        Counterfactual(
+            changes=[
+                InputChange(variable=var, current=user_input.get(var), proposed=value)
+                for var, value in sorted(changes.items())
+            ],
+            eligibility_score=calculate_eligibility_score([r for r in new_results if r.passed]),
+            fixed_rule_ids=[r.id for r in new_results if r.passed and r.id in failed_ids],
+            cost=round(cost, 4)
+        )
+        for cost, changes, new_results in search.results
+    ]
+
+    return CounterfactualResponse(
+        deterministic_label=label,
+        counterfactuals=counterfactuals,
+        search_complete=not search.timed_out,
+        elapsed_ms=round((time.perf_counter() - started) * 1000.0, 3)
+    )
+
+
+def counterfactuals_for(
+    ruleset_id: str,
+    user_input: Dict[str, Any],
+    max_results: int = COUNTERFACTUAL_MAX_RESULTS,
+    time_budget_ms: Optional[float] = None
+) -> CounterfactualResponse:
+    """
+    `find_counterfactuals` against the current ruleset version. Takes
+    only picklable arguments so it can run in the evaluation pool.
+
+    Raises:
+        FileNotFoundError: If the ruleset doesn't exist.
+        ValueError: If the ruleset is invalid.
+    """
+    return find_counterfactuals(
+        load_ruleset(ruleset_id),
+        user_input,
+        max_results,
+        time_budget_ms
+    )
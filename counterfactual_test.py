@@ -0,0 +1,94 @@
+import unittest
+
+from counterfactual import Domain, NO_VALUE, find_counterfactuals
+from rule_engine_test import make_rule
+from rules_loader import Ruleset
+
+
+def make_ruleset(rules):
+    return Ruleset("test", rules, "hash", (0, 0))
+
+
+RULES = [
+    make_rule("income <= 800000", ["income"], "R1", mandatory=True, score_delta=40),
+    make_rule("state == 'Delhi' or category in ('SC', 'ST')", ["state", "category"], "R2", score_delta=40),
+    make_rule("17 <= age <= 25", ["age"], "R3", score_delta=20),
+]
+
+
+def changes_of(counterfactual):
+    return {c.variable: c.proposed for c in counterfactual.changes}
+
+
+class TestDomain(unittest.TestCase):
+    def test_nearest_in_interval(self):
+        domain = Domain().apply(">=", 17).apply("<", 26)
+        self.assertEqual(domain.nearest(30), 25)
+        self.assertEqual(domain.nearest(12), 17)
+        self.assertEqual(domain.nearest(20), 20)
+        self.assertEqual(domain.nearest(30.5), 25.99)
+
+    def test_sets_and_exclusions(self):
+        domain = Domain().apply("in", frozenset({"SC", "ST"})).apply("!=", "SC")
+        self.assertEqual(domain.nearest("GEN"), "ST")
+        self.assertIs(domain.apply("==", "SC").nearest("GEN"), NO_VALUE)
+        self.assertIs(Domain().apply("!=", "UP").nearest("UP"), NO_VALUE)
+
+
+class TestCounterfactuals(unittest.TestCase):
+    def test_single_mandatory_fix(self):
+        response = find_counterfactuals(
+            make_ruleset(RULES),
+            {"income": 900000, "state": "Delhi", "category": "GEN", "age": 19}
+        )
+        self.assertEqual(response.deterministic_label, "Not Eligible")
+        self.assertTrue(response.search_complete)
+        best = response.counterfactuals[0]
+        self.assertEqual(changes_of(best), {"income": 800000})
+        self.assertEqual(best.fixed_rule_ids, ["R1"])
+        self.assertEqual(best.eligibility_score, 100)
+
+    def test_interacting_rules(self):
+        # R1 alone scores 40 and R3 only 20 more: R2 must be fixed too,
+        # through either of its alternatives
+        response = find_counterfactuals(
+            make_ruleset(RULES),
+            {"income": 900000, "state": "UP", "category": "GEN", "age": 30}
+        )
+        proposals = [changes_of(c) for c in response.counterfactuals]
+        self.assertIn({"income": 800000, "state": "Delhi"}, proposals)
+        self.assertIn({"income": 800000, "category": "SC"}, proposals)
+        costs = [c.cost for c in response.counterfactuals]
+        self.assertEqual(costs, sorted(costs))
+
+    def test_conflicting_constraints_are_skipped(self):
+        rules = [
+            make_rule("age >= 30", ["age"], "R1", mandatory=True, score_delta=50),
+            make_rule("age <= 25", ["age"], "R2", score_delta=50),
+            make_rule("income <= 500000", ["income"], "R3", score_delta=30),
+        ]
+        response = find_counterfactuals(make_ruleset(rules), {"age": 20, "income": 600000})
+        self.assertEqual(
+            [changes_of(c) for c in response.counterfactuals][0],
+            {"age": 30, "income": 500000}
+        )
+
+    def test_already_eligible(self):
+        response = find_counterfactuals(
+            make_ruleset(RULES),
+            {"income": 500000, "state": "Delhi", "category": "GEN", "age": 19}
+        )
+        self.assertEqual(response.deterministic_label, "Eligible")
+        self.assertEqual(response.counterfactuals, [])
+
+    def test_time_budget(self):
+        response = find_counterfactuals(
+            make_ruleset(RULES),
+            {"income": 900000, "state": "UP", "category": "GEN", "age": 30},
+            time_budget_ms=0
+        )
+        self.assertFalse(response.search_complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 0 disables the cache
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "1024"))
+DECISION_CACHE_TTL = float(os.getenv("DECISION_CACHE_TTL", "300"))
+
+
+class DecisionCache:
+    """
+    Bounded LRU + TTL cache of decision responses.
+
+    Keyed by (ruleset content hash, canonical input checksum), so an
+    edited ruleset can never serve decisions computed from the old one.
+    Seeing a new hash for a ruleset id drops that ruleset's old entries.
+    """
+
+    def __init__(self, max_size: int = DECISION_CACHE_SIZE, ttl: float = DECISION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _track_version(self, ruleset_id: str, ruleset_hash: str):
+        # Caller holds the lock
+        current = self._versions.get(ruleset_id)
+        if current == ruleset_hash:
+            return
+        if current is not None:
+            for key in [k for k in self._entries if k[0] == current]:
+                del self._entries[key]
+        self._versions[ruleset_id] = ruleset_hash
+
+    def get(self, ruleset_id: str, ruleset_hash: str, checksum: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        key = (ruleset_hash, checksum)
+        now = time.monotonic()
+
+        with self._lock:
+            self._track_version(ruleset_id, ruleset_hash)
+            item = self._entries.get(key)
+
+            if item is None or (self.ttl > 0 and now - item[0] > self.ttl):
+                if item is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, ruleset_id: str, ruleset_hash: str, checksum: str, value: Any):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._versions.get(ruleset_id, ruleset_hash) != ruleset_hash:
+                # Computed against a ruleset version that has been replaced
+                return
+            self._versions[ruleset_id] = ruleset_hash
+            self._entries[(ruleset_hash, checksum)] = (time.monotonic(), value)
+            self._entries.move_to_end((ruleset_hash, checksum))
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, ruleset_id: Optional[str] = None):
+        """
+        Drops entries for one ruleset, or everything.
+        """
+        with self._lock:
+            if ruleset_id is None:
+                self._entries.clear()
+                self._versions.clear()
+                return
+            current = self._versions.pop(ruleset_id, None)
+            for key in [k for k in self._entries if k[0] == current]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Singleton instance
+decision_cache = DecisionCache()
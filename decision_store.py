@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from rule_engine import RuleOutcome
+
+# 0 disables the store (and with it incremental re-evaluation)
+DECISION_STORE_SIZE = int(os.getenv("DECISION_STORE_SIZE", "10000"))
+DECISION_STORE_TTL = float(os.getenv("DECISION_STORE_TTL", "3600"))
+
+
+class StaleDecision(Exception):
+    """
+    Raised when a stored decision's ruleset has changed since it was made.
+    """
+
+
+def new_decision_id() -> str:
+    return uuid.uuid4().hex
+
+
+class DecisionState:
+    """
+    Everything needed to re-evaluate a decision incrementally: the
+    inputs, the ruleset version, and each rule's result in ruleset order.
+    """
+
+    __slots__ = (
+        "decision_id",
+        "ruleset_id",
+        "ruleset_version",
+        "user_input",
+        "results",
+        "relevant_clauses",
+        "similarity_score",
+        "retrieval_ready",
+        "decision_label"
+    )
+
+    def __init__(
+        self,
+        decision_id: str,
+        ruleset_id: str,
+        ruleset_version: str,
+        user_input: Dict[str, Any],
+        results: List[RuleOutcome],
+        relevant_clauses: List[str],
+        similarity_score: float,
+        retrieval_ready: bool,
+        decision_label: str
+    ):
+        self.decision_id = decision_id
+        self.ruleset_id = ruleset_id
+        self.ruleset_version = ruleset_version
+        self.user_input = user_input
+        self.results = results
+        self.relevant_clauses = relevant_clauses
+        self.similarity_score = similarity_score
+        # False if retrieval was skipped while the model warmed up
+        self.retrieval_ready = retrieval_ready
+        self.decision_label = decision_label
+
+
+class DecisionStore:
+    """
+    Bounded LRU + TTL store of recent decision states, keyed by
+    decision id.
+    """
+
+    def __init__(self, max_size: int = DECISION_STORE_SIZE, ttl: float = DECISION_STORE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def put(self, state: DecisionState):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[state.decision_id] = (time.monotonic(), state)
+            self._entries.move_to_end(state.decision_id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, decision_id: str) -> Optional[DecisionState]:
+        with self._lock:
+            item = self._entries.get(decision_id)
+            if item is None:
+                return None
+            if self.ttl > 0 and time.monotonic() - item[0] > self.ttl:
+                del self._entries[decision_id]
+                return None
+            self._entries.move_to_end(decision_id)
+            return item[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size
+            }
+
+
+# Singleton instance
+decision_store = DecisionStore()
@@ -0,0 +1,223 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+
+# Optional on-disk store (without extension), reused across restarts
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "")
+
+# Store layout: header length, JSON header (model, dim, keys), padding,
+# then float32 rows aligned for memory mapping
+STORE_SUFFIX = ".qcache"
+_HEADER_LENGTH = struct.Struct("<Q")
+_ALIGN = 64
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Memoizing layer between VectorStore and the embedding model.
+
+    Keeps an in-memory LRU keyed by normalized query text, backed by an
+    optional read-only, memory-mapped store from earlier runs.
+    Only texts missing from both are sent to the model, in one batch.
+    """
+
+    def __init__(self, model_name: str, max_size: int = QUERY_CACHE_SIZE):
+        self.model_name = model_name
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._persisted_rows: Dict[str, int] = {}
+        self._persisted: Optional[np.ndarray] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------------
+    # Lookup
+    # -----------------------------------
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        # Caller holds the lock
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            return vector
+
+        row = self._persisted_rows.get(key)
+        if row is not None:
+            vector = np.array(self._persisted[row])
+            self._store(key, vector)
+            return vector
+
+        return None
+
+    def _store(self, key: str, vector: np.ndarray):
+        # Caller holds the lock
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def encode(self, model, texts: List[str]) -> np.ndarray:
+        """
+        Normalized embeddings for `texts`, encoding only cache misses.
+        """
+        keys = [normalize_query(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._lookup(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    found[key] = vector
+
+            # Repeats of a missing text within one call share its encode
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(
+                model.encode(missing, normalize_embeddings=True),
+                dtype=np.float32
+            )
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._store(key, vector)
+
+        return np.stack([found[key] for key in keys])
+
+    def missing(self, texts: List[str]) -> List[str]:
+        """
+        Normalized texts (deduplicated) that are not cached yet.
+        """
+        with self._lock:
+            return [
+                key for key in dict.fromkeys(normalize_query(t) for t in texts)
+                if key not in self._entries and key not in self._persisted_rows
+            ]
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """
+        Stores precomputed embeddings without touching hit/miss stats.
+        """
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                self._store(normalize_query(text), np.asarray(vector, dtype=np.float32))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "persisted": len(self._persisted_rows),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    # -----------------------------------
+    # Persistence
+    # -----------------------------------
+
+    def load(self, path: str, dim: Optional[int] = None) -> bool:
+        """
+        Memory-maps a store written by `save`. Stores written for a
+        different model or dimension, or that are incomplete, are
+        ignored.
+        """
+        try:
+            with open(path + STORE_SUFFIX, "rb") as f:
+                (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+                meta = json.loads(f.read(length))
+                keys, stored_dim = meta["keys"], int(meta["dim"])
+                offset = _data_offset(length)
+
+                if (
+                    not keys
+                    or meta.get("model") != self.model_name
+                    or (dim is not None and stored_dim != dim)
+                    or os.fstat(f.fileno()).st_size != offset + len(keys) * stored_dim * 4
+                ):
+                    return False
+
+                # Mapped from the open file, so a concurrent save cannot
+                # swap the rows out from under the header just read
+                vectors = np.memmap(
+                    f, dtype=np.float32, mode="r", offset=offset, shape=(len(keys), stored_dim)
+                )
+        except (FileNotFoundError, ValueError, KeyError, TypeError, struct.error):
+            return False
+
+        with self._lock:
+            self._persisted = vectors
+            self._persisted_rows = {key: i for i, key in enumerate(keys)}
+        return True
+
+    def save(self, path: str):
+        """
+        Writes persisted and in-memory entries to `<path>.qcache`.
+        The store is one file, written under a unique temporary name and
+        then renamed into place, so concurrent savers and readers never
+        see a partial or mismatched store.
+        """
+        with self._lock:
+            merged: Dict[str, np.ndarray] = {
+                key: self._persisted[row]
+                for key, row in self._persisted_rows.items()
+            }
+            merged.update(self._entries)
+
+        if not merged:
+            return
+
+        keys = list(merged)
+        vectors = np.stack([np.asarray(merged[k], dtype=np.float32) for k in keys])
+        header = json.dumps({
+            "model": self.model_name,
+            "dim": int(vectors.shape[1]),
+            "keys": keys
+        }).encode("utf-8")
+        padding = _data_offset(len(header)) - _HEADER_LENGTH.size - len(header)
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER_LENGTH.pack(len(header)))
+                f.write(header)
+                f.write(b"\0" * padding)
+                f.write(vectors.tobytes())
+            os.replace(tmp, path + STORE_SUFFIX)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+def _data_offset(header_length: int) -> int:
+    end = _HEADER_LENGTH.size + header_length
+    return -(-end // _ALIGN) * _ALIGN
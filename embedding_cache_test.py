@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from embedding_cache import STORE_SUFFIX, EmbeddingCache
+
+
+class FakeModel:
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.calls += 1
+        return np.array([[len(t)] + [1.0] * (self.dim - 1) for t in texts], dtype=np.float32)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "queries")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def saved_cache(self, texts):
+        cache = EmbeddingCache("model/a")
+        cache.encode(FakeModel(), texts)
+        cache.save(self.path)
+        return cache
+
+    def test_save_and_load_memory_mapped(self):
+        self.saved_cache(["income limit", "age limit"])
+
+        loaded = EmbeddingCache("model/a")
+        self.assertTrue(loaded.load(self.path, dim=4))
+        self.assertIsInstance(loaded._persisted, np.memmap)
+
+        model = FakeModel()
+        vectors = loaded.encode(model, ["income  limit", "age limit"])
+        self.assertEqual(model.calls, 0)
+        self.assertEqual(vectors[0][0], len("income limit"))
+
+    def test_other_model_dimension_or_truncated_store_is_ignored(self):
+        self.saved_cache(["income limit"])
+
+        self.assertFalse(EmbeddingCache("model/b").load(self.path))
+        self.assertFalse(EmbeddingCache("model/a").load(self.path, dim=8))
+
+        with open(self.path + STORE_SUFFIX, "r+b") as f:
+            f.truncate(os.path.getsize(self.path + STORE_SUFFIX) - 4)
+        self.assertFalse(EmbeddingCache("model/a").load(self.path))
+
+    def test_concurrent_saves_leave_a_consistent_store(self):
+        caches = []
+        for n in range(4):
+            cache = EmbeddingCache("model/a")
+            cache.encode(FakeModel(), [f"query {n} " + "x" * i for i in range(n + 1)])
+            caches.append(cache)
+
+        barrier = threading.Barrier(len(caches))
+
+        def save(cache):
+            barrier.wait()
+            for _ in range(10):
+                cache.save(self.path)
+
+        threads = [threading.Thread(target=save, args=(cache,)) for cache in caches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        loaded = EmbeddingCache("model/a")
+        self.assertTrue(loaded.load(self.path, dim=4))
+        for key, row in loaded._persisted_rows.items():
+            self.assertEqual(loaded._persisted[row][0], len(key))
+        self.assertEqual(
+            [name for name in os.listdir(self.dir)], ["queries" + STORE_SUFFIX]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
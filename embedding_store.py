@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+# Advisory locks keep concurrent workers from encoding the same version twice
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    FILE_LOCKS_AVAILABLE = False
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# Shared directory for rule embeddings ("" = keep them in process memory only)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "")
+
+# Versions kept per ruleset and model; older ones are removed on publish
+EMBEDDING_STORE_KEEP = int(os.getenv("EMBEDDING_STORE_KEEP", "3"))
+
+EMBEDDINGS_FILE = "embeddings.npy"
+META_FILE = "meta.json"
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value)
+
+
+class EmbeddingStore:
+    """
+    Versioned, on-disk rule embeddings shared by all worker processes.
+
+    Each version lives in `<root>/<ruleset>/<model>/<content_hash>/`
+    as `embeddings.npy` plus `meta.json` (rule ids, model, dimension).
+    Versions are immutable: a writer builds one in a temporary
+    directory and publishes it with a single atomic rename, so readers
+    see either nothing or a complete version. Readers open the matrix
+    with a read-only memory map, so every worker shares one page-cached
+    copy instead of holding its own.
+    """
+
+    def __init__(self, root: str, keep: int = EMBEDDING_STORE_KEEP):
+        self.root = root
+        self.keep = keep
+
+    def _model_dir(self, ruleset_id: str, model_name: str) -> str:
+        return os.path.join(self.root, _safe_name(ruleset_id), _safe_name(model_name))
+
+    def version_dir(self, ruleset_id: str, model_name: str, content_hash: str) -> str:
+        return os.path.join(self._model_dir(ruleset_id, model_name), content_hash)
+
+    # -----------------------------------
+    # Reading
+    # -----------------------------------
+
+    def load(
+        self,
+        ruleset_id: str,
+        model_name: str,
+        content_hash: str,
+        rule_ids: List[str]
+    ) -> Optional[np.ndarray]:
+        """
+        Read-only memory map of a published version, or None if it is
+        missing or was written for different rules.
+        """
+        path = self.version_dir(ruleset_id, model_name, content_hash)
+        try:
+            with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if (
+            meta.get("model") != model_name
+            or meta.get("rule_ids") != rule_ids
+            or embeddings.shape != (len(rule_ids), meta.get("dim"))
+        ):
+            return None
+
+        return embeddings
+
+    # -----------------------------------
+    # Writing
+    # -----------------------------------
+
+    @contextmanager
+    def lock(self, ruleset_id: str, model_name: str):
+        """
+        Exclusive lock per ruleset and model, held while one process
+        encodes a version so the others wait and then load it.
+        """
+        directory = self._model_dir(ruleset_id, model_name)
+        os.makedirs(directory, exist_ok=True)
+
+        if not FILE_LOCKS_AVAILABLE:
+            yield
+            return
+
+        with open(os.path.join(directory, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def publish(
+        self,
+        ruleset_id: str,
+        model_name: str,
+        content_hash: str,
+        rule_ids: List[str],
+        embeddings: np.ndarray
+    ) -> np.ndarray:
+        """
+        Writes a version and returns it memory-mapped. If another
+        process published the same version first, theirs is kept.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        directory = self._model_dir(ruleset_id, model_name)
+        final = os.path.join(directory, content_hash)
+        os.makedirs(directory, exist_ok=True)
+
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=directory)
+        try:
+            with open(os.path.join(staging, EMBEDDINGS_FILE), "wb") as f:
+                np.save(f, embeddings)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "model": model_name,
+                    "dim": int(embeddings.shape[1]),
+                    "rule_ids": rule_ids
+                }, f)
+
+            try:
+                os.rename(staging, final)
+            except OSError:
+                # Already published by another worker
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self._prune(directory, content_hash)
+
+        published = self.load(ruleset_id, model_name, content_hash, rule_ids)
+        return published if published is not None else embeddings
+
+    def _prune(self, directory: str, current: str):
+        # Workers still mapping a removed version keep their open mapping
+        versions = sorted(
+            (
+                entry for entry in os.scandir(directory)
+                if entry.is_dir() and not entry.name.startswith(".")
+                and entry.name != current
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in versions[max(self.keep - 1, 0):]:
+            shutil.rmtree(entry.path, ignore_errors=True)
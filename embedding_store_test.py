@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = EmbeddingStore(self.dir, keep=2)
+        self.embeddings = np.eye(3, 4, dtype=np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_publish_then_load_memory_mapped(self):
+        ids = ["R1", "R2", "R3"]
+        self.assertIsNone(self.store.load("rs", "model/a", "h1", ids))
+
+        published = self.store.publish("rs", "model/a", "h1", ids, self.embeddings)
+        loaded = self.store.load("rs", "model/a", "h1", ids)
+
+        for array in (published, loaded):
+            self.assertIsInstance(array, np.memmap)
+            self.assertFalse(array.flags.writeable)
+            np.testing.assert_array_equal(array, self.embeddings)
+
+        # Different rules or model under the same hash are not reused
+        self.assertIsNone(self.store.load("rs", "model/a", "h1", ["R1", "R2", "X"]))
+        self.assertIsNone(self.store.load("rs", "model/b", "h1", ids))
+
+    def test_concurrent_publishers_leave_one_version(self):
+        ids = ["R1", "R2", "R3"]
+        barrier = threading.Barrier(4)
+
+        def publish():
+            barrier.wait()
+            self.store.publish("rs", "m", "h1", ids, self.embeddings)
+
+        threads = [threading.Thread(target=publish) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(os.listdir(os.path.join(self.dir, "rs", "m")), ["h1"])
+        np.testing.assert_array_equal(self.store.load("rs", "m", "h1", ids), self.embeddings)
+
+    def test_old_versions_are_pruned(self):
+        for i, content_hash in enumerate(["h1", "h2", "h3"]):
+            self.store.publish("rs", "m", content_hash, ["R1", "R2", "R3"], self.embeddings + i)
+            os.utime(os.path.join(self.dir, "rs", "m", content_hash), (i, i))
+
+        remaining = sorted(
+            name for name in os.listdir(os.path.join(self.dir, "rs", "m"))
+            if not name.startswith(".")
+        )
+        self.assertEqual(remaining, ["h2", "h3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
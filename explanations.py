@@ -1,89 +1,224 @@
-from typing import List, Optional, Dict
-from models import RuleResult
-
-
-def generate_explanation(
-    decision_label: str,
-    passed_rules: List[RuleResult],
-    failed_rules: List[RuleResult],
-    eligibility_score: int,
-    confidence_score: int,
-    relevant_clauses: Optional[List[str]] = None,
-    confidence_vector: Optional[Dict[str, int]] = None
-) -> str:
-    """
-    Constructs a transparent, governance-aware explanation.
-    Deterministic layer decides. This layer explains.
-    """
-
-    lines = []
-
-    # ---------------------------------------
-    # 1️⃣ Decision Summary
-    # ---------------------------------------
-
-    lines.append(f"## 🏷 Final Decision: **{decision_label}**")
-    lines.append(f"- **Eligibility Score:** {eligibility_score}/100")
-    lines.append(f"- **Rule Confidence:** {confidence_score}%")
-
-    if confidence_vector:
-        lines.append("")
-        lines.append("### 🔍 Confidence Breakdown:")
-        lines.append(f"- Rule Coverage: {confidence_vector.get('rule_confidence', 0)}%")
-        lines.append(f"- Retrieval Confidence: {confidence_vector.get('retrieval_confidence', 0)}%")
-        lines.append(f"- Data Completeness: {confidence_vector.get('data_completeness', 0)}%")
-
-    lines.append("")
-
-    # ---------------------------------------
-    # 2️⃣ Governance Context
-    # ---------------------------------------
-
-    if decision_label == "Review":
-        lines.append("⚠ **This application requires manual review due to trust thresholds or policy validation checks.**")
-        lines.append("")
-
-    if decision_label == "Not Eligible":
-        lines.append("❌ The application does not meet one or more mandatory eligibility criteria.")
-        lines.append("")
-
-    # ---------------------------------------
-    # 3️⃣ Failed Rules
-    # ---------------------------------------
-
-    if failed_rules:
-        lines.append("### ❌ Rules Not Satisfied:")
-        for rule in failed_rules:
-            lines.append(f"- **{rule.name}**: {rule.reason}")
-            if rule.suggestion:
-                lines.append(f"  - 💡 Suggestion: {rule.suggestion}")
-        lines.append("")
-
-    # ---------------------------------------
-    # 4️⃣ Passed Rules
-    # ---------------------------------------
-
-    if passed_rules:
-        lines.append("### ✅ Criteria Successfully Met:")
-        for rule in passed_rules:
-            lines.append(f"- **{rule.name}**: {rule.reason}")
-        lines.append("")
-
-    # ---------------------------------------
-    # 5️⃣ Supporting Policy References
-    # ---------------------------------------
-
-    if relevant_clauses:
-        lines.append("### 📚 Supporting Policy References:")
-        for clause in relevant_clauses:
-            lines.append(f"> {clause}")
-        lines.append("")
-
-    # ---------------------------------------
-    # 6️⃣ Transparency Footer
-    # ---------------------------------------
-
-    lines.append("---")
-    lines.append("_This decision was computed using deterministic policy rules with governance safeguards._")
-
-    return "\n".join(lines)
\ No newline at end of file
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models import ExplanationFragment, Rule
+from rule_engine import RuleOutcome
+
+
+# ---------------------------------------
+# Explanation Templates
+# ---------------------------------------
+
+EXPLANATION_FORMATS = ("markdown", "text", "json")
+
+DECISION_LABELS = ("Eligible", "Review", "Not Eligible")
+
+_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "markdown": {
+        "decision": "## 🏷 Final Decision: **{label}**",
+        "score": "- **Eligibility Score:** {score}/100",
+        "confidence": "- **Rule Confidence:** {confidence}%",
+        "breakdown": "### 🔍 Confidence Breakdown:",
+        "coverage": "- Rule Coverage: {value}%",
+        "retrieval": "- Retrieval Confidence: {value}%",
+        "completeness": "- Data Completeness: {value}%",
+        "Review": "⚠ **This application requires manual review due to trust thresholds or policy validation checks.**",
+        "Not Eligible": "❌ The application does not meet one or more mandatory eligibility criteria.",
+        "failed": "### ❌ Rules Not Satisfied:",
+        "passed": "### ✅ Criteria Successfully Met:",
+        "rule": "- **{name}**: ",
+        "suggestion": "  - 💡 Suggestion: ",
+        "references": "### 📚 Supporting Policy References:",
+        "clause": "> ",
+        "rule_break": "---",
+        "footer": "_This decision was computed using deterministic policy rules with governance safeguards._"
+    },
+    "text": {
+        "decision": "Final Decision: {label}",
+        "score": "- Eligibility Score: {score}/100",
+        "confidence": "- Rule Confidence: {confidence}%",
+        "breakdown": "Confidence Breakdown:",
+        "coverage": "- Rule Coverage: {value}%",
+        "retrieval": "- Retrieval Confidence: {value}%",
+        "completeness": "- Data Completeness: {value}%",
+        "Review": "This application requires manual review due to trust thresholds or policy validation checks.",
+        "Not Eligible": "The application does not meet one or more mandatory eligibility criteria.",
+        "failed": "Rules Not Satisfied:",
+        "passed": "Criteria Successfully Met:",
+        "rule": "- {name}: ",
+        "suggestion": "  - Suggestion: ",
+        "references": "Supporting Policy References:",
+        "clause": "> ",
+        "rule_break": "---",
+        "footer": "This decision was computed using deterministic policy rules with governance safeguards."
+    }
+}
+
+# JSON fragments carry the plain-text lines
+_TEMPLATES["json"] = _TEMPLATES["text"]
+
+
+class CompiledExplanation:
+    """
+    Explanation fragments of one ruleset, built once at load: static
+    lines, the heading for each label, and each rule's name line, in
+    every format. Rendering only fills in values.
+    """
+
+    __slots__ = ("headers", "rule_prefixes")
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        rules = list(rules)
+        self.headers = {
+            fmt: {label: t["decision"].format(label=label) for label in DECISION_LABELS}
+            for fmt, t in _TEMPLATES.items()
+        }
+        self.rule_prefixes = {
+            fmt: {rule.id: t["rule"].format(name=rule.name) for rule in rules}
+            for fmt, t in _TEMPLATES.items()
+        }
+
+    def _lines(
+        self,
+        fmt: str,
+        decision_label: str,
+        passed_rules: List[RuleOutcome],
+        failed_rules: List[RuleOutcome],
+        eligibility_score: int,
+        confidence_score: int,
+        relevant_clauses: Optional[List[str]],
+        confidence_vector: Optional[Dict[str, int]]
+    ) -> Iterator[Tuple[Optional[str], Optional[str], str]]:
+        """
+        Yields (section, rule_id, line). Headings and blank lines have
+        no section.
+        """
+        t = _TEMPLATES[fmt]
+        label = getattr(decision_label, "value", decision_label)
+        prefixes = self.rule_prefixes[fmt]
+
+        def rule_line(rule: RuleOutcome) -> str:
+            prefix = prefixes.get(rule.id)
+            if prefix is None:  # not a rule of this ruleset
+                prefix = t["rule"].format(name=rule.name)
+            return prefix + rule.reason
+
+        # 1️⃣ Decision Summary
+        header = self.headers[fmt].get(label)
+        yield "decision", None, header or t["decision"].format(label=label)
+        yield "decision", None, t["score"].format(score=eligibility_score)
+        yield "decision", None, t["confidence"].format(confidence=confidence_score)
+
+        if confidence_vector:
+            yield None, None, ""
+            yield None, None, t["breakdown"]
+            yield "confidence", None, t["coverage"].format(value=confidence_vector.get("rule_confidence", 0))
+            yield "confidence", None, t["retrieval"].format(value=confidence_vector.get("retrieval_confidence", 0))
+            yield "confidence", None, t["completeness"].format(value=confidence_vector.get("data_completeness", 0))
+
+        yield None, None, ""
+
+        # 2️⃣ Governance Context
+        if label in ("Review", "Not Eligible"):
+            yield "governance", None, t[label]
+            yield None, None, ""
+
+        # 3️⃣ Failed Rules
+        if failed_rules:
+            yield None, None, t["failed"]
+            for rule in failed_rules:
+                yield "failed_rule", rule.id, rule_line(rule)
+                if rule.suggestion:
+                    yield "failed_rule", rule.id, t["suggestion"] + rule.suggestion
+            yield None, None, ""
+
+        # 4️⃣ Passed Rules
+        if passed_rules:
+            yield None, None, t["passed"]
+            for rule in passed_rules:
+                yield "passed_rule", rule.id, rule_line(rule)
+            yield None, None, ""
+
+        # 5️⃣ Supporting Policy References
+        if relevant_clauses:
+            yield None, None, t["references"]
+            for clause in relevant_clauses:
+                yield "references", None, t["clause"] + clause
+            yield None, None, ""
+
+        # 6️⃣ Transparency Footer
+        yield None, None, t["rule_break"]
+        yield "footer", None, t["footer"]
+
+    def render(self, fmt: str, *args) -> str:
+        """
+        The explanation as one "markdown" or "text" document.
+        Takes the arguments of `generate_explanation`.
+        """
+        return "\n".join(line for _, _, line in self._lines(fmt, *args))
+
+    def fragments(self, *args) -> List[ExplanationFragment]:
+        """
+        The explanation as plain-text fragments, one per section and
+        rule. Takes the arguments of `generate_explanation`.
+        """
+        fragments: List[ExplanationFragment] = []
+        key = None
+
+        for section, rule_id, line in self._lines("json", *args):
+            if section is None:
+                key = None
+                continue
+            if (section, rule_id) == key:
+                fragments[-1].text += "\n" + line
+                continue
+            fragments.append(ExplanationFragment(section=section, rule_id=rule_id, text=line))
+            key = (section, rule_id)
+
+        return fragments
+
+
+# Used when no ruleset is at hand; rule lines are then built per call
+DEFAULT_EXPLANATION = CompiledExplanation()
+
+
+def generate_explanation(
+    decision_label: str,
+    passed_rules: List[RuleOutcome],
+    failed_rules: List[RuleOutcome],
+    eligibility_score: int,
+    confidence_score: int,
+    relevant_clauses: Optional[List[str]] = None,
+    confidence_vector: Optional[Dict[str, int]] = None
+) -> str:
+    """
+    Constructs a transparent, governance-aware explanation.
+    Deterministic layer decides. This layer explains.
+    Prefer the ruleset's `CompiledExplanation` on hot paths.
+    """
+    return DEFAULT_EXPLANATION.render(
+        "markdown",
+        decision_label,
+        passed_rules,
+        failed_rules,
+        eligibility_score,
+        confidence_score,
+        relevant_clauses,
+        confidence_vector
+    )
+
+
+def generate_summary(
+    decision_label: str,
+    eligibility_score: int,
+    rules_evaluated: int,
+    rules_skipped: int = 0
+) -> str:
+    """
+    One-line explanation for summary responses.
+    """
+    summary = (
+        f"Final Decision: {decision_label} "
+        f"(score {eligibility_score}/100, {rules_evaluated} rules evaluated"
+    )
+    if rules_skipped:
+        summary += f", {rules_skipped} skipped once decided"
+    return summary + ")"
@@ -1,21 +1,55 @@
-import pypdf
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """
-    Extracts text from a PDF file.
-    
-    Args:
-        pdf_path (str): Path to the PDF file.
-        
-    Returns:
-        str: Extracted text content.
-    """
-    try:
-        reader = pypdf.PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        print(f"Error reading PDF {pdf_path}: {e}")
-        return ""
+import hashlib
+from typing import Callable, Iterator, Tuple
+
+import pypdf
+
+
+def page_fingerprint(page: pypdf.PageObject) -> str:
+    """
+    Hash of a page's raw content streams. Cheap compared to text
+    extraction, and changes whenever the drawn text can.
+    """
+    contents = page.get_contents()
+    data = contents.get_data() if contents is not None else b""
+    return hashlib.sha256(data).hexdigest()
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily yields (page_number, text) for each page, 1-based.
+
+    Pages are parsed one at a time, so only the current page's text is
+    held in memory. Raises on unreadable files.
+    """
+    reader = pypdf.PdfReader(pdf_path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield page_number, page.extract_text() or ""
+
+
+def iter_pdf_page_fingerprints(pdf_path: str) -> Iterator[Tuple[int, str, Callable[[], str]]]:
+    """
+    Lazily yields (page_number, fingerprint, extract) for each page.
+
+    `extract()` returns the page text; callers skip it for pages whose
+    fingerprint they have already processed.
+    """
+    reader = pypdf.PdfReader(pdf_path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield page_number, page_fingerprint(page), lambda page=page: page.extract_text() or ""
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """
+    Extracts text from a PDF file.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+
+    Returns:
+        str: Extracted text content.
+    """
+    try:
+        return "\n".join(text for _, text in iter_pdf_pages(pdf_path)).strip()
+    except Exception as e:
+        print(f"Error reading PDF {pdf_path}: {e}")
+        return ""
@@ -0,0 +1,325 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# Seconds; Prometheus-style cumulative buckets
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# -----------------------------------
+# Metric Types
+# -----------------------------------
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """
+    A value that is set, or read from a callback at scrape time.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        function: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterator[str]:
+        if self.function is not None:
+            try:
+                yield f"{self.name} {_format_value(self.function())}"
+            except Exception:
+                # A failing callback must not break the whole scrape
+                pass
+            return
+
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key,
+                ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[position] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            item = self._values.get(self._key(labels))
+            return sum(item[0]) if item else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, (list(c), t[0])) for key, (c, t) in self._values.items())
+
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Named metrics, rendered together in the Prometheus text format.
+    Registering an existing name returns the existing metric.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        function: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames, function)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Singleton instance
+registry = MetricsRegistry()
+
+# -----------------------------------
+# Pipeline Metrics
+# -----------------------------------
+
+STAGE_SECONDS = registry.histogram(
+    "decision_stage_seconds",
+    "Duration of each decision pipeline stage.",
+    ("stage",)
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route.",
+    ("method", "route", "status")
+)
+DECISIONS = registry.counter(
+    "decisions_total",
+    "Decisions returned, by final label.",
+    ("label",)
+)
+CACHE_LOOKUPS = registry.counter(
+    "decision_cache_lookups_total",
+    "Decision cache lookups, by result (hit or miss).",
+    ("result",)
+)
+RULE_ERRORS = registry.counter(
+    "rule_errors_total",
+    "Rules that could not be evaluated, by kind.",
+    ("kind",)
+)
+GOVERNANCE_OVERRIDES = registry.counter(
+    "governance_overrides_total",
+    "Decisions whose deterministic label the governance layer changed.",
+    ("from_label", "to_label")
+)
+
+
+class RequestMetrics:
+    """
+    Stage durations and counts of one request (or one batch chunk).
+
+    Collected where the work runs, possibly in a worker process, and
+    applied to the registry with `record` in the serving process.
+    Picklable.
+    """
+
+    __slots__ = ("durations", "counts")
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[Tuple[str, LabelValues], float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, metric: Counter, amount: float = 1, **labels):
+        key = (metric.name, metric._key(labels))
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+
+# Durations of the request being served, for the Server-Timing header
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> Dict[str, float]:
+    """
+    Starts collecting stage durations for the current request context.
+    """
+    durations: Dict[str, float] = {}
+    _current.set(durations)
+    return durations
+
+
+def record(request_metrics: RequestMetrics, stages: bool = True):
+    """
+    Applies collected durations and counts to the registry. With
+    `stages=False` durations only feed Server-Timing (used for batch
+    chunks, whose stages cover many decisions).
+    """
+    if stages:
+        for name, seconds in request_metrics.durations.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+
+    for (name, key), amount in request_metrics.counts.items():
+        metric = registry.get(name)
+        if isinstance(metric, Counter):
+            metric.inc(amount, **dict(zip(metric.labelnames, key)))
+
+    current = _current.get()
+    if current is not None:
+        for name, seconds in request_metrics.durations.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+
+def server_timing_header(durations: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in durations.items()]
+    parts.append(f"total;dur={total * 1000.0:.3f}")
+    return ", ".join(parts)
@@ -0,0 +1,47 @@
+import pickle
+import unittest
+
+from metrics import MetricsRegistry, RequestMetrics, record, registry, start_request
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = MetricsRegistry().histogram("latency", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, stage="eval")
+
+        text = "\n".join(histogram.samples())
+        self.assertIn('latency_bucket{stage="eval",le="0.1"} 2', text)
+        self.assertIn('latency_bucket{stage="eval",le="1.0"} 3', text)
+        self.assertIn('latency_bucket{stage="eval",le="+Inf"} 4', text)
+        self.assertIn('latency_count{stage="eval"} 4', text)
+        self.assertIn('latency_sum{stage="eval"} 3.65', text)
+
+    def test_render_and_label_escaping(self):
+        metrics = MetricsRegistry()
+        counter = metrics.counter("errors_total", "Errors.", ("kind",))
+        self.assertIs(metrics.counter("errors_total", "Errors.", ("kind",)), counter)
+        counter.inc(kind='bad "quote"\n')
+        metrics.gauge("depth", "Queue depth.", function=lambda: 7)
+
+        text = metrics.render()
+        self.assertIn("# TYPE errors_total counter", text)
+        self.assertIn('errors_total{kind="bad \\"quote\\"\\n"} 1', text)
+        self.assertIn("depth 7", text)
+
+    def test_request_metrics_survive_pickling(self):
+        counter = registry.counter("test_pickled_total", "Test counter.", ("kind",))
+        request_metrics = RequestMetrics()
+        with request_metrics.stage("eval"):
+            pass
+        request_metrics.count(counter, kind="x")
+
+        durations = start_request()
+        record(pickle.loads(pickle.dumps(request_metrics)))
+
+        self.assertEqual(counter.value(kind="x"), 1)
+        self.assertIn("eval", durations)
+
+
+if __name__ == "__main__":
+    unittest.main()
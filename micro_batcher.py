@@ -0,0 +1,157 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from vector_store import vector_store
+
+# How long the first query in a batch may wait for company, and the
+# largest batch sent to the model. A wait of 0 disables batching.
+RETRIEVAL_BATCH_WAIT_MS = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "2"))
+RETRIEVAL_BATCH_MAX = int(os.getenv("RETRIEVAL_BATCH_MAX", "64"))
+
+
+class _Pending:
+    __slots__ = ("query", "index", "k", "threshold", "future")
+
+    def __init__(self, query, index, k, threshold):
+        self.query = query
+        self.index = index
+        self.k = k
+        self.threshold = threshold
+        self.future: Future = Future()
+
+
+class RetrievalBatcher:
+    """
+    Coalesces concurrent `search` calls into `search_batch` calls.
+
+    Callers block on a future while a dispatcher thread collects
+    queries for up to `max_wait_ms` or `max_batch` items, then runs one
+    encode and one top-k matrix multiply per (index, k, threshold)
+    group and hands each caller its own result.
+    """
+
+    def __init__(
+        self,
+        store,
+        max_wait_ms: float = RETRIEVAL_BATCH_WAIT_MS,
+        max_batch: int = RETRIEVAL_BATCH_MAX
+    ):
+        self.store = store
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(max_batch, 1)
+
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.queries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch > 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="retrieval-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        similarity_threshold: float = 0.60,
+        index=None
+    ) -> Tuple[List[str], float]:
+        """
+        Same contract as `VectorStore.search`.
+        """
+        # Nothing to batch until the model is loaded; the direct path
+        # returns (or waits for the model) exactly as before
+        if not self.enabled or not self.store.ready:
+            return self.store.search(query, k, similarity_threshold, index=index)
+
+        self._ensure_started()
+        pending = _Pending(query, index, k, similarity_threshold)
+        self._queue.put(pending)
+        return pending.future.result()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "queries": self.queries,
+                "mean_batch_size": self.queries / self.batches if self.batches else 0.0
+            }
+
+    # -----------------------------------
+    # Dispatcher
+    # -----------------------------------
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _dispatch(self, batch: List[_Pending]):
+        groups: Dict[tuple, List[_Pending]] = {}
+        for pending in batch:
+            key = (id(pending.index), pending.k, pending.threshold)
+            groups.setdefault(key, []).append(pending)
+
+        for members in groups.values():
+            first = members[0]
+            try:
+                results = self.store.search_batch(
+                    [p.query for p in members],
+                    k=first.k,
+                    similarity_threshold=first.threshold,
+                    index=first.index
+                )
+            except Exception as e:
+                for p in members:
+                    p.future.set_exception(e)
+                continue
+
+            for p, result in zip(members, results):
+                p.future.set_result(result)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.queries += len(batch)
+
+    def _run(self):
+        while True:
+            self._dispatch(self._collect())
+
+
+# Singleton instance
+retrieval_batcher = RetrievalBatcher(vector_store)
@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from micro_batcher import RetrievalBatcher
+
+
+class RecordingStore:
+    """
+    Stands in for VectorStore: answers each query with its own text
+    and records the size of every batched call.
+    """
+
+    ready = True
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.direct_calls = 0
+
+    def search(self, query, k=3, similarity_threshold=0.60, index=None):
+        self.direct_calls += 1
+        return [query], 1.0
+
+    def search_batch(self, queries, k=3, similarity_threshold=0.60, index=None):
+        self.batch_sizes.append(len(queries))
+        return [([f"{index}:{query}"], 1.0) for query in queries]
+
+
+class TestRetrievalBatcher(unittest.TestCase):
+    def run_concurrently(self, batcher, queries, index="idx"):
+        results = [None] * len(queries)
+        barrier = threading.Barrier(len(queries))
+
+        def worker(i):
+            barrier.wait()
+            results[i] = batcher.search(queries[i], index=index)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(queries))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_queries_share_batches(self):
+        store = RecordingStore()
+        batcher = RetrievalBatcher(store, max_wait_ms=200, max_batch=64)
+        queries = [f"q{i}" for i in range(16)]
+
+        results = self.run_concurrently(batcher, queries)
+
+        self.assertEqual(results, [([f"idx:{q}"], 1.0) for q in queries])
+        self.assertEqual(sum(store.batch_sizes), 16)
+        self.assertLess(len(store.batch_sizes), 16)
+        self.assertEqual(batcher.stats()["queries"], 16)
+
+    def test_batch_size_is_capped(self):
+        store = RecordingStore()
+        batcher = RetrievalBatcher(store, max_wait_ms=200, max_batch=4)
+
+        self.run_concurrently(batcher, [f"q{i}" for i in range(12)])
+
+        self.assertTrue(all(size <= 4 for size in store.batch_sizes))
+        self.assertEqual(sum(store.batch_sizes), 12)
+
+    def test_zero_wait_bypasses_batching(self):
+        store = RecordingStore()
+        batcher = RetrievalBatcher(store, max_wait_ms=0)
+
+        self.assertEqual(batcher.search("q"), (["q"], 1.0))
+        self.assertEqual(store.direct_calls, 1)
+        self.assertEqual(store.batch_sizes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,95 +1,189 @@
-from typing import List, Dict, Optional, Union
-from pydantic import BaseModel
-from enum import Enum
-
-
-# -----------------------------------
-# Enums
-# -----------------------------------
-
-class DecisionLabel(str, Enum):
-    ELIGIBLE = "Eligible"
-    REVIEW = "Review"
-    NOT_ELIGIBLE = "Not Eligible"
-
-
-class RulePriority(str, Enum):
-    HIGH = "high"
-    MEDIUM = "medium"
-    LOW = "low"
-
-
-# -----------------------------------
-# Rule Definition Models
-# -----------------------------------
-
-class OutcomeEffect(BaseModel):
-    eligible: bool
-    score_delta: int
-
-
-class DocumentReference(BaseModel):
-    doc_id: str
-    page: int
-    section: str
-
-
-class Rule(BaseModel):
-    id: str
-    name: str
-    condition_expression: str
-    variables_required: List[str]
-    outcome_effect: OutcomeEffect
-    priority: RulePriority
-    mandatory: bool
-    document_reference: DocumentReference
-    human_description: str
-
-
-# -----------------------------------
-# API Request Models
-# -----------------------------------
-
-class DecisionRequest(BaseModel):
-    ruleset_id: str
-    user_input: Dict[str, Union[str, int, float, bool]]
-
-
-# -----------------------------------
-# Rule Evaluation Result
-# -----------------------------------
-
-class RuleResult(BaseModel):
-    id: str
-    name: str
-    passed: bool
-    reason: str
-    priority: RulePriority
-    mandatory: bool
-    document_reference: DocumentReference
-    score_delta: int = 0
-    suggestion: Optional[str] = None
-
-
-# -----------------------------------
-# Structured Confidence Model
-# -----------------------------------
-
-class ConfidenceVector(BaseModel):
-    rule_confidence: int
-    retrieval_confidence: int
-    data_completeness: int
-
-
-# -----------------------------------
-# API Response Model
-# -----------------------------------
-
-class DecisionResponse(BaseModel):
-    decision_label: DecisionLabel
-    eligibility_score: int
-    confidence_score: int  # kept for UI compatibility
-    confidence_vector: Optional[ConfidenceVector] = None
-    passed_rules: List[RuleResult]
-    failed_rules: List[RuleResult]
-    explanation_text: str
\ No newline at end of file
+from typing import List, Dict, Optional, Union
+from pydantic import BaseModel
+from enum import Enum
+
+
+# -----------------------------------
+# Enums
+# -----------------------------------
+
+class DecisionLabel(str, Enum):
+    ELIGIBLE = "Eligible"
+    REVIEW = "Review"
+    NOT_ELIGIBLE = "Not Eligible"
+
+
+class RulePriority(str, Enum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+# -----------------------------------
+# Rule Definition Models
+# -----------------------------------
+
+class OutcomeEffect(BaseModel):
+    eligible: bool
+    score_delta: int
+
+
+class DocumentReference(BaseModel):
+    doc_id: str
+    page: int
+    section: str
+
+
+class Rule(BaseModel):
+    id: str
+    name: str
+    condition_expression: str
+    variables_required: List[str]
+    outcome_effect: OutcomeEffect
+    priority: RulePriority
+    mandatory: bool
+    document_reference: DocumentReference
+    human_description: str
+
+
+# -----------------------------------
+# API Request Models
+# -----------------------------------
+
+class DecisionRequest(BaseModel):
+    ruleset_id: str
+    user_input: Dict[str, Union[str, int, float, bool]]
+
+
+# -----------------------------------
+# Rule Evaluation Result
+# -----------------------------------
+
+class RuleResult(BaseModel):
+    id: str
+    name: str
+    passed: bool
+    reason: str
+    priority: RulePriority
+    mandatory: bool
+    document_reference: DocumentReference
+    score_delta: int = 0
+    suggestion: Optional[str] = None
+
+
+# -----------------------------------
+# Structured Confidence Model
+# -----------------------------------
+
+class ConfidenceVector(BaseModel):
+    rule_confidence: int
+    retrieval_confidence: int
+    data_completeness: int
+
+
+# -----------------------------------
+# API Response Model
+# -----------------------------------
+
+class ExplanationFragment(BaseModel):
+    section: str  # decision, confidence, governance, failed_rule, passed_rule, references, footer
+    text: str
+    rule_id: Optional[str] = None
+
+
+class DecisionResponse(BaseModel):
+    decision_label: DecisionLabel
+    eligibility_score: int
+    confidence_score: int  # kept for UI compatibility
+    confidence_vector: Optional[ConfidenceVector] = None
+    passed_rules: List[RuleResult]
+    failed_rules: List[RuleResult]
+    explanation_text: str
+    ruleset_version: Optional[str] = None  # content hash of the ruleset used
+    decision_id: Optional[str] = None  # handle for incremental re-evaluation
+    rules_skipped: int = 0  # never evaluated once the label was decided (summary detail)
+    explanation_fragments: Optional[List[ExplanationFragment]] = None  # format=json only
+
+
+# -----------------------------------
+# Compact Response Models
+# -----------------------------------
+
+class MinimalDecisionResponse(BaseModel):
+    decision_label: DecisionLabel
+    eligibility_score: int
+    confidence_score: int
+    ruleset_version: Optional[str] = None
+    decision_id: Optional[str] = None  # explanation via /explain/{decision_id}
+    rules_skipped: int = 0
+
+
+class StandardDecisionResponse(MinimalDecisionResponse):
+    confidence_vector: Optional[ConfidenceVector] = None
+    passed_rule_ids: List[str]
+    failed_rule_ids: List[str]
+
+
+# -----------------------------------
+# Batch API Models
+# -----------------------------------
+
+class BatchDecisionRequest(BaseModel):
+    ruleset_id: str
+    user_inputs: List[Dict[str, Union[str, int, float, bool]]]
+
+
+# -----------------------------------
+# Incremental Re-evaluation Models
+# -----------------------------------
+
+class IncrementalDecisionRequest(BaseModel):
+    decision_id: str
+    changes: Dict[str, Union[str, int, float, bool]]
+
+
+class RuleFlip(BaseModel):
+    id: str
+    name: str
+    previously_passed: bool
+    passed: bool
+
+
+class IncrementalDecisionResponse(BaseModel):
+    decision: DecisionResponse
+    previous_decision_id: str
+    previous_label: DecisionLabel
+    changed_variables: List[str]
+    reevaluated_rule_ids: List[str]
+    flipped_rules: List[RuleFlip]
+
+
+# -----------------------------------
+# Counterfactual Models
+# -----------------------------------
+
+class CounterfactualRequest(BaseModel):
+    ruleset_id: str
+    user_input: Dict[str, Union[str, int, float, bool]]
+    max_results: int = 3
+    time_budget_ms: Optional[float] = None
+
+
+class InputChange(BaseModel):
+    variable: str
+    current: Optional[Union[str, int, float, bool]] = None  # None if not supplied
+    proposed: Union[str, int, float, bool]
+
+
+class Counterfactual(BaseModel):
+    changes: List[InputChange]
+    eligibility_score: int
+    fixed_rule_ids: List[str]
+    cost: float
+
+
+class CounterfactualResponse(BaseModel):
+    deterministic_label: DecisionLabel
+    counterfactuals: List[Counterfactual]
+    search_complete: bool  # False if the time budget ran out
+    elapsed_ms: float
@@ -0,0 +1,1034 @@
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from models import (
+    DecisionRequest,
+    DecisionResponse,
+    MinimalDecisionResponse,
+    StandardDecisionResponse,
+    ConfidenceVector,
+    RuleFlip,
+    IncrementalDecisionResponse
+)
+from rules_loader import Ruleset, load_ruleset
+from rule_engine import (
+    CompiledRule,
+    RuleOutcome,
+    describe_result,
+    evaluate_compiled_rule,
+    rule_error_kind
+)
+from scoring import (
+    label_for_score,
+    calculate_eligibility_score,
+    determine_deterministic_label,
+    calculate_confidence_vector,
+    apply_governance_layer
+)
+from explanations import DEFAULT_EXPLANATION, CompiledExplanation, generate_summary
+from vector_store import vector_store, failure_query
+from audit_logger import audit_logger, input_checksum
+from decision_cache import decision_cache
+from decision_store import DecisionState, StaleDecision, decision_store, new_decision_id
+from micro_batcher import retrieval_batcher
+from worker_pool import EvaluationPool
+from metrics import (
+    CACHE_LOOKUPS,
+    DECISIONS,
+    GOVERNANCE_OVERRIDES,
+    RULE_ERRORS,
+    RequestMetrics,
+    record
+)
+import serialization
+
+RETRIEVAL_TOP_K = 3
+
+# "minimal": label and scores only
+# "standard": adds the confidence vector and passed/failed rule ids
+# "full": the complete DecisionResponse with reasons and explanation
+# Only "full" renders reasons and explanation text; the others defer
+# them to /explain/{decision_id}. The audit entry is the same in every
+# mode: rule ids, label and scores, never reasons, which /explain
+# re-renders from the stored decision.
+RESPONSE_MODES = ("minimal", "standard", "full")
+
+# -------------------------------------
+# Internal Decision
+# -------------------------------------
+
+
+class Decision:
+    """
+    A decision as it moves through the pipeline, caches and worker
+    processes. Holds `RuleOutcome`s and plain dicts; the pydantic
+    response is built once, at the API boundary, by `to_response`.
+    """
+
+    __slots__ = (
+        "decision_label",
+        "eligibility_score",
+        "confidence_score",
+        "confidence_vector",
+        "passed_rules",
+        "failed_rules",
+        "explanation_text",
+        "ruleset_version",
+        "decision_id",
+        "rules_skipped",
+        "explanation_fragments",
+        "_encoded"
+    )
+
+    def __init__(
+        self,
+        decision_label: str,
+        eligibility_score: int,
+        confidence_score: int,
+        confidence_vector: Dict[str, int],
+        passed_rules: List[RuleOutcome],
+        failed_rules: List[RuleOutcome],
+        explanation_text: str,
+        ruleset_version: Optional[str] = None,
+        decision_id: Optional[str] = None,
+        rules_skipped: int = 0,
+        explanation_fragments: Optional[list] = None
+    ):
+        self.decision_label = decision_label
+        self.eligibility_score = eligibility_score
+        self.confidence_score = confidence_score
+        self.confidence_vector = confidence_vector
+        self.passed_rules = passed_rules
+        self.failed_rules = failed_rules
+        self.explanation_text = explanation_text
+        self.ruleset_version = ruleset_version
+        self.decision_id = decision_id
+        self.rules_skipped = rules_skipped
+        self.explanation_fragments = explanation_fragments
+        self._encoded: Dict[str, bytes] = {}
+
+    def _summary_fields(self) -> Dict[str, Any]:
+        return {
+            "decision_label": self.decision_label,
+            "eligibility_score": self.eligibility_score,
+            "confidence_score": self.confidence_score,
+            "ruleset_version": self.ruleset_version,
+            "decision_id": self.decision_id,
+            "rules_skipped": self.rules_skipped
+        }
+
+    def to_response(self, mode: str = "full"):
+        """
+        The pydantic response model for a response mode.
+        """
+        fields = self._summary_fields()
+
+        if mode == "minimal":
+            return MinimalDecisionResponse(**fields)
+
+        confidence_vector = ConfidenceVector(**self.confidence_vector)
+
+        if mode == "standard":
+            return StandardDecisionResponse(
+                **fields,
+                confidence_vector=confidence_vector,
+                passed_rule_ids=[r.id for r in self.passed_rules],
+                failed_rule_ids=[r.id for r in self.failed_rules]
+            )
+
+        return DecisionResponse(
+            **fields,
+            confidence_vector=confidence_vector,
+            passed_rules=[r.to_model() for r in self.passed_rules],
+            failed_rules=[r.to_model() for r in self.failed_rules],
+            explanation_text=self.explanation_text,
+            explanation_fragments=self.explanation_fragments
+        )
+
+    def to_dict(self, mode: str = "full") -> Dict[str, Any]:
+        """
+        Same content as `to_response(mode).dict()`, without building
+        models. The standard dict is what audit entries are built from.
+        """
+        if mode == "minimal":
+            return self._summary_fields()
+
+        if mode == "standard":
+            fields = self._summary_fields()
+            fields.update(
+                confidence_vector=dict(self.confidence_vector),
+                passed_rule_ids=[r.id for r in self.passed_rules],
+                failed_rule_ids=[r.id for r in self.failed_rules]
+            )
+            return fields
+
+        return {
+            "decision_label": self.decision_label,
+            "eligibility_score": self.eligibility_score,
+            "confidence_score": self.confidence_score,
+            "confidence_vector": dict(self.confidence_vector),
+            "passed_rules": [r.to_dict() for r in self.passed_rules],
+            "failed_rules": [r.to_dict() for r in self.failed_rules],
+            "explanation_text": self.explanation_text,
+            "ruleset_version": self.ruleset_version,
+            "decision_id": self.decision_id,
+            "rules_skipped": self.rules_skipped,
+            "explanation_fragments": (
+                [f.dict() for f in self.explanation_fragments]
+                if self.explanation_fragments is not None else None
+            )
+        }
+
+    def to_json(self, mode: str = "full") -> bytes:
+        """
+        The encoded response body for a response mode. Encoded once per
+        decision and mode, so cached decisions are served as is.
+        """
+        body = self._encoded.get(mode)
+        if body is None:
+            body = self._encoded[mode] = serialization.dumps(self.to_dict(mode))
+        return body
+
+# -------------------------------------
+# Pipeline Stages
+# -------------------------------------
+
+
+def split_results(
+    results: List[RuleOutcome]
+) -> Tuple[List[RuleOutcome], List[RuleOutcome]]:
+    passed_rules: List[RuleOutcome] = []
+    failed_rules: List[RuleOutcome] = []
+
+    for result in results:
+        if result.passed:
+            passed_rules.append(result)
+        else:
+            failed_rules.append(result)
+
+    return passed_rules, failed_rules
+
+
+def evaluate_rules(
+    compiled_rules: List[CompiledRule],
+    user_input: Dict[str, Any],
+    explain: bool = True
+) -> Tuple[List[RuleOutcome], List[RuleOutcome]]:
+    """
+    Runs every compiled rule and splits results into passed/failed.
+    """
+    return split_results([
+        evaluate_compiled_rule(compiled, user_input, explain)
+        for compiled in compiled_rules
+    ])
+
+
+def describe_results(
+    ruleset: Ruleset,
+    results: List[RuleOutcome],
+    user_input: Dict[str, Any]
+) -> List[RuleOutcome]:
+    """
+    Fills in reasons deferred by `explain=False`. `results` must be in
+    ruleset order and from the same ruleset version.
+    """
+    return [
+        describe_result(compiled, result, user_input)
+        for compiled, result in zip(ruleset.compiled, results)
+    ]
+
+
+def outcome_decided(
+    ruleset: Ruleset,
+    evaluated: int,
+    passed_rules: List[RuleOutcome],
+    failed_rules: List[RuleOutcome]
+) -> bool:
+    """
+    True once the rules still ahead in `ruleset.evaluation_order` can
+    no longer change the deterministic label.
+    """
+    if any(r.mandatory for r in failed_rules):
+        return True
+    if evaluated < ruleset.mandatory_count:
+        return False
+
+    # Score range still reachable, clamped like the eligibility score
+    score = sum(r.score_delta for r in passed_rules)
+    lowest = max(0, min(100, score + ruleset.remaining_loss[evaluated]))
+    highest = max(0, min(100, score + ruleset.remaining_gain[evaluated]))
+    return label_for_score(lowest) == label_for_score(highest)
+
+
+def evaluate_rules_short_circuit(
+    ruleset: Ruleset,
+    user_input: Dict[str, Any],
+    explain: bool = True,
+    exact: bool = False
+) -> Tuple[
+    List[RuleOutcome],
+    List[RuleOutcome],
+    int,
+    Tuple[List[RuleOutcome], List[RuleOutcome]]
+]:
+    """
+    Evaluates rules mandatory/high priority first and stops as soon as
+    the outcome is decided; only the rules that ran are listed. The
+    deterministic label is the same as with every rule, but the score,
+    confidence, retrieval query and so governance see only those rules
+    and may differ from full detail. With `exact` the remaining rules
+    are still checked, without reasons, so everything but the listing
+    matches full detail.
+
+    Returns (passed, failed, skipped, (listed passed, listed failed)),
+    all in ruleset order; `skipped` counts the rules never evaluated.
+    """
+    passed_rules: List[RuleOutcome] = []
+    failed_rules: List[RuleOutcome] = []
+    order = ruleset.evaluation_order
+    results: List[Optional[RuleOutcome]] = [None] * len(order)
+    decided = len(order)
+
+    for n, position in enumerate(order, start=1):
+        result = evaluate_compiled_rule(ruleset.compiled[position], user_input, explain)
+        results[position] = result
+        if result.passed:
+            passed_rules.append(result)
+        else:
+            failed_rules.append(result)
+
+        if n < len(order) and outcome_decided(ruleset, n, passed_rules, failed_rules):
+            decided = n
+            break
+
+    listed = split_results([result for result in results if result is not None])
+    if not exact:
+        return listed + (len(order) - decided, listed)
+
+    for position in order[decided:]:
+        results[position] = evaluate_compiled_rule(ruleset.compiled[position], user_input, False)
+
+    return split_results(results) + (0, listed)
+
+
+def retrieval_query(failed_rules: List[RuleOutcome]) -> str:
+    return failure_query([r.name for r in failed_rules])
+
+
+def count_rule_errors(request_metrics: RequestMetrics, failed_rules: List[RuleOutcome]):
+    for result in failed_rules:
+        kind = rule_error_kind(result)
+        if kind is not None:
+            request_metrics.count(RULE_ERRORS, kind=kind)
+
+
+def count_decision(response: Decision):
+    label = response.decision_label
+    DECISIONS.inc(label=getattr(label, "value", label))
+
+
+def build_response(
+    passed_rules: List[RuleOutcome],
+    failed_rules: List[RuleOutcome],
+    total_rules: int,
+    relevant_clauses: List[str],
+    similarity_score: float,
+    ruleset_version: Optional[str] = None,
+    decision_id: Optional[str] = None,
+    rules_skipped: int = 0,
+    explanation: Optional[str] = "full",
+    templates: Optional[CompiledExplanation] = None,
+    explanation_format: str = "markdown",
+    request_metrics: Optional[RequestMetrics] = None,
+    reported_rules: Optional[Tuple[List[RuleOutcome], List[RuleOutcome]]] = None
+) -> Decision:
+    """
+    Scoring, confidence, governance and explanation stages.
+    Scores use every rule in `passed_rules`/`failed_rules`; when set,
+    only `reported_rules` (passed, failed) are listed in the response.
+    `total_rules` excludes the `rules_skipped` that never ran.
+    `explanation` is "full", "summary" (one line) or None (deferred).
+    A full explanation is rendered from the ruleset's precompiled
+    `templates` in `explanation_format`; "json" fills
+    `explanation_fragments` instead of `explanation_text`.
+    Stage durations and governance overrides go to `request_metrics`.
+    """
+    request_metrics = request_metrics or RequestMetrics()
+
+    with request_metrics.stage("score"):
+        # Eligibility Score
+        eligibility_score = calculate_eligibility_score(passed_rules)
+
+        # Deterministic Label
+        deterministic_label = determine_deterministic_label(
+            passed_rules,
+            failed_rules,
+            eligibility_score
+        )
+
+        # Data Completeness (coverage proxy)
+        evaluated_count = len(passed_rules) + len(failed_rules)
+        data_completeness = evaluated_count / max(total_rules, 1)
+
+        # Confidence Vector
+        confidence_vector_dict = calculate_confidence_vector(
+            passed_rules,
+            failed_rules,
+            total_rules,
+            similarity_score,
+            data_completeness
+        )
+
+    with request_metrics.stage("governance"):
+        # Governance Layer
+        final_label = apply_governance_layer(
+            deterministic_label,
+            confidence_vector_dict
+        )
+
+    if final_label != deterministic_label:
+        request_metrics.count(
+            GOVERNANCE_OVERRIDES,
+            from_label=deterministic_label,
+            to_label=final_label
+        )
+
+    # Confidence Score (UI compatibility)
+    confidence_score = confidence_vector_dict["rule_confidence"]
+
+    if reported_rules is not None:
+        passed_rules, failed_rules = reported_rules
+
+    with request_metrics.stage("explain"):
+        explanation_text, explanation_fragments = render_explanation(
+            explanation,
+            explanation_format,
+            templates,
+            final_label,
+            passed_rules,
+            failed_rules,
+            eligibility_score,
+            confidence_score,
+            relevant_clauses,
+            confidence_vector_dict,
+            evaluated_count,
+            rules_skipped
+        )
+
+    return Decision(
+        final_label,
+        eligibility_score,
+        confidence_score,
+        confidence_vector_dict,
+        passed_rules,
+        failed_rules,
+        explanation_text,
+        ruleset_version,
+        decision_id,
+        rules_skipped,
+        explanation_fragments
+    )
+
+
+def render_explanation(
+    explanation: Optional[str],
+    explanation_format: str,
+    templates: Optional[CompiledExplanation],
+    final_label: str,
+    passed_rules: List[RuleOutcome],
+    failed_rules: List[RuleOutcome],
+    eligibility_score: int,
+    confidence_score: int,
+    relevant_clauses: List[str],
+    confidence_vector_dict: Dict[str, int],
+    rules_evaluated: int,
+    rules_skipped: int
+) -> Tuple[str, Optional[list]]:
+    """
+    (explanation_text, explanation_fragments) for `build_response`.
+    """
+    explanation_text = ""
+    explanation_fragments = None
+
+    if explanation == "full":
+        templates = templates or DEFAULT_EXPLANATION
+        explanation_args = (
+            final_label,
+            passed_rules,
+            failed_rules,
+            eligibility_score,
+            confidence_score,
+            relevant_clauses,
+            confidence_vector_dict
+        )
+        if explanation_format == "json":
+            explanation_fragments = templates.fragments(*explanation_args)
+        else:
+            explanation_text = templates.render(explanation_format, *explanation_args)
+    elif explanation == "summary":
+        explanation_text = generate_summary(
+            final_label,
+            eligibility_score,
+            rules_evaluated,
+            rules_skipped
+        )
+
+    return explanation_text, explanation_fragments
+
+
+def explanation_level(detail: str, mode: str) -> Optional[str]:
+    if mode != "full":
+        return None
+    return "summary" if detail == "summary" else "full"
+
+# -------------------------------------
+# Single Decision
+# -------------------------------------
+
+
+def compute_decision(
+    ruleset_id: str,
+    user_input: Dict[str, Any],
+    detail: str = "full",
+    mode: str = "full",
+    exact: bool = False
+) -> Tuple[Decision, Optional[DecisionState], bool, RequestMetrics]:
+    """
+    The CPU-bound part of a decision: rule evaluation, retrieval,
+    scoring and explanation. Takes only picklable arguments so it can
+    run in a worker process.
+
+    Returns (response, state, cacheable, metrics); the caller records
+    the metrics, since a worker process has its own registry. While the embedding model
+    warms up retrieval is skipped, which routes the decision to Review;
+    such decisions are not cacheable. Summary decisions have no state
+    (and no decision id), since not every rule result has its reason.
+    Outside `mode="full"` rule reasons and the explanation are left
+    empty (see `explain_decision`). `exact` applies to summary detail
+    (see `evaluate_rules_short_circuit`).
+    """
+    explain = mode == "full"
+    request_metrics = RequestMetrics()
+
+    # 0️⃣ Current Ruleset Version (one snapshot for the whole decision)
+    with request_metrics.stage("load"):
+        ruleset = load_ruleset(ruleset_id)
+    rules = ruleset.rules
+
+    # 1️⃣ Get (cached) Vector Index for this ruleset
+    retrieval_warming_up = vector_store.warming_up
+    with request_metrics.stage("index"):
+        rule_index = vector_store.init_index(rules, ruleset_id)
+
+    # 2️⃣ Deterministic Rule Evaluation
+    with request_metrics.stage("eval"):
+        if detail == "summary":
+            passed_rules, failed_rules, skipped, reported = evaluate_rules_short_circuit(
+                ruleset,
+                user_input,
+                explain,
+                exact
+            )
+        else:
+            # Results kept in ruleset order for incremental re-evaluation
+            results = [
+                evaluate_compiled_rule(compiled, user_input, explain)
+                for compiled in ruleset.compiled
+            ]
+            passed_rules, failed_rules = split_results(results)
+            skipped = 0
+            reported = None
+
+    count_rule_errors(request_metrics, failed_rules)
+
+    # 3️⃣ CRAG Retrieval (coalesced with concurrent requests)
+    with request_metrics.stage("retrieve"):
+        relevant_clauses, similarity_score = retrieval_batcher.search(
+            retrieval_query(failed_rules),
+            k=RETRIEVAL_TOP_K,
+            index=rule_index
+        )
+
+    # 4️⃣ Scoring, Governance, Explanation
+    full = detail != "summary"
+    decision_id = new_decision_id() if full else None
+    response_obj = build_response(
+        passed_rules,
+        failed_rules,
+        len(rules) - skipped,
+        relevant_clauses,
+        similarity_score,
+        ruleset.version,
+        decision_id,
+        rules_skipped=skipped,
+        explanation=explanation_level(detail, mode),
+        templates=ruleset.explanation,
+        request_metrics=request_metrics,
+        reported_rules=reported
+    )
+
+    if not full:
+        return response_obj, None, not retrieval_warming_up, request_metrics
+
+    state = DecisionState(
+        decision_id,
+        ruleset_id,
+        ruleset.version,
+        dict(user_input),
+        results,
+        relevant_clauses,
+        similarity_score,
+        not retrieval_warming_up,
+        response_obj.decision_label
+    )
+
+    return response_obj, state, not retrieval_warming_up, request_metrics
+
+
+def decision_cache_key(
+    checksum: str,
+    detail: str,
+    mode: str = "full",
+    exact: bool = False
+) -> str:
+    # Summary and full decisions, and decisions with and without
+    # reasons, are cached apart; minimal and standard share one entry
+    key = checksum if detail == "full" else f"{checksum}:{detail}"
+    if exact and detail == "summary":
+        key += ":exact"
+    return key if mode == "full" else f"{key}:lean"
+
+
+def lookup_cached_decision(
+    ruleset: Ruleset,
+    cache_key: str
+) -> Optional[Tuple[Decision, dict]]:
+    """
+    Returns (response, response_dict) for a decision cached against
+    this ruleset version. Its state is put back in the decision store,
+    so its id stays usable for incremental re-evaluation.
+    """
+    cached = decision_cache.get(ruleset.ruleset_id, ruleset.content_hash, cache_key)
+
+    CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+
+    response_obj, response_dict, state = cached
+    if state is not None:
+        decision_store.put(state)
+    return response_obj, response_dict
+
+
+def remember_decision(
+    ruleset_id: str,
+    cache_key: str,
+    response_obj: Decision,
+    response_dict: dict,
+    state: Optional[DecisionState],
+    cacheable: bool
+):
+    if state is not None:
+        decision_store.put(state)
+
+    if cacheable:
+        # Keyed by the version the response was computed against, so a
+        # decision racing a ruleset reload is never cached under the new one
+        decision_cache.put(
+            ruleset_id,
+            response_obj.ruleset_version,
+            cache_key,
+            (response_obj, response_dict, state)
+        )
+
+
+def init_evaluation_worker():
+    """
+    Pool initializer: warms the embedding model as soon as a worker
+    starts (a no-op for threads sharing the parent's vector store).
+    """
+    vector_store.start_loading()
+
+
+async def evaluate_decision_async(
+    request: DecisionRequest,
+    pool: EvaluationPool,
+    detail: str = "full",
+    mode: str = "full",
+    exact: bool = False
+) -> Decision:
+    """
+    Full decision pipeline for one applicant. Cache lookups and audit
+    enqueueing stay on the event loop; the CPU-bound work runs in `pool`.
+    Identical requests against an unchanged ruleset are served from
+    the decision cache, and still audit-logged as cache hits.
+    With `detail="summary"` evaluation stops once the label is decided
+    (unless `exact`; see `evaluate_rules_short_circuit`).
+    Outside `mode="full"` reasons and explanation are deferred; pass
+    the result through `Decision.to_response` for the client.
+
+    Raises:
+        PoolSaturated: If the pool has no room for another evaluation.
+        asyncio.TimeoutError: If the evaluation exceeds the pool timeout.
+        FileNotFoundError: If the ruleset doesn't exist.
+        ValueError: If the ruleset is invalid.
+    """
+
+    request_dict = {"ruleset_id": request.ruleset_id, "user_input": request.user_input}
+    checksum = input_checksum(request_dict)
+    lookup_metrics = RequestMetrics()
+
+    cache_key = decision_cache_key(checksum, detail, mode, exact)
+
+    with lookup_metrics.stage("cache"):
+        # A first load or hot reload parses and compiles the ruleset,
+        # which must not stall the event loop
+        ruleset = await asyncio.to_thread(load_ruleset, request.ruleset_id)
+        cached = lookup_cached_decision(ruleset, cache_key)
+
+    if cached is not None:
+        response_obj, response_dict = cached
+        with lookup_metrics.stage("audit"):
+            await audit_logger.alog_decision(
+                request_dict,
+                response_dict,
+                checksum=checksum,
+                cache_hit=True
+            )
+        record(lookup_metrics)
+        count_decision(response_obj)
+        return response_obj
+
+    response_obj, state, cacheable, request_metrics = await pool.run(
+        compute_decision,
+        request.ruleset_id,
+        request.user_input,
+        detail,
+        mode,
+        exact
+    )
+
+    # 5️⃣ Audit Logging
+    with request_metrics.stage("audit"):
+        response_dict = response_obj.to_dict("standard")
+        await audit_logger.alog_decision(request_dict, response_dict, checksum=checksum)
+
+    remember_decision(
+        request.ruleset_id,
+        cache_key,
+        response_obj,
+        response_dict,
+        state,
+        cacheable
+    )
+
+    record(lookup_metrics)
+    record(request_metrics)
+    count_decision(response_obj)
+    return response_obj
+
+# -------------------------------------
+# Incremental Re-evaluation
+# -------------------------------------
+
+
+def changed_variables(
+    previous_input: Dict[str, Any],
+    changes: Dict[str, Any]
+) -> List[str]:
+    # Compare types too: 1 == True, but rules may treat them differently
+    return sorted(
+        var for var, value in changes.items()
+        if var not in previous_input
+        or previous_input[var] != value
+        or type(previous_input[var]) is not type(value)
+    )
+
+
+def reevaluate_decision(
+    decision_id: str,
+    changes: Dict[str, Any]
+) -> IncrementalDecisionResponse:
+    """
+    Re-runs a stored decision with some inputs changed.
+
+    Only rules that read a changed variable are re-evaluated, and the
+    previous retrieval is reused while the set of failed rules is the
+    same. If the ruleset has changed since, every rule is re-evaluated.
+    The result is a new decision (new id, audit-logged as usual) plus
+    the rules whose outcome flipped.
+
+    Raises:
+        KeyError: If the decision is unknown or has expired.
+        FileNotFoundError: If the ruleset no longer exists.
+        ValueError: If the ruleset is invalid.
+    """
+
+    previous = decision_store.get(decision_id)
+    if previous is None:
+        raise KeyError(decision_id)
+
+    request_metrics = RequestMetrics()
+    with request_metrics.stage("load"):
+        ruleset = load_ruleset(previous.ruleset_id)
+    user_input = {**previous.user_input, **changes}
+    changed = changed_variables(previous.user_input, changes)
+    same_version = ruleset.version == previous.ruleset_version
+
+    # 1️⃣ Affected Rules Only
+    if same_version:
+        positions = ruleset.affected_rules(changed)
+        results = list(previous.results)
+    else:
+        positions = list(range(len(ruleset.compiled)))
+        results = [None] * len(ruleset.compiled)
+
+    with request_metrics.stage("eval"):
+        for i in positions:
+            results[i] = evaluate_compiled_rule(ruleset.compiled[i], user_input)
+
+        # Reused results may come from a decision made without reasons
+        results = describe_results(ruleset, results, user_input)
+
+    passed_rules, failed_rules = split_results(results)
+    count_rule_errors(request_metrics, [results[i] for i in positions if not results[i].passed])
+
+    # 2️⃣ CRAG Retrieval (skipped when the failed rules are unchanged)
+    retrieval_warming_up = vector_store.warming_up
+    query = retrieval_query(failed_rules)
+    previous_query = retrieval_query([r for r in previous.results if not r.passed])
+
+    if same_version and previous.retrieval_ready and query == previous_query:
+        relevant_clauses = previous.relevant_clauses
+        similarity_score = previous.similarity_score
+        retrieval_ready = True
+    else:
+        with request_metrics.stage("retrieve"):
+            rule_index = vector_store.init_index(ruleset.rules, ruleset.ruleset_id)
+            relevant_clauses, similarity_score = retrieval_batcher.search(
+                query,
+                k=RETRIEVAL_TOP_K,
+                index=rule_index
+            )
+        retrieval_ready = not retrieval_warming_up
+
+    # 3️⃣ Scoring, Governance, Explanation
+    new_id = new_decision_id()
+    response_obj = build_response(
+        passed_rules,
+        failed_rules,
+        len(ruleset.rules),
+        relevant_clauses,
+        similarity_score,
+        ruleset.version,
+        new_id,
+        templates=ruleset.explanation,
+        request_metrics=request_metrics
+    )
+
+    state = DecisionState(
+        new_id,
+        ruleset.ruleset_id,
+        ruleset.version,
+        user_input,
+        results,
+        relevant_clauses,
+        similarity_score,
+        retrieval_ready,
+        response_obj.decision_label
+    )
+
+    # 4️⃣ Audit Logging
+    request_dict = {"ruleset_id": ruleset.ruleset_id, "user_input": user_input}
+    checksum = input_checksum(request_dict)
+    with request_metrics.stage("audit"):
+        response_dict = response_obj.to_dict("standard")
+        audit_logger.log_decision(request_dict, response_dict, checksum=checksum)
+
+    remember_decision(
+        ruleset.ruleset_id,
+        checksum,
+        response_obj,
+        response_dict,
+        state,
+        retrieval_ready
+    )
+    record(request_metrics)
+    count_decision(response_obj)
+
+    # 5️⃣ Rule Flips
+    previously_passed = {r.id: r.passed for r in previous.results}
+    flipped_rules = [
+        RuleFlip(
+            id=r.id,
+            name=r.name,
+            previously_passed=previously_passed[r.id],
+            passed=r.passed
+        )
+        for r in results
+        if r.id in previously_passed and previously_passed[r.id] != r.passed
+    ]
+
+    return IncrementalDecisionResponse(
+        decision=response_obj.to_response(),
+        previous_decision_id=previous.decision_id,
+        previous_label=previous.decision_label,
+        changed_variables=changed,
+        reevaluated_rule_ids=[ruleset.compiled[i].rule.id for i in positions],
+        flipped_rules=flipped_rules
+    )
+
+# -------------------------------------
+# Deferred Explanation
+# -------------------------------------
+
+
+def explain_decision(
+    decision_id: str,
+    explanation_format: str = "markdown"
+) -> Decision:
+    """
+    Renders the full response of a stored decision: rule reasons,
+    suggestions and explanation (in any of EXPLANATION_FORMATS),
+    including those deferred by a minimal or standard response.
+    Nothing is re-evaluated or logged.
+
+    Raises:
+        KeyError: If the decision is unknown or has expired.
+        StaleDecision: If its ruleset has changed since.
+        FileNotFoundError: If the ruleset no longer exists.
+    """
+
+    state = decision_store.get(decision_id)
+    if state is None:
+        raise KeyError(decision_id)
+
+    # Reasons quote rule conditions, so they need the same version
+    ruleset = load_ruleset(state.ruleset_id)
+    if ruleset.version != state.ruleset_version:
+        raise StaleDecision(decision_id)
+
+    results = describe_results(ruleset, state.results, state.user_input)
+    passed_rules, failed_rules = split_results(results)
+
+    return build_response(
+        passed_rules,
+        failed_rules,
+        len(ruleset.rules),
+        state.relevant_clauses,
+        state.similarity_score,
+        ruleset.version,
+        state.decision_id,
+        templates=ruleset.explanation,
+        explanation_format=explanation_format
+    )
+
+# -------------------------------------
+# Batch Decisions
+# -------------------------------------
+
+
+def iter_evaluate_batch(
+    ruleset_id: str,
+    user_inputs: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None,
+    detail: str = "full",
+    mode: str = "full",
+    exact: bool = False
+) -> Iterator[Decision]:
+    """
+    Evaluates many applicants against one ruleset.
+    With `detail="summary"` each applicant stops at the rules that
+    decided the label (checking the rest only with `exact`);
+    outside `mode="full"` reasons and explanations are skipped.
+
+    One ruleset version is loaded and indexed for the whole call.
+    Each chunk of inputs shares a single batched retrieval encode and
+    a single audit write.
+    The ruleset is loaded eagerly so lookup errors surface before the
+    first result is yielded.
+    """
+
+    ruleset = load_ruleset(ruleset_id)
+    rules = ruleset.rules
+    rule_index = vector_store.init_index(rules, ruleset_id)
+
+    chunk_size = chunk_size or max(len(user_inputs), 1)
+    explain = mode == "full"
+
+    def _generate() -> Iterator[Decision]:
+        for start in range(0, len(user_inputs), chunk_size):
+            chunk = user_inputs[start:start + chunk_size]
+            # Stages span the whole chunk: counted, not timed per decision
+            chunk_metrics = RequestMetrics()
+
+            with chunk_metrics.stage("eval"):
+                if detail == "summary":
+                    evaluated = [
+                        evaluate_rules_short_circuit(ruleset, user_input, explain, exact)
+                        for user_input in chunk
+                    ]
+                else:
+                    evaluated = [
+                        evaluate_rules(ruleset.compiled, user_input, explain) + (0, None)
+                        for user_input in chunk
+                    ]
+
+            for _, failed, _, _ in evaluated:
+                count_rule_errors(chunk_metrics, failed)
+
+            with chunk_metrics.stage("retrieve"):
+                retrievals = vector_store.search_batch(
+                    [retrieval_query(failed) for _, failed, _, _ in evaluated],
+                    k=RETRIEVAL_TOP_K,
+                    index=rule_index
+                )
+
+            responses = [
+                build_response(
+                    passed,
+                    failed,
+                    len(rules) - skipped,
+                    clauses,
+                    similarity,
+                    ruleset.version,
+                    rules_skipped=skipped,
+                    explanation=explanation_level(detail, mode),
+                    templates=ruleset.explanation,
+                    request_metrics=chunk_metrics,
+                    reported_rules=reported
+                )
+                for (passed, failed, skipped, reported), (clauses, similarity)
+                in zip(evaluated, retrievals)
+            ]
+
+            with chunk_metrics.stage("audit"):
+                audit_logger.log_decisions([
+                    (
+                        {"ruleset_id": ruleset_id, "user_input": user_input},
+                        response.to_dict("standard")
+                    )
+                    for user_input, response in zip(chunk, responses)
+                ])
+
+            record(chunk_metrics, stages=False)
+            for response in responses:
+                count_decision(response)
+
+            yield from responses
+
+    return _generate()
+
+
+def evaluate_batch(
+    ruleset_id: str,
+    user_inputs: List[Dict[str, Any]],
+    detail: str = "full",
+    mode: str = "full",
+    exact: bool = False
+) -> List[Decision]:
+    """
+    Evaluates many applicants against one ruleset in a single pass.
+    """
+    return list(iter_evaluate_batch(
+        ruleset_id, user_inputs, detail=detail, mode=mode, exact=exact
+    ))
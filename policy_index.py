@@ -0,0 +1,497 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ann_index import build_index
+from models import DocumentReference
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# Directory of the persistent policy clause index ("" = no policy retrieval)
+POLICY_INDEX_DIR = os.getenv("POLICY_INDEX_DIR", "")
+
+# Rewrite the index once this fraction of rows is deleted
+COMPACT_DELETED_RATIO = float(os.getenv("POLICY_INDEX_COMPACT_RATIO", "0.25"))
+
+# Seconds between checks for changes made by an ingestion process
+REFRESH_INTERVAL = float(os.getenv("POLICY_INDEX_REFRESH", "1.0"))
+
+META_FILE = "meta.json"
+GENERATION_FILE = re.compile(r"^(?:embeddings|clauses|deleted)-(\d+)\.(?:f32|jsonl|txt)$")
+
+# Rows are copied this many at a time when compacting
+_COMPACT_CHUNK = 4096
+
+
+def clause_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Clause:
+    """
+    A chunk of policy text and where it came from.
+    """
+
+    __slots__ = ("doc_id", "page", "section", "text")
+
+    def __init__(self, doc_id: str, page: int, section: str, text: str):
+        self.doc_id = doc_id
+        self.page = page
+        self.section = section
+        self.text = text
+
+    @property
+    def reference(self) -> DocumentReference:
+        return DocumentReference(doc_id=self.doc_id, page=self.page, section=self.section)
+
+    def label(self) -> str:
+        """
+        Clause text prefixed with its source, as shown in explanations.
+        """
+        section = f" §{self.section}" if self.section else ""
+        return f"[{self.doc_id} p.{self.page}{section}] {self.text}"
+
+    def to_dict(self) -> Dict:
+        return {
+            "doc_id": self.doc_id,
+            "page": self.page,
+            "section": self.section,
+            "text": self.text
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Clause) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Clause({self.doc_id!r}, {self.page}, {self.section!r}, {self.text[:40]!r})"
+
+
+class PolicyIndex:
+    """
+    Append-only, on-disk index of policy clause embeddings.
+
+    `meta.json` names the model, dimension and current generation; each
+    generation has `embeddings-<g>.f32` (raw float32 rows),
+    `clauses-<g>.jsonl` (one clause and its text hash per row) and
+    `deleted-<g>.txt` (deleted row numbers). Appends write embeddings
+    before clauses, and only rows present in both files are visible,
+    so a crash mid-append loses at most that batch. Deletes are
+    tombstones until `compact` writes the next generation and publishes
+    it by replacing `meta.json`; the previous generation's files are
+    kept until the compaction after that, so readers can switch over.
+
+    Embeddings and clause lines are memory-mapped read-only; only the
+    byte offset of each line is held in memory, and clauses are decoded
+    when a search returns them. The hash and page lookups used by
+    ingestion are built on first use. An instance is a snapshot:
+    readers check `changed()` and load a new instance to see another
+    process's writes.
+    """
+
+    def __init__(self, path: str, refresh_interval: float = REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.model_name: Optional[str] = None
+        self.dim: Optional[int] = None
+        self.generation = 0
+        self.deleted: set = set()
+        # Start of each stored row in the clauses file, plus its end
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._text: Optional[mmap.mmap] = None
+        self._by_hash: Optional[Dict[str, int]] = None
+        self._by_page: Optional[Dict[Tuple[str, int], List[int]]] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._ann = None
+        self._lock = threading.Lock()
+        self._signature: Tuple = ()
+        self._checked_at = 0.0
+
+        for attempt in range(2):
+            try:
+                self._load()
+                # Open now: the files may be compacted away later
+                self.embeddings
+                break
+            except FileNotFoundError:
+                # Compacted between reading meta.json and the files
+                if attempt:
+                    raise
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        if name == META_FILE:
+            return os.path.join(self.path, name)
+        stem, ext = name.split(".")
+        g = self.generation if generation is None else generation
+        return os.path.join(self.path, f"{stem}-{g}.{ext}")
+
+    def _stat_signature(self) -> Tuple:
+        signature = []
+        for name in (META_FILE, "clauses.jsonl", "deleted.txt"):
+            try:
+                stat = os.stat(self._file(name))
+                signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def changed(self) -> bool:
+        """
+        Whether the files on disk moved on (appends, deletes or a
+        compaction) since this instance was loaded. Checked at most
+        every `refresh_interval` seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return False
+        self._checked_at = now
+        # meta.json is replaced on compaction, so its inode changes
+        return self._stat_signature() != self._signature
+
+    def _map_text(self) -> Optional[mmap.mmap]:
+        try:
+            with open(self._file("clauses.jsonl"), "rb") as f:
+                if not os.fstat(f.fileno()).st_size:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        try:
+            with open(self._file(META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        self.model_name = meta["model"]
+        self.dim = int(meta["dim"])
+        self.generation = int(meta.get("generation", 0))
+        self._signature = self._stat_signature()
+
+        # Row offsets from the line ends; a last line without a newline
+        # is torn and left out
+        self._text = self._map_text()
+        ends = np.zeros(0, dtype=np.int64)
+        if self._text is not None:
+            ends = np.flatnonzero(np.frombuffer(self._text, dtype=np.uint8) == ord("\n")) + 1
+        offsets = np.concatenate(([0], ends)).astype(np.int64)
+
+        try:
+            stored_rows = os.path.getsize(self._file("embeddings.f32")) // (self.dim * 4)
+        except FileNotFoundError:
+            stored_rows = 0
+
+        rows = min(len(offsets) - 1, stored_rows)
+        self._offsets = offsets[:rows + 1]
+
+        self.deleted = set()
+        try:
+            with open(self._file("deleted.txt"), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip().isdigit() and int(line) < rows:
+                        self.deleted.add(int(line))
+        except FileNotFoundError:
+            pass
+
+        self._by_hash = None
+        self._by_page = None
+        self._embeddings = None
+        self._ann = None
+
+    @property
+    def stored_rows(self) -> int:
+        """
+        Number of stored rows, deleted ones included.
+        """
+        return len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        """
+        Number of live (not deleted) rows.
+        """
+        return self.stored_rows - len(self.deleted)
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        """
+        Read-only memory map of all stored rows, deleted ones included.
+        """
+        with self._lock:
+            if self._embeddings is None and self.stored_rows:
+                self._embeddings = np.memmap(
+                    self._file("embeddings.f32"),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self.stored_rows, self.dim)
+                )
+            return self._embeddings
+
+    # -----------------------------------
+    # Lookup
+    # -----------------------------------
+
+    def _line(self, row: int) -> bytes:
+        with self._lock:
+            if self._text is None:
+                # Dropped by an append, which grew the file
+                self._text = self._map_text()
+            return self._text[self._offsets[row]:self._offsets[row + 1]]
+
+    def _record(self, row: int) -> Dict:
+        return json.loads(self._line(row))
+
+    def clause(self, row: int) -> Clause:
+        item = self._record(row)
+        item.pop("hash")
+        return Clause(**item)
+
+    @property
+    def clauses(self) -> List[Clause]:
+        """
+        Every stored clause, deleted ones included. Decodes the whole
+        file; searches only decode the rows they return.
+        """
+        return [self.clause(row) for row in range(self.stored_rows)]
+
+    def _lookups(self) -> Tuple[Dict[str, int], Dict[Tuple[str, int], List[int]]]:
+        if self._by_hash is None:
+            by_hash, by_page = {}, {}
+            for row in range(self.stored_rows):
+                self._track(row, self._record(row), by_hash, by_page)
+            self._by_hash, self._by_page = by_hash, by_page
+        return self._by_hash, self._by_page
+
+    def _track(self, row: int, item: Dict, by_hash: Dict, by_page: Dict):
+        # Deleted rows stay reusable by hash until compaction drops them
+        by_hash.setdefault(item["hash"], row)
+        if row not in self.deleted:
+            by_page.setdefault((item["doc_id"], item["page"]), []).append(row)
+
+    def rows(self, doc_id: str, pages: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Live rows of a document, optionally limited to some pages.
+        """
+        _, by_page = self._lookups()
+        if pages is None:
+            return [
+                row for (doc, _), rows in by_page.items() if doc == doc_id
+                for row in rows
+            ]
+        return [row for page in pages for row in by_page.get((doc_id, page), [])]
+
+    def embedding_for(self, text_hash: str) -> Optional[np.ndarray]:
+        """
+        Stored embedding of a clause with this text hash, if any
+        (including deleted rows not yet compacted away).
+        """
+        by_hash, _ = self._lookups()
+        row = by_hash.get(text_hash)
+        if row is None:
+            return None
+        return np.array(self.embeddings[row])
+
+    # -----------------------------------
+    # Writing
+    # -----------------------------------
+
+    def _write_meta(self, generation: int):
+        tmp = self._file(META_FILE) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "generation": generation}, f)
+        os.replace(tmp, self._file(META_FILE))
+
+    def _repair(self):
+        # Trim rows left over from an interrupted append
+        with open(self._file("embeddings.f32"), "ab") as f:
+            f.truncate(self.stored_rows * self.dim * 4)
+        with open(self._file("clauses.jsonl"), "ab") as f:
+            f.truncate(int(self._offsets[-1]))
+
+    def _sizes_match(self) -> bool:
+        return (
+            os.path.getsize(self._file("embeddings.f32")) == self.stored_rows * self.dim * 4
+            and os.path.getsize(self._file("clauses.jsonl")) == self._offsets[-1]
+        )
+
+    def append(self, clauses: List[Clause], embeddings: np.ndarray, model_name: str):
+        """
+        Appends clauses with their normalized embeddings.
+
+        Raises:
+            ValueError: If the model or dimension differ from the index.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(clauses) != len(embeddings):
+            raise ValueError(f"{len(clauses)} clauses but {len(embeddings)} embeddings")
+        if not clauses:
+            return
+
+        dim = embeddings.shape[1]
+        items = [dict(clause.to_dict(), hash=clause_hash(clause.text)) for clause in clauses]
+        lines = [(json.dumps(item) + "\n").encode("utf-8") for item in items]
+        lookups = self._lookups()
+
+        with self._lock:
+            if self.model_name is None:
+                os.makedirs(self.path, exist_ok=True)
+                self.model_name, self.dim = model_name, dim
+                self._repair()
+                self._write_meta(self.generation)
+            elif (self.model_name, self.dim) != (model_name, dim):
+                raise ValueError(
+                    f"Index holds {self.model_name} ({self.dim}d) embeddings, "
+                    f"got {model_name} ({dim}d)"
+                )
+            elif not self._sizes_match():
+                self._repair()
+
+            with open(self._file("embeddings.f32"), "ab") as f:
+                f.write(embeddings.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with open(self._file("clauses.jsonl"), "ab") as f:
+                f.write(b"".join(lines))
+
+            start = self.stored_rows
+            self._offsets = np.concatenate((
+                self._offsets,
+                self._offsets[-1] + np.cumsum([len(line) for line in lines], dtype=np.int64)
+            ))
+            for row, item in enumerate(items, start):
+                self._track(row, item, *lookups)
+            self._text = None
+            self._embeddings = None
+            self._ann = None
+            self._signature = self._stat_signature()
+
+    def delete(self, rows: Iterable[int]):
+        """
+        Marks rows deleted. They stay on disk until `compact`.
+        """
+        rows = sorted(set(rows) - self.deleted)
+        if not rows:
+            return
+
+        _, by_page = self._lookups()
+        records = {row: self._record(row) for row in rows}
+
+        with self._lock:
+            with open(self._file("deleted.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(f"{row}\n" for row in rows))
+            self.deleted.update(rows)
+            self._ann = None
+
+            for row, item in records.items():
+                key = (item["doc_id"], item["page"])
+                page_rows = by_page.get(key, [])
+                if row in page_rows:
+                    page_rows.remove(row)
+                    if not page_rows:
+                        del by_page[key]
+            self._signature = self._stat_signature()
+
+    def compact(self, min_deleted_ratio: float = COMPACT_DELETED_RATIO) -> bool:
+        """
+        Writes live rows to a new generation and publishes it, once at
+        least `min_deleted_ratio` of rows are deleted. The previous
+        generation's files stay until the next compaction, so readers
+        still on it keep working until they reload.
+        """
+        total = self.stored_rows
+        if not self.deleted or len(self.deleted) < total * min_deleted_ratio:
+            return False
+
+        old = self.generation
+        new = old + 1
+        keep = [row for row in range(total) if row not in self.deleted]
+        embeddings = self.embeddings
+
+        with open(self._file("embeddings.f32", new), "wb") as f:
+            for start in range(0, len(keep), _COMPACT_CHUNK):
+                f.write(np.ascontiguousarray(
+                    embeddings[keep[start:start + _COMPACT_CHUNK]]
+                ).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Clause lines are copied as they are, without decoding them
+        with open(self._file("clauses.jsonl", new), "wb") as f:
+            for row in keep:
+                f.write(self._line(row))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._write_meta(new)
+            self._load()
+
+        # Readers may still be on the old generation: drop only older ones
+        for name in os.listdir(self.path):
+            match = GENERATION_FILE.match(name)
+            if match and int(match.group(1)) < old:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+
+        return True
+
+    # -----------------------------------
+    # Search
+    # -----------------------------------
+
+    def _search_index(self) -> Tuple[object, Optional[np.ndarray]]:
+        """
+        ANN index over the live rows (`ann_index.build_index`, so
+        VECTOR_INDEX_BACKEND applies), built once per snapshot, and the
+        stored row of each of its ids (None when nothing is deleted).
+        """
+        embeddings = self.embeddings
+        with self._lock:
+            if self._ann is None:
+                if self.deleted:
+                    live = np.array(
+                        [row for row in range(self.stored_rows) if row not in self.deleted],
+                        dtype=np.int64
+                    )
+                    self._ann = (build_index(embeddings[live]), live)
+                else:
+                    # Searched in place, without copying the memory map
+                    self._ann = (build_index(embeddings), None)
+            return self._ann
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> List[List[Tuple[float, str]]]:
+        """
+        (similarity, clause label) of the `k` nearest live clauses for
+        each query embedding, best first.
+        """
+        empty = [[] for _ in range(len(np.atleast_2d(query_embeddings)))]
+        if not len(self):
+            return empty
+
+        try:
+            index, live = self._search_index()
+            scores, ids = index.search(query_embeddings, k)
+
+            return [
+                [
+                    (float(score), self.clause(int(i if live is None else live[i])).label())
+                    for score, i in zip(row_scores, row_ids)
+                    # FAISS pads missing neighbours with -1
+                    if i >= 0
+                ]
+                for row_scores, row_ids in zip(scores, ids)
+            ]
+        except OSError as e:
+            print(f"Error searching policy index {self.path}: {e}")
+            return empty
@@ -0,0 +1,565 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from extract_pdf_text import iter_pdf_page_fingerprints, iter_pdf_pages
+from policy_index import POLICY_INDEX_DIR, Clause, PolicyIndex, clause_hash
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# Longer paragraphs are split so each clause stays within the model's window
+CLAUSE_MAX_CHARS = int(os.getenv("POLICY_CLAUSE_MAX_CHARS", "1000"))
+EMBED_BATCH_SIZE = int(os.getenv("POLICY_EMBED_BATCH", "64"))
+INGEST_WORKERS = int(os.getenv("POLICY_INGEST_WORKERS", str(os.cpu_count() or 4)))
+
+# Kept in the index directory; records what each document looked like when ingested
+MANIFEST_FILE = "manifest.json"
+# Seconds between manifest checkpoints during a run; it is always saved at the end
+MANIFEST_SAVE_INTERVAL = float(os.getenv("POLICY_MANIFEST_SAVE_INTERVAL", "30"))
+
+# "3.1 Eligibility", "Section 4 ...", "2) Income limits"
+SECTION_HEADING = re.compile(r"^(?:section\s+)?(\d+(?:\.\d+)*)[.)]?\s+\S", re.IGNORECASE)
+
+
+def document_id(pdf_path: str, root: str = ".") -> str:
+    """
+    The PDF's path relative to `root`, without extension (e.g.
+    "housing/guidelines"), so same-named files in different folders
+    stay apart.
+    """
+    path = os.path.relpath(os.path.abspath(pdf_path), os.path.abspath(root))
+    return os.path.splitext(path)[0].replace(os.sep, "/")
+
+
+# -----------------------------------
+# Chunking
+# -----------------------------------
+
+def _split_long(text: str, max_chars: int) -> Iterator[str]:
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield text[:cut].strip()
+        text = text[cut:].strip()
+    if text:
+        yield text
+
+
+def _clauses(doc_id: str, page: int, section: str, lines: List[str], max_chars: int) -> Iterator[Clause]:
+    for piece in _split_long(" ".join(lines), max_chars):
+        yield Clause(doc_id, page, section, piece)
+
+
+def chunk_page(
+    doc_id: str,
+    page_number: int,
+    text: str,
+    section: str = "",
+    max_chars: int = CLAUSE_MAX_CHARS
+) -> Tuple[List[Clause], str]:
+    """
+    Splits one page into clauses, starting in `section`.
+    Returns the clauses and the section in effect at the end of the page.
+    """
+    clauses: List[Clause] = []
+    lines: List[str] = []
+    clause_section = section
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        heading = SECTION_HEADING.match(line)
+
+        if lines and (not line or heading):
+            clauses.extend(_clauses(doc_id, page_number, clause_section, lines, max_chars))
+            lines = []
+
+        if not line:
+            continue
+        if heading:
+            section = heading.group(1)
+        if not lines:
+            clause_section = section
+        lines.append(line)
+
+    if lines:
+        clauses.extend(_clauses(doc_id, page_number, clause_section, lines, max_chars))
+
+    return clauses, section
+
+
+def chunk_pages(
+    pages: Iterable[Tuple[int, str]],
+    doc_id: str,
+    max_chars: int = CLAUSE_MAX_CHARS
+) -> Iterator[Clause]:
+    """
+    Splits (page_number, text) pairs into clauses.
+
+    A numbered heading starts a new clause and sets the section, which
+    carries over to following pages. Blank lines and page breaks end a
+    clause; clauses longer than `max_chars` are split at whitespace.
+    """
+    section = ""
+    for page_number, text in pages:
+        clauses, section = chunk_page(doc_id, page_number, text, section, max_chars)
+        yield from clauses
+
+
+def iter_pdf_clauses(pdf_path: str, doc_id: Optional[str] = None) -> Iterator[Clause]:
+    """
+    Clauses of one PDF, reading a page at a time.
+    """
+    return chunk_pages(iter_pdf_pages(pdf_path), doc_id or document_id(pdf_path))
+
+
+# -----------------------------------
+# Change Detection
+# -----------------------------------
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(index_dir: str) -> Dict[str, Dict]:
+    """
+    Per document: source path, file hash, and per page
+    [fingerprint, section at start, section at end].
+    """
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(index_dir: str, manifest: Dict[str, Dict]):
+    """
+    Writes the manifest to a temporary file and renames it into place,
+    so readers never see a partial file.
+    """
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    os.makedirs(index_dir, exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.tmp", path)
+
+
+class DocumentScan:
+    """
+    Works out what changed in one PDF since its manifest entry.
+
+    Iterating yields (page_number, clauses) for each changed page, a
+    page at a time. A file with the same content hash is not parsed at
+    all; otherwise only pages whose content fingerprint (or starting
+    section) changed are extracted and chunked. Once iterated, `entry`
+    is the new manifest entry, `changed` the changed page numbers and
+    `removed` the page numbers that disappeared.
+    """
+
+    def __init__(
+        self,
+        pdf_path: str,
+        previous: Optional[Dict] = None,
+        max_chars: int = CLAUSE_MAX_CHARS,
+        doc_id: Optional[str] = None
+    ):
+        self.pdf_path = pdf_path
+        self.previous = previous
+        self.max_chars = max_chars
+        self.doc_id = doc_id or document_id(pdf_path)
+        self.entry: Optional[Dict] = None
+        self.changed: List[int] = []
+        self.removed: List[int] = []
+
+    def __iter__(self) -> Iterator[Tuple[int, List[Clause]]]:
+        digest = file_hash(self.pdf_path)
+
+        if self.previous is not None and self.previous["file"] == digest:
+            self.entry = dict(self.previous, source=self.pdf_path)
+            return
+
+        known = self.previous["pages"] if self.previous is not None else []
+        pages: List[List[str]] = []
+        section = ""
+
+        for page_number, fingerprint, extract in iter_pdf_page_fingerprints(self.pdf_path):
+            old = known[page_number - 1] if page_number <= len(known) else None
+
+            if old is not None and old[0] == fingerprint and old[1] == section:
+                end_section = old[2]
+            else:
+                clauses, end_section = chunk_page(
+                    self.doc_id, page_number, extract(), section, self.max_chars
+                )
+                self.changed.append(page_number)
+                yield page_number, clauses
+
+            pages.append([fingerprint, section, end_section])
+            section = end_section
+
+        self.entry = {"source": self.pdf_path, "file": digest, "pages": pages}
+        self.removed = list(range(len(pages) + 1, len(known) + 1))
+
+    def summary(self) -> Dict:
+        return {
+            "doc_id": self.doc_id,
+            "entry": self.entry,
+            "changed": self.changed,
+            "removed": self.removed
+        }
+
+
+def _scan_pages(pages, pdf_path: str, previous: Optional[Dict], doc_id: str) -> Dict:
+    # Runs in a pool worker; clauses go back through `pages` as each page is chunked
+    scan = DocumentScan(pdf_path, previous, doc_id=doc_id)
+    for page_number, clauses in scan:
+        pages.put((doc_id, page_number, clauses))
+    return scan.summary()
+
+
+# -----------------------------------
+# Embedding
+# -----------------------------------
+
+def _batches(clauses: Iterable[Clause], size: int) -> Iterator[List[Clause]]:
+    batch: List[Clause] = []
+    for clause in clauses:
+        batch.append(clause)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _RetrievalModel:
+    """
+    The retrieval model, loaded on first encode so runs with nothing
+    new to embed never load it. Queries are encoded with the same
+    model, so clause and query vectors compare.
+    """
+
+    def __init__(self):
+        from vector_store import vector_store
+        self.store = vector_store
+        self.name = vector_store.model_name
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True):
+        if not self.store.wait_until_ready():
+            raise RuntimeError("Embedding model unavailable; install sentence-transformers")
+        return self.store.model.encode(texts, normalize_embeddings=normalize_embeddings)
+
+
+def append_clauses(
+    index: PolicyIndex,
+    clauses: Iterable[Clause],
+    model,
+    model_name: str,
+    batch_size: int = EMBED_BATCH_SIZE
+) -> Tuple[int, int]:
+    """
+    Appends clauses to the index `batch_size` at a time. Embeddings
+    already stored for the same text are reused; only the rest are
+    encoded. Returns (embedded, reused) counts.
+    """
+    embedded = reused = 0
+
+    for batch in _batches(clauses, batch_size):
+        vectors = [index.embedding_for(clause_hash(clause.text)) for clause in batch]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            encoded = np.asarray(
+                model.encode([batch[i].text for i in missing], normalize_embeddings=True),
+                dtype=np.float32
+            )
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+
+        index.append(batch, np.stack(vectors), model_name)
+        embedded += len(missing)
+        reused += len(batch) - len(missing)
+
+    return embedded, reused
+
+
+# -----------------------------------
+# Ingestion
+# -----------------------------------
+
+class _DocumentUpdate:
+    """
+    Replaces the changed and removed pages of one document in the
+    index, embedding clauses as pages arrive rather than once the whole
+    document is scanned.
+
+    New clauses are appended before old rows are deleted, so an
+    interrupted run leaves duplicates (cleaned up on the next run,
+    which sees the same pages as changed) rather than gaps.
+    """
+
+    def __init__(self, index: PolicyIndex, doc_id: str, model, model_name: str, batch_size: int):
+        self.index = index
+        self.doc_id = doc_id
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.pages: List[int] = []
+        self.stale: List[int] = []
+        self.pending: List[Clause] = []
+        self.embedded = 0
+        self.reused = 0
+        self.error: Optional[Exception] = None
+
+    def add_page(self, page_number: int, clauses: List[Clause]):
+        self.stale.extend(self.index.rows(self.doc_id, [page_number]))
+        self.pages.append(page_number)
+        self.pending.extend(clauses)
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        embedded, reused = append_clauses(
+            self.index, self.pending, self.model, self.model_name, self.batch_size
+        )
+        self.pending = []
+        self.embedded += embedded
+        self.reused += reused
+
+    def finish(self, removed: List[int]) -> Dict:
+        self._flush()
+        stale = self.stale + self.index.rows(self.doc_id, removed)
+        self.index.delete(stale)
+        return {"embedded": self.embedded, "reused": self.reused, "deleted": len(stale)}
+
+    def discard(self):
+        """
+        Deletes the rows appended so far, keeping the previous entries.
+        """
+        keep = set(self.stale)
+        self.index.delete(
+            row for row in self.index.rows(self.doc_id, self.pages) if row not in keep
+        )
+
+
+def ingest_pdfs(
+    pdf_paths: List[str],
+    index_dir: str = POLICY_INDEX_DIR,
+    workers: int = INGEST_WORKERS,
+    batch_size: int = EMBED_BATCH_SIZE,
+    model=None,
+    model_name: Optional[str] = None,
+    prune: bool = False,
+    root: str = "."
+) -> Dict:
+    """
+    Brings the index at `index_dir` up to date with `pdf_paths`.
+
+    Unchanged files are skipped, changed pages are re-extracted and
+    re-embedded (reusing stored embeddings for unchanged clause text),
+    and pages that disappeared are deleted. With `prune`, documents in
+    the manifest but not in `pdf_paths` are deleted too. Documents are
+    identified by their path relative to `root`.
+
+    With `workers` > 1, change detection, extraction and chunking run
+    in a process pool while this process embeds in batches. At most two
+    documents per worker are in flight and their clauses come back a
+    page at a time through a bounded queue, so memory stays bounded
+    however many (or however long) the PDFs are. Unreadable PDFs are
+    reported under "failed" and keep their previous index entries.
+    """
+    if not index_dir:
+        raise ValueError("No index directory (set POLICY_INDEX_DIR)")
+
+    if model is None:
+        model = _RetrievalModel()
+        model_name = model.name
+
+    index = PolicyIndex(index_dir)
+    manifest = load_manifest(index_dir)
+    stats = {
+        "documents": 0,
+        "unchanged": 0,
+        "pages_extracted": 0,
+        "pages_removed": 0,
+        "embedded": 0,
+        "reused": 0,
+        "deleted": 0,
+        "failed": []
+    }
+
+    updates: Dict[str, _DocumentUpdate] = {}
+    # A manifest lagging the index only means those pages are redone next run
+    checkpoint = {"dirty": False, "saved": time.monotonic()}
+
+    def start(doc_id: str):
+        updates[doc_id] = _DocumentUpdate(index, doc_id, model, model_name, batch_size)
+
+    def add_page(doc_id: str, page_number: int, clauses: List[Clause]):
+        update = updates.get(doc_id)
+        if update is None or update.error is not None:
+            return
+        try:
+            update.add_page(page_number, clauses)
+        except Exception as e:
+            update.error = e
+
+    def failed(pdf_path: str, doc_id: str, message: str):
+        print(message)
+        stats["failed"].append(pdf_path)
+        updates.pop(doc_id).discard()
+
+    def finish(pdf_path: str, scan: Dict):
+        update = updates[scan["doc_id"]]
+        try:
+            if update.error is not None:
+                raise update.error
+            changes = update.finish(scan["removed"])
+        except Exception as e:
+            failed(pdf_path, scan["doc_id"], f"Error ingesting PDF {pdf_path}: {e}")
+            return
+        del updates[scan["doc_id"]]
+
+        for key, value in changes.items():
+            stats[key] += value
+        stats["documents"] += 1
+        stats["pages_extracted"] += len(scan["changed"])
+        stats["pages_removed"] += len(scan["removed"])
+        if not scan["changed"] and not scan["removed"]:
+            stats["unchanged"] += 1
+
+        if manifest.get(scan["doc_id"]) != scan["entry"]:
+            manifest[scan["doc_id"]] = scan["entry"]
+            checkpoint["dirty"] = True
+            if time.monotonic() - checkpoint["saved"] >= MANIFEST_SAVE_INTERVAL:
+                save_manifest(index_dir, manifest)
+                checkpoint.update(dirty=False, saved=time.monotonic())
+
+    if workers <= 1 or len(pdf_paths) <= 1:
+        for pdf_path in pdf_paths:
+            doc_id = document_id(pdf_path, root)
+            start(doc_id)
+            scan = DocumentScan(pdf_path, manifest.get(doc_id), doc_id=doc_id)
+            try:
+                for page_number, clauses in scan:
+                    add_page(doc_id, page_number, clauses)
+            except Exception as e:
+                failed(pdf_path, doc_id, f"Error reading PDF {pdf_path}: {e}")
+                continue
+            finish(pdf_path, scan.summary())
+    else:
+        # spawn: never fork a parent that may hold a loaded model
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context
+        ) as executor:
+            # Bounded, so workers wait for embedding instead of piling pages up here
+            pages = manager.Queue(maxsize=workers * 2)
+            queued = iter(pdf_paths)
+            running = {}
+
+            while True:
+                while len(running) < workers * 2:
+                    pdf_path = next(queued, None)
+                    if pdf_path is None:
+                        break
+                    doc_id = document_id(pdf_path, root)
+                    start(doc_id)
+                    running[executor.submit(
+                        _scan_pages, pages, pdf_path, manifest.get(doc_id), doc_id
+                    )] = (pdf_path, doc_id)
+
+                if not running:
+                    break
+
+                try:
+                    add_page(*pages.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+
+                for future in [future for future in running if future.done()]:
+                    pdf_path, doc_id = running.pop(future)
+                    # A finished worker has queued all its pages
+                    while True:
+                        try:
+                            add_page(*pages.get_nowait())
+                        except queue.Empty:
+                            break
+                    try:
+                        scan = future.result()
+                    except Exception as e:
+                        failed(pdf_path, doc_id, f"Error reading PDF {pdf_path}: {e}")
+                        continue
+                    finish(pdf_path, scan)
+
+    if prune:
+        current = {document_id(pdf_path, root) for pdf_path in pdf_paths}
+        for doc_id in [d for d in manifest if d not in current]:
+            stale = index.rows(doc_id)
+            index.delete(stale)
+            stats["deleted"] += len(stale)
+            del manifest[doc_id]
+            checkpoint["dirty"] = True
+
+    if checkpoint["dirty"]:
+        save_manifest(index_dir, manifest)
+
+    index.compact()
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingest policy PDFs into the retrieval index")
+    parser.add_argument("pdfs", nargs="+", help="PDF files to ingest")
+    parser.add_argument("--index", default=POLICY_INDEX_DIR or "policy_index")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Document ids are PDF paths relative to this directory"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete previously ingested documents that are not listed"
+    )
+    args = parser.parse_args(argv)
+
+    stats = ingest_pdfs(
+        args.pdfs,
+        args.index,
+        args.workers,
+        args.batch_size,
+        prune=args.prune,
+        root=args.root
+    )
+    print(
+        f"{stats['documents']} documents ({stats['unchanged']} unchanged), "
+        f"{stats['pages_extracted']} pages extracted, {stats['pages_removed']} removed; "
+        f"{stats['embedded']} clauses embedded, {stats['reused']} reused, "
+        f"{stats['deleted']} deleted in {args.index}"
+    )
+    for pdf_path in stats["failed"]:
+        print(f"  failed: {pdf_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import policy_index
+from policy_index import Clause, PolicyIndex
+from policy_ingest import chunk_pages, ingest_pdfs, load_manifest
+
+PAGES = [
+    (1, "Scholarship Policy\n\n3.1 Eligibility\nApplicants must be enrolled\nfull time.\n\n"
+        "Income is verified yearly."),
+    (2, "continued from the previous page\n3.2 Income limits\nFamily income below 8 LPA."),
+]
+
+
+class BagOfWordsModel:
+    """
+    Deterministic stand-in for the sentence-transformers model.
+    """
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 16] += 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+def write_pdf(path, pages):
+    writer = PdfWriter()
+    for text in pages:
+        page = writer.add_blank_page(width=400, height=400)
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica")
+        })
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)})
+        })
+        lines = " ".join(f"({line}) Tj T*" for line in text.split("\n"))
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 10 Tf 14 TL 10 380 Td {lines} ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class TestChunking(unittest.TestCase):
+    def test_clauses_carry_page_and_section(self):
+        clauses = list(chunk_pages(PAGES, "policy"))
+
+        self.assertEqual(
+            [(c.page, c.section, c.text) for c in clauses],
+            [
+                (1, "", "Scholarship Policy"),
+                (1, "3.1", "3.1 Eligibility Applicants must be enrolled full time."),
+                (1, "3.1", "Income is verified yearly."),
+                (2, "3.1", "continued from the previous page"),
+                (2, "3.2", "3.2 Income limits Family income below 8 LPA."),
+            ]
+        )
+        self.assertEqual(clauses[1].reference.dict(), {"doc_id": "policy", "page": 1, "section": "3.1"})
+
+    def test_long_paragraphs_are_split(self):
+        clauses = list(chunk_pages([(1, "word " * 100)], "policy", max_chars=50))
+        self.assertTrue(all(len(c.text) <= 50 for c in clauses))
+        self.assertEqual(sum(len(c.text.split()) for c in clauses), 100)
+
+
+class TestPolicyIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "index")
+        self.model = BagOfWordsModel()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_append_reopen_and_search(self):
+        clauses = list(chunk_pages(PAGES, "policy"))
+        index = PolicyIndex(self.path)
+        index.append(clauses[:2], self.model.encode([c.text for c in clauses[:2]]), "bow")
+        index.append(clauses[2:], self.model.encode([c.text for c in clauses[2:]]), "bow")
+
+        reopened = PolicyIndex(self.path)
+        self.assertEqual(reopened.clauses, clauses)
+        self.assertEqual(reopened.model_name, "bow")
+
+        query = self.model.encode([clauses[4].text])
+        score, label = reopened.search(query, 2)[0][0]
+        self.assertAlmostEqual(score, 1.0, places=5)
+        self.assertTrue(label.startswith("[policy p.2 §3.2]"))
+
+        with self.assertRaises(ValueError):
+            reopened.append(clauses[:1], np.ones((1, 8)), "bow")
+
+    def test_search_index_is_built_once_per_snapshot(self):
+        clauses = list(chunk_pages(PAGES, "policy"))
+        PolicyIndex(self.path).append(clauses, self.model.encode([c.text for c in clauses]), "bow")
+
+        built = []
+        build_index = policy_index.build_index
+        policy_index.build_index = lambda embeddings: built.append(len(embeddings)) or build_index(embeddings)
+        try:
+            index = PolicyIndex(self.path)
+            index.delete([4])
+            query = self.model.encode([clauses[4].text])
+            for _ in range(3):
+                labels = [label for _, label in index.search(query, 2)[0]]
+                self.assertNotIn(clauses[4].label(), labels)
+                self.assertEqual(len(labels), 2)
+        finally:
+            policy_index.build_index = build_index
+
+        # Built over the four live rows only
+        self.assertEqual(built, [4])
+        self.assertEqual(index.clause(1), clauses[1])
+
+    def test_interrupted_append_is_dropped(self):
+        clause = Clause("policy", 1, "1", "text")
+        index = PolicyIndex(self.path)
+        index.append([clause], self.model.encode(["text"]), "bow")
+
+        # Embeddings written, clauses line torn
+        with open(os.path.join(self.path, "embeddings-0.f32"), "ab") as f:
+            f.write(self.model.encode(["more"]).tobytes())
+        with open(os.path.join(self.path, "clauses-0.jsonl"), "a", encoding="utf-8") as f:
+            f.write('{"doc_id": "pol')
+
+        index = PolicyIndex(self.path)
+        self.assertEqual(len(index), 1)
+
+        index.append([clause], self.model.encode(["text"]), "bow")
+        self.assertEqual(len(PolicyIndex(self.path)), 2)
+
+
+class TestIngestPdfs(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index_dir = os.path.join(self.dir, "index")
+        self.pdf = os.path.join(self.dir, "policy.pdf")
+        self.model = BagOfWordsModel()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def ingest(self, paths, **kwargs):
+        self.model.encoded = []
+        return ingest_pdfs(
+            paths, self.index_dir, model=self.model, model_name="bow", root=self.dir, **kwargs
+        )
+
+    def test_process_pool_reports_failures(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.dir, f"doc{i}.pdf")
+            write_pdf(path, [f"Document {i}"])
+            paths.append(path)
+
+        broken = os.path.join(self.dir, "broken.pdf")
+        with open(broken, "w") as f:
+            f.write("not a pdf")
+
+        stats = self.ingest(paths + [broken], workers=2)
+        self.assertEqual(stats["documents"], 3)
+        self.assertEqual(stats["failed"], [broken])
+        self.assertEqual(len(PolicyIndex(self.index_dir)), 3)
+
+    def test_reingestion_only_touches_changed_pages(self):
+        write_pdf(self.pdf, [
+            "1 Scope\nApplies to all students",
+            "2 Eligibility\nMust be enrolled\n2.1 Income below 8 LPA",
+            "3 Appeals\nWithin 30 days"
+        ])
+        stats = self.ingest([self.pdf], workers=1)
+        self.assertEqual(stats["pages_extracted"], 3)
+        self.assertEqual(stats["embedded"], 4)
+
+        stats = self.ingest([self.pdf], workers=1)
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertEqual(self.model.encoded, [])
+
+        # Amend page 2, drop page 3
+        write_pdf(self.pdf, [
+            "1 Scope\nApplies to all students",
+            "2 Eligibility\nMust be enrolled\n2.1 Income below 10 LPA"
+        ])
+        stats = self.ingest([self.pdf], workers=1)
+        self.assertEqual(stats["pages_extracted"], 1)
+        self.assertEqual(stats["pages_removed"], 1)
+        self.assertEqual(self.model.encoded, ["2.1 Income below 10 LPA"])
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["deleted"], 3)
+
+        index = PolicyIndex(self.index_dir)
+        self.assertEqual(
+            sorted(c.text for c in index.clauses),
+            [
+                "1 Scope Applies to all students",
+                "2 Eligibility Must be enrolled",
+                "2.1 Income below 10 LPA"
+            ]
+        )
+        self.assertEqual(index.generation, 1)
+        self.assertEqual(len(load_manifest(self.index_dir)["policy"]["pages"]), 2)
+
+    def test_failed_document_keeps_previous_entries(self):
+        write_pdf(self.pdf, ["1 Scope\nAll students"])
+        self.ingest([self.pdf], workers=1)
+
+        # Pages are embedded as they are scanned; page 3 fails after page 2 is in
+        write_pdf(self.pdf, ["1 Scope\nStaff", "2 Appeals\nWithin 30 days", "3 Fees\nBROKEN"])
+        encode = self.model.encode
+
+        def failing_encode(texts, normalize_embeddings=True):
+            if any("BROKEN" in text for text in texts):
+                raise RuntimeError("encoder failed")
+            return encode(texts, normalize_embeddings)
+
+        self.model.encode = failing_encode
+        stats = self.ingest([self.pdf], workers=1, batch_size=1)
+        self.assertEqual(stats["failed"], [self.pdf])
+        self.assertEqual(
+            [c.text for c in PolicyIndex(self.index_dir).clauses], ["1 Scope All students"]
+        )
+
+    def test_same_file_name_in_different_folders(self):
+        paths = []
+        for folder in ("housing", "education"):
+            os.makedirs(os.path.join(self.dir, folder))
+            path = os.path.join(self.dir, folder, "policy.pdf")
+            write_pdf(path, [f"1 Scope\n{folder} applicants"])
+            paths.append(path)
+
+        self.ingest(paths, workers=1)
+        self.assertEqual(sorted(load_manifest(self.index_dir)), ["education/policy", "housing/policy"])
+        self.assertEqual(self.ingest(paths, workers=1)["unchanged"], 2)
+
+    def test_reader_follows_compaction(self):
+        write_pdf(self.pdf, ["1 Scope\nAll students", "2 Appeals\nWithin 30 days"])
+        self.ingest([self.pdf], workers=1)
+        reader = PolicyIndex(self.index_dir, refresh_interval=0)
+        self.assertFalse(reader.changed())
+
+        # Page 2 is deleted and the index compacted to generation 1
+        write_pdf(self.pdf, ["1 Scope\nAll students"])
+        self.ingest([self.pdf], workers=1)
+        self.assertTrue(os.path.exists(os.path.join(self.index_dir, "embeddings-0.f32")))
+
+        query = self.model.encode(["2 Appeals Within 30 days"])
+        self.assertEqual(len(reader.search(query, 2)[0]), 2)
+        self.assertTrue(reader.changed())
+
+        labels = [label for _, label in PolicyIndex(self.index_dir).search(query, 2)[0]]
+        self.assertEqual(labels, ["[policy p.1 §1] 1 Scope All students"])
+
+    def test_prune_removes_unlisted_documents(self):
+        other = os.path.join(self.dir, "other.pdf")
+        write_pdf(self.pdf, ["1 Scope\nAll students"])
+        write_pdf(other, ["1 Scope\nStaff"])
+        self.ingest([self.pdf, other], workers=1)
+
+        stats = self.ingest([self.pdf], workers=1, prune=True)
+        self.assertEqual(stats["deleted"], 1)
+        self.assertEqual([c.doc_id for c in PolicyIndex(self.index_dir).clauses], ["policy"])
+        self.assertNotIn("other", load_manifest(self.index_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
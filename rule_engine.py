@@ -1,163 +1,558 @@
-from typing import Any, Dict
-from models import Rule, RuleResult
-import re
-
-
-# -----------------------------------
-# Expression Safety Validation
-# -----------------------------------
-
-ALLOWED_PATTERN = re.compile(r"^[a-zA-Z0-9_\s<>=!&|().,'\"+-/*]+$")
-
-
-def is_expression_safe(expression: str) -> bool:
-    """
-    Basic whitelist validation to prevent unsafe eval usage.
-    """
-    return bool(ALLOWED_PATTERN.match(expression))
-
-
-# -----------------------------------
-# Rule Evaluation
-# -----------------------------------
-
-def evaluate_rule(rule: Rule, user_input: Dict[str, Any]) -> RuleResult:
-    """
-    Deterministic rule evaluation engine.
-    This is the system authority layer.
-    """
-
-    # 1️⃣ Check required inputs
-    missing_vars = [
-        var for var in rule.variables_required
-        if var not in user_input
-    ]
-
-    if missing_vars:
-        return RuleResult(
-            id=rule.id,
-            name=rule.name,
-            passed=False,
-            reason=f"Missing required input(s): {', '.join(missing_vars)}",
-            priority=rule.priority,
-            mandatory=rule.mandatory,
-            document_reference=rule.document_reference,
-            score_delta=0,
-            suggestion=None
-        )
-
-    # 2️⃣ Validate expression safety
-    if not is_expression_safe(rule.condition_expression):
-        return RuleResult(
-            id=rule.id,
-            name=rule.name,
-            passed=False,
-            reason="Unsafe rule expression detected.",
-            priority=rule.priority,
-            mandatory=rule.mandatory,
-            document_reference=rule.document_reference,
-            score_delta=0,
-            suggestion=None
-        )
-
-    context = user_input.copy()
-
-    try:
-        eval_globals = {
-            "__builtins__": {},
-            "true": True,
-            "false": False,
-            "null": None
-        }
-
-        condition_result = eval(
-            rule.condition_expression,
-            eval_globals,
-            context
-        )
-
-        passed = bool(condition_result)
-
-        # -----------------------------------
-        # PASSED CASE
-        # -----------------------------------
-
-        if passed:
-            reason_parts = []
-            for var in rule.variables_required:
-                val = user_input.get(var)
-                formatted_val = f"'{val}'" if isinstance(val, str) else val
-                reason_parts.append(f"{var} = {formatted_val}")
-
-            return RuleResult(
-                id=rule.id,
-                name=rule.name,
-                passed=True,
-                reason=f"Condition met: {rule.condition_expression} "
-                       f"where {', '.join(reason_parts)}",
-                priority=rule.priority,
-                mandatory=rule.mandatory,
-                document_reference=rule.document_reference,
-                score_delta=rule.outcome_effect.score_delta,
-                suggestion=None
-            )
-
-        # -----------------------------------
-        # FAILED CASE
-        # -----------------------------------
-
-        suggestion = None
-        reason_parts = []
-
-        for var in rule.variables_required:
-            val = user_input.get(var)
-
-            if isinstance(val, (int, float)):
-                # <= or <
-                match_max = re.search(
-                    rf"{var}\s*(<=|<)\s*([\d\.]+)",
-                    rule.condition_expression
-                )
-                if match_max:
-                    limit = float(match_max.group(2))
-                    if val > limit:
-                        suggestion = f"Decrease {var} by {val - limit:.2f}"
-
-                # >= or >
-                match_min = re.search(
-                    rf"{var}\s*(>=|>)\s*([\d\.]+)",
-                    rule.condition_expression
-                )
-                if match_min:
-                    limit = float(match_min.group(2))
-                    if val < limit:
-                        suggestion = f"Increase {var} by {limit - val:.2f}"
-
-            formatted_val = f"'{val}'" if isinstance(val, str) else val
-            reason_parts.append(f"{var} = {formatted_val}")
-
-        return RuleResult(
-            id=rule.id,
-            name=rule.name,
-            passed=False,
-            reason=f"Condition failed: {rule.condition_expression} "
-                   f"where {', '.join(reason_parts)}",
-            priority=rule.priority,
-            mandatory=rule.mandatory,
-            document_reference=rule.document_reference,
-            score_delta=0,
-            suggestion=suggestion
-        )
-
-    except Exception as e:
-        return RuleResult(
-            id=rule.id,
-            name=rule.name,
-            passed=False,
-            reason=f"Error evaluating rule: {str(e)}",
-            priority=rule.priority,
-            mandatory=rule.mandatory,
-            document_reference=rule.document_reference,
-            score_delta=0,
-            suggestion=None
-        )
\ No newline at end of file
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from models import Rule, RuleResult
+import ast
+
+
+# -----------------------------------
+# Expression Safety Validation
+# -----------------------------------
+
+ALLOWED_NODES = (
+    ast.Expression,
+    ast.BoolOp, ast.And, ast.Or,
+    ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Tuple, ast.List, ast.Set,
+)
+
+EVAL_GLOBALS = {
+    "__builtins__": {},
+    "true": True,
+    "false": False,
+    "null": None
+}
+
+# Reasons of results that could not be evaluated cleanly
+MISSING_INPUT_PREFIX = "Missing required input(s): "
+ERROR_REASON_PREFIX = "Error evaluating rule: "
+UNSAFE_REASON = "Unsafe rule expression detected."
+
+
+def is_tree_safe(tree: ast.AST) -> bool:
+    """
+    Whitelist validation of a parsed expression tree.
+    Only comparisons, boolean logic, arithmetic and literals are allowed.
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            return False
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            return False
+    return True
+
+
+def is_expression_safe(expression: str) -> bool:
+    """
+    Whitelist validation to prevent unsafe eval usage.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return False
+    return is_tree_safe(tree)
+
+
+# -----------------------------------
+# Rule Compilation
+# -----------------------------------
+
+def _numeric_constant(node: ast.AST) -> Optional[float]:
+    if (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+    ):
+        return float(node.value)
+    return None
+
+
+def _extract_limits(
+    tree: ast.AST,
+    variables: List[str]
+) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """
+    Finds the first `var <= N` (upper) and `var >= N` (lower) bound
+    for each required variable. Used to build failure suggestions.
+    """
+    limits: Dict[str, List[Optional[float]]] = {
+        var: [None, None] for var in variables
+    }
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+            continue
+
+        left, op, right = node.left, node.ops[0], node.comparators[0]
+
+        if isinstance(left, ast.Name) and _numeric_constant(right) is not None:
+            var, limit = left.id, _numeric_constant(right)
+            is_upper = isinstance(op, (ast.Lt, ast.LtE))
+            is_lower = isinstance(op, (ast.Gt, ast.GtE))
+        elif isinstance(right, ast.Name) and _numeric_constant(left) is not None:
+            var, limit = right.id, _numeric_constant(left)
+            is_upper = isinstance(op, (ast.Gt, ast.GtE))
+            is_lower = isinstance(op, (ast.Lt, ast.LtE))
+        else:
+            continue
+
+        if var not in limits:
+            continue
+
+        if is_upper and limits[var][0] is None:
+            limits[var][0] = limit
+        if is_lower and limits[var][1] is None:
+            limits[var][1] = limit
+
+    return {var: (upper, lower) for var, (upper, lower) in limits.items()}
+
+
+def _referenced_names(tree: ast.AST) -> FrozenSet[str]:
+    return frozenset(
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and node.id not in EVAL_GLOBALS
+    )
+
+
+# -----------------------------------
+# Constraint Extraction
+# -----------------------------------
+
+# A condition as OR-of-ANDs over (variable, op, constant) atoms
+Atom = Tuple[str, str, Any]
+Constraints = List[List[Atom]]
+
+MAX_ALTERNATIVES = 32
+
+COMPARE_OPS = {
+    ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+    ast.Eq: "==", ast.NotEq: "!=", ast.In: "in", ast.NotIn: "not in",
+}
+
+# `5 < x` is `x > 5`
+MIRRORED_OPS = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+NEGATED_OPS = {
+    "<": ">=", "<=": ">", ">": "<=", ">=": "<",
+    "==": "!=", "!=": "==", "in": "not in", "not in": "in",
+}
+
+
+class _Opaque(Exception):
+    pass
+
+
+def _constant_value(node: ast.AST) -> Any:
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in EVAL_GLOBALS:
+        return EVAL_GLOBALS[node.id]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _numeric_constant(node.operand)
+        if value is not None:
+            return -node.operand.value if isinstance(node.op, ast.USub) else node.operand.value
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        return frozenset(_constant_value(element) for element in node.elts)
+    raise _Opaque()
+
+
+def _is_variable(node: ast.AST) -> bool:
+    return isinstance(node, ast.Name) and node.id not in EVAL_GLOBALS
+
+
+def _compare_constraints(node: ast.Compare, negate: bool) -> Constraints:
+    operands = [node.left, *node.comparators]
+    atoms: List[Atom] = []
+
+    # Chains like `17 <= age <= 25` are split into pairwise atoms
+    for left, op, right in zip(operands, node.ops, operands[1:]):
+        op_name = COMPARE_OPS.get(type(op))
+        if op_name is None:
+            raise _Opaque()
+
+        if _is_variable(left) and not _is_variable(right):
+            var, value = left.id, _constant_value(right)
+        elif _is_variable(right) and op_name in MIRRORED_OPS:
+            var, value, op_name = right.id, _constant_value(left), MIRRORED_OPS[op_name]
+        else:
+            raise _Opaque()
+
+        if (op_name in ("in", "not in")) != isinstance(value, frozenset):
+            raise _Opaque()
+
+        atoms.append((var, op_name, value))
+
+    if not negate:
+        return [atoms]
+
+    # De Morgan: not (a and b) == (not a) or (not b)
+    return [[(var, NEGATED_OPS[op], value)] for var, op, value in atoms]
+
+
+def _to_dnf(node: ast.AST, negate: bool = False) -> Constraints:
+    if isinstance(node, ast.Expression):
+        return _to_dnf(node.body, negate)
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_to_dnf(value, negate) for value in node.values]
+
+        if isinstance(node.op, ast.And) != negate:
+            alternatives: Constraints = [[]]
+            for part in parts:
+                alternatives = [a + b for a in alternatives for b in part]
+                if len(alternatives) > MAX_ALTERNATIVES:
+                    raise _Opaque()
+        else:
+            alternatives = [alt for part in parts for alt in part]
+
+        if len(alternatives) > MAX_ALTERNATIVES:
+            raise _Opaque()
+        return alternatives
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return _to_dnf(node.operand, not negate)
+
+    if isinstance(node, ast.Compare):
+        return _compare_constraints(node, negate)
+
+    if _is_variable(node):
+        return [[(node.id, "!=" if negate else "==", True)]]
+
+    # Literal true/false: always or never satisfiable
+    return [[]] if bool(_constant_value(node)) != negate else []
+
+
+def extract_constraints(tree: ast.AST) -> Optional[Constraints]:
+    """
+    Rewrites a condition as alternatives of per-variable comparisons
+    against constants. Returns None for conditions outside that form
+    (arithmetic on inputs, variable-to-variable comparisons, ...).
+    """
+    try:
+        return _to_dnf(tree)
+    except _Opaque:
+        return None
+
+
+class CompiledRule:
+    """
+    A rule whose condition expression has been parsed, validated and
+    compiled once. Evaluation only runs the cached code object.
+    """
+
+    __slots__ = (
+        "rule",
+        "tree",
+        "code",
+        "error",
+        "limits",
+        "variables",
+        "constraints",
+        "reason_prefixes",
+        "input_labels"
+    )
+
+    def __init__(self, rule: Rule):
+        self.rule = rule
+        self.tree: Optional[ast.Expression] = None
+        self.code = None
+        self.error: Optional[str] = None
+        self.limits: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+
+        # Every input the result can depend on: declared variables plus
+        # any names the expression actually reads
+        self.variables: FrozenSet[str] = frozenset(rule.variables_required)
+        self.constraints: Optional[Constraints] = None
+
+        # Reason text fragments: (met, failed) prefixes and "var = " labels
+        self.reason_prefixes = (
+            f"Condition met: {rule.condition_expression} where ",
+            f"Condition failed: {rule.condition_expression} where "
+        )
+        self.input_labels = tuple(f"{var} = " for var in rule.variables_required)
+
+        try:
+            tree = ast.parse(rule.condition_expression, mode="eval")
+        except SyntaxError as e:
+            self.error = f"{ERROR_REASON_PREFIX}{str(e)}"
+            return
+
+        if not is_tree_safe(tree):
+            self.error = UNSAFE_REASON
+            return
+
+        self.tree = tree
+        self.code = compile(tree, f"<rule {rule.id}>", "eval")
+        self.limits = _extract_limits(tree, rule.variables_required)
+        self.variables = self.variables | _referenced_names(tree)
+        self.constraints = extract_constraints(tree)
+
+
+def compile_rule(rule: Rule) -> CompiledRule:
+    return CompiledRule(rule)
+
+
+def compile_ruleset(rules: List[Rule]) -> List[CompiledRule]:
+    return [CompiledRule(rule) for rule in rules]
+
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def evaluation_order(compiled_rules: List[CompiledRule]) -> List[int]:
+    """
+    Rule positions with mandatory rules first, then by priority, so
+    the outcome is settled as early as possible. Stable otherwise.
+    """
+    return sorted(
+        range(len(compiled_rules)),
+        key=lambda i: (
+            not compiled_rules[i].rule.mandatory,
+            PRIORITY_RANK.get(compiled_rules[i].rule.priority.value, len(PRIORITY_RANK))
+        )
+    )
+
+
+def build_dependency_index(compiled_rules: List[CompiledRule]) -> Dict[str, List[int]]:
+    """
+    Maps each input variable to the positions of the rules reading it.
+    """
+    dependents: Dict[str, List[int]] = {}
+    for i, compiled in enumerate(compiled_rules):
+        for var in sorted(compiled.variables):
+            dependents.setdefault(var, []).append(i)
+    return dependents
+
+
+# -----------------------------------
+# Rule Evaluation
+# -----------------------------------
+
+class RuleOutcome:
+    """
+    Result of evaluating one rule on the hot path.
+
+    Slotted and unvalidated: static fields (id, name, priority,
+    reference, score delta) are read from the shared `Rule` instead of
+    being copied per evaluation. `to_model` builds the pydantic
+    `RuleResult` at the API boundary.
+    """
+
+    __slots__ = ("rule", "passed", "reason", "suggestion")
+
+    def __init__(
+        self,
+        rule: Rule,
+        passed: bool,
+        reason: str = "",
+        suggestion: Optional[str] = None
+    ):
+        self.rule = rule
+        self.passed = passed
+        self.reason = reason
+        self.suggestion = suggestion
+
+    @property
+    def id(self) -> str:
+        return self.rule.id
+
+    @property
+    def name(self) -> str:
+        return self.rule.name
+
+    @property
+    def priority(self):
+        return self.rule.priority
+
+    @property
+    def mandatory(self) -> bool:
+        return self.rule.mandatory
+
+    @property
+    def document_reference(self):
+        return self.rule.document_reference
+
+    @property
+    def score_delta(self) -> int:
+        return self.rule.outcome_effect.score_delta if self.passed else 0
+
+    def to_model(self) -> RuleResult:
+        # Fields come from an already validated Rule
+        rule = self.rule
+        return RuleResult.construct(
+            id=rule.id,
+            name=rule.name,
+            passed=self.passed,
+            reason=self.reason,
+            priority=rule.priority,
+            mandatory=rule.mandatory,
+            document_reference=rule.document_reference,
+            score_delta=self.score_delta,
+            suggestion=self.suggestion
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Same content as `to_model().dict()`, without building the model.
+        """
+        rule = self.rule
+        reference = rule.document_reference
+        return {
+            "id": rule.id,
+            "name": rule.name,
+            "passed": self.passed,
+            "reason": self.reason,
+            "priority": rule.priority,
+            "mandatory": rule.mandatory,
+            "document_reference": {
+                "doc_id": reference.doc_id,
+                "page": reference.page,
+                "section": reference.section
+            },
+            "score_delta": self.score_delta,
+            "suggestion": self.suggestion
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RuleOutcome) and (
+            (self.rule.id, self.passed, self.reason, self.suggestion)
+            == (other.rule.id, other.passed, other.reason, other.suggestion)
+        )
+
+    def __repr__(self) -> str:
+        return f"RuleOutcome({self.rule.id!r}, passed={self.passed})"
+
+
+def rule_error_kind(result: RuleOutcome) -> Optional[str]:
+    """
+    "missing_input", "unsafe" or "error" for a result that could not be
+    evaluated cleanly, else None.
+    """
+    if result.passed or not result.reason:
+        return None
+    if result.reason.startswith(MISSING_INPUT_PREFIX):
+        return "missing_input"
+    if result.reason == UNSAFE_REASON:
+        return "unsafe"
+    if result.reason.startswith(ERROR_REASON_PREFIX):
+        return "error"
+    return None
+
+
+def _failed_result(rule: Rule, reason: str) -> RuleOutcome:
+    return RuleOutcome(rule, False, reason)
+
+
+def _format_inputs(compiled: CompiledRule, user_input: Dict[str, Any]) -> str:
+    return ", ".join(
+        f"{label}'{val}'" if isinstance(val, str) else f"{label}{val}"
+        for label, val in zip(
+            compiled.input_labels,
+            (user_input.get(var) for var in compiled.rule.variables_required)
+        )
+    )
+
+
+def _suggestion(compiled: CompiledRule, user_input: Dict[str, Any]) -> Optional[str]:
+    suggestion = None
+
+    for var in compiled.rule.variables_required:
+        val = user_input.get(var)
+
+        if isinstance(val, (int, float)):
+            upper, lower = compiled.limits.get(var, (None, None))
+
+            # <= or <
+            if upper is not None and val > upper:
+                suggestion = f"Decrease {var} by {val - upper:.2f}"
+
+            # >= or >
+            if lower is not None and val < lower:
+                suggestion = f"Increase {var} by {lower - val:.2f}"
+
+    return suggestion
+
+
+def _explain(
+    compiled: CompiledRule,
+    passed: bool,
+    user_input: Dict[str, Any]
+) -> Tuple[str, Optional[str]]:
+    """
+    Reason text and suggestion for a cleanly evaluated rule.
+    """
+    reason = compiled.reason_prefixes[0 if passed else 1] + _format_inputs(compiled, user_input)
+    return reason, None if passed else _suggestion(compiled, user_input)
+
+
+def describe_result(
+    compiled: CompiledRule,
+    result: RuleOutcome,
+    user_input: Dict[str, Any]
+) -> RuleOutcome:
+    """
+    Fills in the reason and suggestion of a result evaluated with
+    `explain=False`. Results that already have a reason are returned
+    unchanged.
+    """
+    if result.reason:
+        return result
+
+    reason, suggestion = _explain(compiled, result.passed, user_input)
+    return RuleOutcome(result.rule, result.passed, reason, suggestion)
+
+
+def evaluate_compiled_rule(
+    compiled: CompiledRule,
+    user_input: Dict[str, Any],
+    explain: bool = True
+) -> RuleOutcome:
+    """
+    Deterministic rule evaluation engine.
+    This is the system authority layer.
+
+    With `explain=False` the reason text and suggestion of a rule that
+    evaluated cleanly are left empty; `describe_result` adds them later.
+    """
+
+    rule = compiled.rule
+
+    # 1️⃣ Check required inputs
+    missing_vars = [
+        var for var in rule.variables_required
+        if var not in user_input
+    ]
+
+    if missing_vars:
+        return _failed_result(
+            rule,
+            f"{MISSING_INPUT_PREFIX}{', '.join(missing_vars)}"
+        )
+
+    # 2️⃣ Expression was rejected at compile time
+    if compiled.error:
+        return _failed_result(rule, compiled.error)
+
+    try:
+        # The whitelist forbids assignment, so user_input cannot be mutated
+        condition_result = eval(compiled.code, EVAL_GLOBALS, user_input)
+
+        passed = bool(condition_result)
+
+    except Exception as e:
+        return _failed_result(rule, f"{ERROR_REASON_PREFIX}{str(e)}")
+
+    reason, suggestion = _explain(compiled, passed, user_input) if explain else ("", None)
+
+    return RuleOutcome(rule, passed, reason, suggestion)
+
+
+def evaluate_rule(rule: Rule, user_input: Dict[str, Any]) -> RuleOutcome:
+    """
+    Evaluates a single uncompiled rule.
+    Prefer `evaluate_compiled_rule` with a cached ruleset on hot paths.
+    """
+    return evaluate_compiled_rule(compile_rule(rule), user_input)
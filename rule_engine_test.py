@@ -0,0 +1,118 @@
+import ast
+import unittest
+from models import Rule
+from rule_engine import (
+    build_dependency_index,
+    compile_rule,
+    describe_result,
+    extract_constraints,
+    evaluate_compiled_rule,
+    evaluate_rule,
+    is_expression_safe
+)
+
+
+def make_rule(expression, variables, rule_id="R1", mandatory=False, score_delta=20):
+    return Rule(
+        id=rule_id,
+        name=f"Rule {rule_id}",
+        condition_expression=expression,
+        variables_required=variables,
+        outcome_effect={"eligible": True, "score_delta": score_delta},
+        priority="high",
+        mandatory=mandatory,
+        document_reference={"doc_id": "policy", "page": 1, "section": "1.1"},
+        human_description=f"Description for {rule_id}"
+    )
+
+
+class TestRuleCompilation(unittest.TestCase):
+    def test_safe_expressions(self):
+        self.assertTrue(is_expression_safe("income <= 800000 and state == 'Delhi'"))
+        self.assertTrue(is_expression_safe("category in ('SC', 'ST')"))
+        self.assertFalse(is_expression_safe("__import__('os').system('ls')"))
+        self.assertFalse(is_expression_safe("income.__class__"))
+        self.assertFalse(is_expression_safe("income <="))
+
+    def test_compiled_rule_is_reused(self):
+        compiled = compile_rule(make_rule("income <= 800000", ["income"]))
+        self.assertTrue(evaluate_compiled_rule(compiled, {"income": 500000}).passed)
+        self.assertFalse(evaluate_compiled_rule(compiled, {"income": 900000}).passed)
+
+    def test_unsafe_rule_fails_closed(self):
+        result = evaluate_rule(make_rule("len(state) > 2", ["state"]), {"state": "Delhi"})
+        self.assertFalse(result.passed)
+        self.assertEqual(result.reason, "Unsafe rule expression detected.")
+
+    def test_missing_input(self):
+        result = evaluate_rule(make_rule("age >= 18", ["age"]), {})
+        self.assertFalse(result.passed)
+        self.assertIn("Missing required input(s): age", result.reason)
+
+    def test_suggestions_from_bounds(self):
+        rule = make_rule("income <= 800000 and age >= 18", ["income", "age"])
+        result = evaluate_rule(rule, {"income": 900000, "age": 20})
+        self.assertEqual(result.suggestion, "Decrease income by 100000.00")
+
+        result = evaluate_rule(rule, {"income": 100000, "age": 16})
+        self.assertEqual(result.suggestion, "Increase age by 2.00")
+
+    def test_deferred_reason(self):
+        compiled = compile_rule(make_rule("income <= 800000", ["income"]))
+        user_input = {"income": 900000}
+        lazy = evaluate_compiled_rule(compiled, user_input, explain=False)
+        self.assertEqual((lazy.reason, lazy.suggestion), ("", None))
+        self.assertEqual(
+            describe_result(compiled, lazy, user_input),
+            evaluate_compiled_rule(compiled, user_input)
+        )
+
+    def test_outcome_shares_rule_and_converts_at_boundary(self):
+        rule = make_rule("income <= 800000", ["income"])
+        result = evaluate_rule(rule, {"income": 900000})
+
+        self.assertIs(result.document_reference, rule.document_reference)
+        self.assertEqual(result.score_delta, 0)
+        model = result.to_model()
+        self.assertEqual(model.dict(), result.to_dict())
+        self.assertEqual(model.suggestion, "Decrease income by 100000.00")
+
+    def test_passed_reason(self):
+        result = evaluate_rule(make_rule("state == 'Delhi'", ["state"]), {"state": "Delhi"})
+        self.assertTrue(result.passed)
+        self.assertEqual(result.score_delta, 20)
+        self.assertIn("state = 'Delhi'", result.reason)
+
+    def test_dependency_index(self):
+        compiled = [
+            compile_rule(make_rule("income <= 800000", ["income"], "R1")),
+            # Reads an undeclared name, which still counts as a dependency
+            compile_rule(make_rule("age >= 17 and not disabled == true", ["age"], "R2")),
+            compile_rule(make_rule("income >", ["income", "age"], "R3")),
+        ]
+        self.assertEqual(
+            build_dependency_index(compiled),
+            {"income": [0, 2], "age": [1, 2], "disabled": [1]}
+        )
+
+    def test_constraints_as_alternatives(self):
+        def constraints(expression):
+            return extract_constraints(ast.parse(expression, mode="eval"))
+
+        self.assertEqual(
+            constraints("17 <= age <= 25"),
+            [[("age", ">=", 17), ("age", "<=", 25)]]
+        )
+        self.assertEqual(
+            constraints("not (state == 'Delhi' or income > 5)"),
+            [[("state", "!=", "Delhi"), ("income", "<=", 5)]]
+        )
+        self.assertEqual(
+            constraints("category in ('SC', 'ST') or disabled"),
+            [[("category", "in", frozenset({"SC", "ST"}))], [("disabled", "==", True)]]
+        )
+        self.assertIsNone(constraints("income - expenses > 0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,36 +1,298 @@
-import json
-import os
-from typing import List, Dict
-from models import Rule
-from functools import lru_cache
-
-RULES_DIR = "rules"
-
-@lru_cache(maxsize=10)
-def load_rules(ruleset_id: str) -> List[Rule]:
-    """
-    Loads a ruleset from a JSON file, validates it against the Rule model,
-    and returns a list of Rule objects.
-    
-    Raises:
-        FileNotFoundError: If the rules definition file doesn't exist.
-        ValueError: If the rules JSON is invalid.
-    """
-    # Sanitize ruleset_id to prevent directory traversal
-    safe_id = os.path.basename(ruleset_id)
-    file_path = os.path.join(RULES_DIR, f"{safe_id}.json")
-
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Ruleset '{ruleset_id}' not found at {file_path}")
-
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        # Validate list of rules
-        rules = [Rule(**item) for item in data]
-        return rules
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in ruleset '{ruleset_id}': {e}")
-    except Exception as e:
-        raise ValueError(f"Error validating ruleset '{ruleset_id}': {e}")
+import json
+import os
+import hashlib
+import logging
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+from models import Rule
+from rule_engine import (
+    CompiledRule,
+    compile_ruleset,
+    build_dependency_index,
+    evaluation_order
+)
+from explanations import CompiledExplanation
+
+RULES_DIR = "rules"
+RULES_WATCH_INTERVAL = float(os.getenv("RULES_WATCH_INTERVAL", "2.0"))
+
+logger = logging.getLogger(__name__)
+
+
+def ruleset_path(ruleset_id: str) -> str:
+    # Sanitize ruleset_id to prevent directory traversal
+    safe_id = os.path.basename(ruleset_id)
+    return os.path.join(RULES_DIR, f"{safe_id}.json")
+
+
+def _file_stamp(file_path: str) -> Tuple[int, int]:
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# -----------------------------------
+# Ruleset Versions
+# -----------------------------------
+
+class Ruleset:
+    """
+    One validated and compiled version of a ruleset file.
+    Immutable, so a request can hold it while a newer version is swapped in.
+    """
+
+    def __init__(
+        self,
+        ruleset_id: str,
+        rules: List[Rule],
+        content_hash: str,
+        stamp: Tuple[int, int]
+    ):
+        self.ruleset_id = ruleset_id
+        self.rules = rules
+        self.compiled: List[CompiledRule] = compile_ruleset(rules)
+        self.dependents: Dict[str, List[int]] = build_dependency_index(self.compiled)
+        self.explanation = CompiledExplanation(rules)
+
+        # Short-circuit evaluation: rules in `evaluation_order`, and the
+        # most score still to be gained or lost after the first n of them
+        self.evaluation_order: List[int] = evaluation_order(self.compiled)
+        self.mandatory_count = sum(1 for rule in rules if rule.mandatory)
+        self.remaining_gain = [0] * (len(rules) + 1)
+        self.remaining_loss = [0] * (len(rules) + 1)
+        for n in range(len(rules) - 1, -1, -1):
+            delta = rules[self.evaluation_order[n]].outcome_effect.score_delta
+            self.remaining_gain[n] = self.remaining_gain[n + 1] + max(delta, 0)
+            self.remaining_loss[n] = self.remaining_loss[n + 1] + min(delta, 0)
+        self.content_hash = content_hash
+        self.stamp = stamp
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        return self.content_hash
+
+    def affected_rules(self, variables) -> List[int]:
+        """
+        Positions of the rules that read any of `variables`, in order.
+        """
+        positions = set()
+        for var in variables:
+            positions.update(self.dependents.get(var, ()))
+        return sorted(positions)
+
+
+def parse_ruleset(ruleset_id: str) -> Ruleset:
+    """
+    Loads a ruleset from a JSON file, validates it against the Rule model
+    and compiles its condition expressions.
+
+    Raises:
+        FileNotFoundError: If the rules definition file doesn't exist.
+        ValueError: If the rules JSON is invalid.
+    """
+    file_path = ruleset_path(ruleset_id)
+
+    try:
+        stamp = _file_stamp(file_path)
+        with open(file_path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Ruleset '{ruleset_id}' not found at {file_path}")
+
+    try:
+        data = json.loads(raw.decode("utf-8"))
+
+        # Validate list of rules
+        rules = [Rule(**item) for item in data]
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in ruleset '{ruleset_id}': {e}")
+    except Exception as e:
+        raise ValueError(f"Error validating ruleset '{ruleset_id}': {e}")
+
+    return Ruleset(
+        ruleset_id,
+        rules,
+        hashlib.sha256(raw).hexdigest(),
+        stamp
+    )
+
+
+# -----------------------------------
+# Hot-Reloading Registry
+# -----------------------------------
+
+class RulesetRegistry:
+    """
+    Serves the current version of each ruleset and reloads it when the
+    file's mtime or size changes.
+
+    While the watcher thread runs, it polls loaded rulesets and swaps
+    in new versions in the background, so requests never pay the
+    reload. Without it, every lookup checks the file stamp itself.
+    A new version that fails validation is rejected and the previous
+    version keeps serving.
+    """
+
+    def __init__(self, watch_interval: float = RULES_WATCH_INTERVAL):
+        self.watch_interval = watch_interval
+        self._rulesets: Dict[str, Ruleset] = {}
+        # File stamp and error of the last version that failed to load
+        self._rejected: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None
+
+    @staticmethod
+    def _current_stamp(ruleset_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            return _file_stamp(ruleset_path(ruleset_id))
+        except FileNotFoundError:
+            return None
+
+    def _reload(self, ruleset_id: str, current: Optional[Ruleset]) -> Ruleset:
+        # Taken before parsing: if the file changes meanwhile, the next
+        # check sees a different stamp and parses again
+        stamp = self._current_stamp(ruleset_id)
+
+        try:
+            ruleset = parse_ruleset(ruleset_id)
+        except FileNotFoundError:
+            with self._lock:
+                self._rulesets.pop(ruleset_id, None)
+                self._rejected.pop(ruleset_id, None)
+            raise
+        except ValueError as e:
+            if stamp is not None:
+                with self._lock:
+                    self._rejected[ruleset_id] = (stamp, str(e))
+            if current is None:
+                raise
+            logger.error(f"Keeping ruleset '{ruleset_id}' at {current.version[:12]}: {e}")
+            return current
+
+        with self._lock:
+            # Atomic swap: readers see either the old or the new version
+            self._rulesets[ruleset_id] = ruleset
+            self._rejected.pop(ruleset_id, None)
+
+        if current is not None and current.content_hash != ruleset.content_hash:
+            logger.info(
+                f"Reloaded ruleset '{ruleset_id}': "
+                f"{current.version[:12]} -> {ruleset.version[:12]}"
+            )
+
+        return ruleset
+
+    def get(self, ruleset_id: str) -> Ruleset:
+        """
+        A file that failed to load is not parsed again until it changes;
+        until then the previous version (or the same error) is served.
+
+        Raises:
+            FileNotFoundError: If the rules definition file doesn't exist.
+            ValueError: If the rules JSON is invalid and no earlier
+                version is loaded.
+        """
+        current = self._rulesets.get(ruleset_id)
+
+        if current is not None and self.watching:
+            return current
+
+        stamp = self._current_stamp(ruleset_id)
+        if current is not None and stamp == current.stamp:
+            return current
+
+        rejected = self._rejected.get(ruleset_id)
+        if stamp is not None and rejected is not None and rejected[0] == stamp:
+            if current is not None:
+                return current
+            raise ValueError(rejected[1])
+
+        return self._reload(ruleset_id, current)
+
+    def versions(self) -> Dict[str, str]:
+        with self._lock:
+            return {rid: rs.version for rid, rs in self._rulesets.items()}
+
+    def clear(self):
+        with self._lock:
+            self._rulesets.clear()
+            self._rejected.clear()
+
+    # -----------------------------------
+    # Directory Watcher
+    # -----------------------------------
+
+    def poll(self):
+        """
+        Reloads every loaded ruleset whose file changed or disappeared.
+        """
+        with self._lock:
+            loaded = list(self._rulesets.items())
+
+        for ruleset_id, current in loaded:
+            stamp = self._current_stamp(ruleset_id)
+            rejected = self._rejected.get(ruleset_id)
+            if stamp is not None and (
+                stamp == current.stamp
+                or (rejected is not None and rejected[0] == stamp)
+            ):
+                continue
+
+            try:
+                self._reload(ruleset_id, current)
+            except FileNotFoundError:
+                logger.warning(f"Ruleset '{ruleset_id}' was removed")
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Ruleset watcher error: {e}", exc_info=True)
+
+    def start_watching(self):
+        if self._watcher is not None or self.watch_interval <= 0:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            name="ruleset-watcher",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+
+# Singleton instance
+ruleset_registry = RulesetRegistry()
+
+
+# -----------------------------------
+# Convenience Accessors
+# -----------------------------------
+
+def load_ruleset(ruleset_id: str) -> Ruleset:
+    return ruleset_registry.get(ruleset_id)
+
+
+def load_rules(ruleset_id: str) -> List[Rule]:
+    """
+    Returns the current validated rules for a ruleset.
+
+    Raises:
+        FileNotFoundError: If the rules definition file doesn't exist.
+        ValueError: If the rules JSON is invalid.
+    """
+    return ruleset_registry.get(ruleset_id).rules
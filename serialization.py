@@ -0,0 +1,59 @@
+import json
+import os
+from typing import Any
+
+# Optional fast JSON encoders; stdlib json is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+# "auto" (orjson, then msgspec, then json), "orjson", "msgspec" or "json"
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _select_backend(name: str):
+    available = {
+        "orjson": ORJSON_AVAILABLE,
+        "msgspec": MSGSPEC_AVAILABLE,
+        "json": True
+    }
+
+    if name == "auto":
+        name = next(backend for backend, ok in available.items() if ok)
+    elif not available.get(name):
+        print(f"Error selecting JSON backend {name!r}: not available, using json")
+        name = "json"
+
+    if name == "orjson":
+        return name, orjson.dumps
+    if name == "msgspec":
+        return name, msgspec.json.Encoder().encode
+    return name, _json_dumps
+
+
+BACKEND, _dumps = _select_backend(JSON_BACKEND)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Compact UTF-8 JSON of plain dicts, lists, strings, numbers and
+    str enums. Output is equivalent across backends, not byte-identical,
+    so never hash it (see `audit_logger.canonical_json`).
+    """
+    return _dumps(obj)
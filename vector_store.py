@@ -1,114 +1,481 @@
-import os
-from typing import List, Tuple
-from models import Rule
-
-# Try importing dependencies, handle missing libs gracefully
-try:
-    from sentence_transformers import SentenceTransformer
-    import numpy as np
-    VECTOR_SEARCH_AVAILABLE = True
-except ImportError:
-    VECTOR_SEARCH_AVAILABLE = False
-    print("Warning: sentence-transformers not found. Retrieval disabled.")
-
-
-class VectorStore:
-    """
-    Vector retrieval system with cosine similarity.
-    Implements CRAG-style similarity validation.
-    """
-
-    def __init__(self):
-        self.rules: List[Rule] = []
-        self.rule_embeddings = None
-        self.model = None
-
-        if VECTOR_SEARCH_AVAILABLE:
-            try:
-                self.model = SentenceTransformer("all-MiniLM-L6-v2")
-            except Exception as e:
-                print(f"Error loading embedding model: {e}")
-                self.model = None
-
-    # -----------------------------------
-    # Index Initialization
-    # -----------------------------------
-
-    def init_index(self, rules: List[Rule]):
-        """
-        Precompute normalized embeddings for rule descriptions.
-        """
-
-        if not VECTOR_SEARCH_AVAILABLE or not self.model:
-            return
-
-        self.rules = rules
-
-        descriptions = [
-            rule.human_description for rule in rules
-            if rule.human_description
-        ]
-
-        if not descriptions:
-            self.rule_embeddings = None
-            return
-
-        embeddings = self.model.encode(
-            descriptions,
-            normalize_embeddings=True
-        )
-
-        self.rule_embeddings = np.array(embeddings)
-
-    # -----------------------------------
-    # Search with CRAG Threshold
-    # -----------------------------------
-
-    def search(
-        self,
-        query: str,
-        k: int = 3,
-        similarity_threshold: float = 0.60
-    ) -> Tuple[List[str], float]:
-        """
-        Returns:
-        - relevant rule descriptions
-        - maximum cosine similarity score
-        """
-
-        if (
-            not VECTOR_SEARCH_AVAILABLE
-            or not self.model
-            or self.rule_embeddings is None
-            or len(self.rule_embeddings) == 0
-        ):
-            return [], 0.0
-
-        # Encode query
-        query_embedding = self.model.encode(
-            [query],
-            normalize_embeddings=True
-        )
-
-        # Cosine similarity via dot product
-        similarities = (
-            self.rule_embeddings @ query_embedding.T
-        ).flatten()
-
-        # Get top-k indices
-        top_indices = similarities.argsort()[-k:][::-1]
-
-        max_similarity = float(similarities[top_indices[0]])
-
-        results = []
-
-        if max_similarity >= similarity_threshold:
-            for idx in top_indices:
-                if idx < len(self.rules):
-                    results.append(self.rules[idx].human_description)
-
-        return results, max_similarity
-
-
-# Singleton instance
-vector_store = VectorStore()
\ No newline at end of file
+import os
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from models import Rule
+
+# Try importing dependencies, handle missing libs gracefully.
+# sentence-transformers (and torch) is only located here; the import
+# itself happens in the background model loader.
+try:
+    import numpy as np
+    from ann_index import build_index
+    from embedding_cache import EmbeddingCache, QUERY_CACHE_PATH
+    from policy_index import POLICY_INDEX_DIR, PolicyIndex
+    from embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
+    VECTOR_SEARCH_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+except ImportError:
+    VECTOR_SEARCH_AVAILABLE = False
+
+if not VECTOR_SEARCH_AVAILABLE:
+    print("Warning: sentence-transformers not found. Retrieval disabled.")
+
+
+MAX_CACHED_INDEXES = int(os.getenv("VECTOR_STORE_MAX_INDEXES", "8"))
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# How long a request may wait for the model while it is still loading.
+# 0 = don't wait; retrieval is skipped and governance routes to Review.
+MODEL_WAIT_TIMEOUT = float(os.getenv("VECTOR_MODEL_WAIT_TIMEOUT", "0"))
+
+# Single-failure and failure-pair queries are precomputed only for
+# rulesets up to these sizes, so large rulesets neither double the
+# startup encode nor flush the query embedding cache
+PRECOMPUTE_SINGLES_MAX_RULES = int(os.getenv("QUERY_PRECOMPUTE_SINGLES_MAX_RULES", "1024"))
+PRECOMPUTE_PAIRS_MAX_RULES = int(os.getenv("QUERY_PRECOMPUTE_PAIRS_MAX_RULES", "16"))
+
+GENERAL_QUERY = "General eligibility criteria"
+
+
+def failure_query(failed_rule_names: List[str]) -> str:
+    """
+    CRAG retrieval query for a set of failed rules (in ruleset order).
+    """
+    if failed_rule_names:
+        return " ".join(failed_rule_names)
+    return GENERAL_QUERY
+
+
+def likely_queries(rules: List[Rule]) -> List[str]:
+    """
+    Queries worth embedding ahead of time: no failures, every single
+    failure and every pair of failures (each up to a ruleset size) and
+    all rules failing (e.g. missing inputs).
+    """
+    names = [rule.name for rule in rules]
+    queries = [failure_query([])]
+
+    if len(names) <= PRECOMPUTE_SINGLES_MAX_RULES:
+        queries.extend(failure_query([name]) for name in names)
+
+    if len(names) <= PRECOMPUTE_PAIRS_MAX_RULES:
+        queries.extend(
+            failure_query([names[i], names[j]])
+            for i in range(len(names))
+            for j in range(i + 1, len(names))
+        )
+
+    queries.append(failure_query(names))
+    return queries
+
+
+def ruleset_content_hash(rules: List[Rule]) -> str:
+    """
+    Stable hash of the rule descriptions that make up an index.
+    """
+    digest = hashlib.sha256()
+    for rule in rules:
+        digest.update(rule.id.encode())
+        digest.update(b"\x00")
+        digest.update((rule.human_description or "").encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class RuleIndex:
+    """
+    Normalized description embeddings for a single ruleset version.
+    Immutable once built, so it can be shared across requests.
+    """
+
+    def __init__(
+        self,
+        ruleset_id: str,
+        content_hash: str,
+        rules: List[Rule],
+        embeddings,
+        backend: Optional[str] = None
+    ):
+        self.ruleset_id = ruleset_id
+        self.content_hash = content_hash
+        self.rules = rules
+        self.rule_embeddings = embeddings
+        self.ann = (
+            build_index(embeddings, backend)
+            if embeddings is not None else None
+        )
+
+    def top_k(
+        self,
+        query_embeddings,
+        k: int,
+        similarity_threshold: float,
+        policy_index: Optional["PolicyIndex"] = None
+    ) -> List[Tuple[List[str], float]]:
+        """
+        Nearest rule descriptions (and policy clauses, if a policy index
+        is given) for each query embedding, with the CRAG threshold
+        applied to the best match.
+        """
+        if self.ann is not None:
+            scores, ids = self.ann.search(query_embeddings, k)
+            hits = [
+                [
+                    (float(score), self.rules[idx].human_description)
+                    for score, idx in zip(row_scores, row_ids)
+                    if idx >= 0
+                ]
+                for row_scores, row_ids in zip(scores, ids)
+            ]
+        else:
+            hits = [[] for _ in range(len(query_embeddings))]
+
+        if policy_index is not None and len(policy_index):
+            hits = [
+                sorted(rule_hits + clause_hits, key=lambda hit: -hit[0])[:k]
+                for rule_hits, clause_hits in zip(
+                    hits, policy_index.search(query_embeddings, k)
+                )
+            ]
+
+        matches = []
+        for row in hits:
+            max_similarity = row[0][0] if row else 0.0
+
+            results = []
+            if max_similarity >= similarity_threshold:
+                results = [text for _, text in row]
+
+            matches.append((results, max_similarity))
+
+        return matches
+
+
+class VectorStore:
+    """
+    Vector retrieval system with cosine similarity.
+    Implements CRAG-style similarity validation.
+
+    Keeps one index per ruleset, keyed by ruleset id and content hash,
+    in a bounded LRU so rulesets are only re-encoded when they change.
+    `backend` selects the search index ("auto", "flat", "hnsw", "ivf").
+
+    With EMBEDDING_STORE_DIR set, description embeddings are published
+    to a shared on-disk store and memory-mapped from it, so worker
+    processes share one copy and restarts skip re-encoding.
+
+    Clauses from the policy index written by `policy_ingest` (at
+    POLICY_INDEX_DIR) are searched alongside rule descriptions.
+
+    The embedding model is loaded lazily on a background thread.
+    `model_state` is one of: not_loaded, loading, ready, failed,
+    unavailable (sentence-transformers not installed).
+    """
+
+    def __init__(
+        self,
+        max_indexes: int = MAX_CACHED_INDEXES,
+        backend: Optional[str] = None,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        wait_timeout: float = MODEL_WAIT_TIMEOUT,
+        store_dir: Optional[str] = None
+    ):
+        self.model = None
+        self.model_name = model_name
+        self.wait_timeout = wait_timeout
+        self.model_state = "not_loaded" if VECTOR_SEARCH_AVAILABLE else "unavailable"
+        self._model_ready = threading.Event()
+        self._loader: Optional[threading.Thread] = None
+
+        self.query_cache = EmbeddingCache(model_name) if VECTOR_SEARCH_AVAILABLE else None
+
+        store_dir = EMBEDDING_STORE_DIR if store_dir is None else store_dir
+        self.embedding_store = (
+            EmbeddingStore(store_dir)
+            if VECTOR_SEARCH_AVAILABLE and store_dir else None
+        )
+
+        self.max_indexes = max_indexes
+        self.backend = backend
+        self._indexes: "OrderedDict[Tuple[str, str], RuleIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_index: Optional[RuleIndex] = None
+        self.policy_index: Optional["PolicyIndex"] = None
+
+    # -----------------------------------
+    # Lazy Model Loading
+    # -----------------------------------
+
+    def start_loading(self):
+        """
+        Starts loading the embedding model in the background (idempotent).
+        """
+        if not VECTOR_SEARCH_AVAILABLE or self.model is not None:
+            return
+
+        with self._lock:
+            if self._loader is not None:
+                return
+            self.model_state = "loading"
+            self._loader = threading.Thread(
+                target=self._load_model,
+                name="embedding-model-loader",
+                daemon=True
+            )
+            self._loader.start()
+
+    def _load_model(self):
+        try:
+            if POLICY_INDEX_DIR:
+                self.load_policy_index(POLICY_INDEX_DIR)
+
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(self.model_name)
+            if QUERY_CACHE_PATH:
+                self.query_cache.load(
+                    QUERY_CACHE_PATH, model.get_sentence_embedding_dimension()
+                )
+            self.model = model
+            self.model_state = "ready"
+        except Exception as e:
+            print(f"Error loading embedding model: {e}")
+            self.model = None
+            self.model_state = "failed"
+        finally:
+            self._model_ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    @property
+    def warming_up(self) -> bool:
+        """
+        True while retrieval is temporarily unavailable because the
+        model has not finished loading.
+        """
+        return self.model_state in ("not_loaded", "loading") and self.model is None
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        self.start_loading()
+        if VECTOR_SEARCH_AVAILABLE:
+            self._model_ready.wait(timeout)
+        return self.ready
+
+    def _get_model(self):
+        """
+        The model if loaded, waiting up to `wait_timeout` for it.
+        None means retrieval should be skipped for this request.
+        """
+        if self.model is not None or not VECTOR_SEARCH_AVAILABLE:
+            return self.model
+
+        self.start_loading()
+        if self.wait_timeout > 0:
+            self._model_ready.wait(self.wait_timeout)
+        return self.model
+
+    # -----------------------------------
+    # Index Initialization
+    # -----------------------------------
+
+    def init_index(self, rules: List[Rule], ruleset_id: str = "default") -> Optional[RuleIndex]:
+        """
+        Returns the index for a ruleset, computing normalized embeddings
+        for rule descriptions only if this ruleset version is neither
+        cached in this process nor published to the embedding store.
+        """
+
+        model = self._get_model()
+        if model is None:
+            return None
+
+        described = [rule for rule in rules if rule.human_description]
+        key = (ruleset_id, ruleset_content_hash(described))
+
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self._last_index = index
+                return index
+
+        descriptions = [rule.human_description for rule in described]
+        queries = self.query_cache.missing(likely_queries(rules))
+        embeddings = None
+
+        if descriptions and self.embedding_store is not None:
+            rule_ids = [rule.id for rule in described]
+            store = self.embedding_store
+            encoded = None
+
+            try:
+                # Only one worker encodes a new version; the rest wait and map it
+                with store.lock(ruleset_id, self.model_name):
+                    embeddings = store.load(ruleset_id, self.model_name, key[1], rule_ids)
+                    if embeddings is None:
+                        encoded = self._encode(model, descriptions, queries)
+                        queries = []
+                        embeddings = store.publish(
+                            ruleset_id, self.model_name, key[1], rule_ids, encoded
+                        )
+            except OSError as e:
+                print(f"Error using embedding store: {e}")
+                embeddings = encoded
+
+        if embeddings is None and descriptions:
+            embeddings = self._encode(model, descriptions, queries)
+        elif queries:
+            self._encode(model, [], queries)
+
+        index = RuleIndex(ruleset_id, key[1], described, embeddings, self.backend)
+
+        with self._lock:
+            # Drop stale versions of the same ruleset before inserting
+            for stale in [k for k in self._indexes if k[0] == ruleset_id]:
+                del self._indexes[stale]
+
+            self._indexes[key] = index
+
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+
+            self._last_index = index
+
+        return index
+
+    def _encode(self, model, descriptions: List[str], queries: List[str]):
+        """
+        Encodes descriptions and uncached likely queries in one pass.
+        Caches the query embeddings and returns the description ones.
+        """
+        encoded = np.asarray(
+            model.encode(descriptions + queries, normalize_embeddings=True),
+            dtype=np.float32
+        )
+        self.query_cache.put_many(queries, encoded[len(descriptions):])
+        return encoded[:len(descriptions)]
+
+    def load_policy_index(self, path: str) -> bool:
+        """
+        Opens (or re-opens, after ingestion) the policy clause index.
+        Indexes built with a different embedding model are ignored.
+        """
+        try:
+            index = PolicyIndex(path)
+        except OSError as e:
+            print(f"Error loading policy index {path}: {e}")
+            return False
+        if not len(index) or index.model_name != self.model_name:
+            return False
+        self.policy_index = index
+        return True
+
+    def _current_policy_index(self) -> Optional["PolicyIndex"]:
+        """
+        The policy index, reloaded once an ingestion process has
+        appended, deleted or compacted since it was opened.
+        """
+        index = self.policy_index
+        if index is not None and index.changed():
+            try:
+                reloaded = PolicyIndex(index.path)
+            except OSError as e:
+                print(f"Error reloading policy index {index.path}: {e}")
+                return index
+            if reloaded.model_name == self.model_name:
+                # Kept even when empty, so later ingestion is picked up
+                self.policy_index = index = reloaded
+        return index
+
+    def save_query_cache(self):
+        """
+        Persists memoized query embeddings when QUERY_CACHE_PATH is set.
+        """
+        if self.query_cache is not None and QUERY_CACHE_PATH:
+            self.query_cache.save(QUERY_CACHE_PATH)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._last_index = None
+
+    # -----------------------------------
+    # Search with CRAG Threshold
+    # -----------------------------------
+
+    def _searchable(self, index: Optional[RuleIndex]) -> bool:
+        if index is None:
+            return False
+        if index.rule_embeddings is not None and len(index.rule_embeddings):
+            return True
+        policy_index = self._current_policy_index()
+        return policy_index is not None and len(policy_index) > 0
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        similarity_threshold: float = 0.60,
+        index: Optional[RuleIndex] = None
+    ) -> Tuple[List[str], float]:
+        """
+        Searches `index`, or the most recently initialized index.
+
+        Returns:
+        - relevant rule descriptions
+        - maximum cosine similarity score
+        """
+
+        if index is None:
+            index = self._last_index
+
+        model = self._get_model()
+
+        if model is None or not self._searchable(index):
+            return [], 0.0
+
+        # Encode query (memoized)
+        query_embedding = self.query_cache.encode(model, [query])
+
+        return index.top_k(query_embedding, k, similarity_threshold, self._current_policy_index())[0]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        similarity_threshold: float = 0.60,
+        index: Optional[RuleIndex] = None
+    ) -> List[Tuple[List[str], float]]:
+        """
+        Same as `search` for many queries, with one encode call for
+        all distinct queries and one matrix multiply for the batch.
+        """
+
+        if index is None:
+            index = self._last_index
+
+        model = self._get_model()
+
+        if model is None or not self._searchable(index):
+            return [([], 0.0) for _ in queries]
+
+        unique_queries = list(dict.fromkeys(queries))
+
+        query_embeddings = self.query_cache.encode(model, unique_queries)
+
+        by_query = dict(zip(
+            unique_queries,
+            index.top_k(query_embeddings, k, similarity_threshold, self._current_policy_index())
+        ))
+
+        return [
+            (list(by_query[query][0]), by_query[query][1])
+            for query in queries
+        ]
+
+
+# Singleton instance
+vector_store = VectorStore()
@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# -----------------------------------
+# Configuration
+# -----------------------------------
+
+EVAL_POOL_KIND = os.getenv("EVAL_POOL", "thread")  # "thread" or "process"
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", str(os.cpu_count() or 4)))
+EVAL_MAX_PENDING = int(os.getenv("EVAL_MAX_PENDING", str(EVAL_WORKERS * 4)))
+EVAL_TIMEOUT = float(os.getenv("EVAL_TIMEOUT", "10"))
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when the pool already has `max_pending` jobs queued or running.
+    """
+
+
+class EvaluationPool:
+    """
+    Bounded worker pool for CPU-heavy pipeline work.
+
+    Jobs run in a thread or process pool. At most `max_pending` jobs
+    may be queued or running at once; beyond that `run` fails fast with
+    PoolSaturated instead of queueing without bound. A job that exceeds
+    `timeout` raises asyncio.TimeoutError for the caller. It still holds
+    its slot until it actually finishes, so timed-out work keeps
+    counting against the limit.
+    """
+
+    def __init__(
+        self,
+        kind: str = EVAL_POOL_KIND,
+        workers: int = EVAL_WORKERS,
+        max_pending: int = EVAL_MAX_PENDING,
+        timeout: float = EVAL_TIMEOUT,
+        initializer: Optional[Callable[[], None]] = None
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind '{kind}'")
+
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.initializer = initializer
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: never fork a parent that runs writer threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="eval-worker",
+                    initializer=self.initializer
+                )
+        return self._executor
+
+    def _release(self, _future):
+        self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Runs `fn(*args)` in the pool.
+
+        Raises:
+            PoolSaturated: If too many jobs are pending.
+            asyncio.TimeoutError: If the job exceeds the timeout.
+        """
+        if self._pending >= self.max_pending:
+            raise PoolSaturated(
+                f"{self._pending} evaluations pending (limit {self.max_pending})"
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), fn, *args)
+
+        # Counted on the event loop thread, so no lock is needed
+        self._pending += 1
+        future.add_done_callback(self._release)
+
+        # shield: a timeout abandons the wait but not the running job
+        return await asyncio.wait_for(
+            asyncio.shield(future),
+            self.timeout if self.timeout > 0 else None
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None